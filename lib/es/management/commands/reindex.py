@@ -5,6 +5,7 @@ Currently creates the indexes and re-indexes apps and feed elements.
 """
 import itertools
 import logging
+import multiprocessing
 import sys
 import time
 from math import ceil
@@ -15,6 +16,7 @@ from celery import chain, chord, task
 
 from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
 
 import mkt.feed.indexers as f_indexers
 from lib.es.models import Reindexing
@@ -138,6 +140,10 @@ def post_index(new_index, old_index, alias, index_name, settings):
     _print('Unflagging the database.', alias)
     Reindexing.unflag_reindexing(alias=alias)
 
+    # The fingerprints of the documents written through the alias don't
+    # describe what is in the new index.
+    INDEXER_MAP[index_name].invalidate_fingerprints(alias)
+
     _print('Removing index {index}.'.format(index=old_index), alias)
     if old_index and ES.indices.exists(index=old_index):
         ES.indices.delete(index=old_index)
@@ -165,12 +171,75 @@ def run_indexing(index, index_name, ids):
     indexer.run_indexing(ids, ES, index=index)
 
 
-def chunk_indexing(indexer, chunk_size):
-    """Chunk the items to index."""
-    chunks = list(indexer.get_indexable().values_list('id', flat=True))
+def chunk_indexing(indexer, chunk_size, after_id=None):
+    """Chunk the items to index.
+
+    Passing `after_id` only returns the items with a greater id, ordered by id.
+    """
+    qs = indexer.get_indexable()
+    if after_id is not None:
+        qs = qs.filter(id__gt=after_id).order_by('id')
+    chunks = list(qs.values_list('id', flat=True))
     return chunked(chunks, chunk_size), len(chunks)
 
 
+def _init_worker():
+    """Give each local worker its own Elasticsearch connection."""
+    global ES
+    ES = elasticsearch.Elasticsearch(hosts=settings.ES_HOSTS)
+
+
+def _index_chunk(args):
+    """Index a chunk in a local worker and return the number of objects."""
+    index, index_name, ids = args
+    run_indexing(index, index_name, ids)
+    return len(ids)
+
+
+def local_indexing(new_index, alias, index_name, chunks, total, workers):
+    """Index the chunks using a pool of `workers` local processes.
+
+    The chunks must be ordered by id. Every time a chunk and all the chunks
+    before it are indexed, the last id of that chunk is stored on the
+    `Reindexing` row so that the indexing can be resumed from there.
+
+    """
+    done = initial = Reindexing.objects.get(alias=alias).indexed_count
+    total += done
+    start = time.time()
+    args = [(new_index, index_name, chunk) for chunk in chunks]
+
+    if workers > 1:
+        # Forked processes can't share the database connections.
+        for conn in connections.all():
+            conn.close()
+        pool = multiprocessing.Pool(workers, initializer=_init_worker)
+        results = pool.imap(_index_chunk, args)
+    else:
+        pool = None
+        results = itertools.imap(_index_chunk, args)
+
+    try:
+        # `imap()` returns the results in order, so all the chunks before the
+        # current one are indexed too.
+        for (_, _, chunk), count in itertools.izip(args, results):
+            done += count
+            Reindexing.checkpoint(alias, last_indexed_id=chunk[-1],
+                                  indexed_count=done)
+            rate = (done - initial) / max(time.time() - start, 0.001)
+            _print('Indexed {done}/{total} items ({rate:.1f} docs/sec)'
+                   .format(done=done, total=total, rate=rate), alias)
+    except Exception as e:
+        if pool:
+            pool.terminate()
+        raise CommandError('Indexing of {alias} failed after {done} items, '
+                           'use --resume to continue: {error}'
+                           .format(alias=alias, done=done, error=e))
+    if pool:
+        pool.close()
+        pool.join()
+
+
 class Command(BaseCommand):
     help = 'Reindex all ES indexes'
     option_list = BaseCommand.option_list + (
@@ -184,6 +253,14 @@ class Command(BaseCommand):
                     help=('Bypass the database flag that says '
                           'another indexation is ongoing'),
                     default=False),
+        make_option('--workers', action='store', type='int',
+                    help=('Index in this many local processes instead of '
+                          'queuing celery tasks'),
+                    default=None),
+        make_option('--resume', action='store_true',
+                    help=('Resume the interrupted local indexing of the '
+                          'aliases flagged in the database'),
+                    default=False),
     )
 
     def handle(self, *args, **kwargs):
@@ -195,6 +272,15 @@ class Command(BaseCommand):
         index_choice = kwargs.get('index', None)
         prefix = kwargs.get('prefix', '')
         force = kwargs.get('force', False)
+        workers = kwargs.get('workers', None)
+        resume = kwargs.get('resume', False)
+
+        if resume and force:
+            raise CommandError('--resume and --force are incompatible')
+        if resume and not workers:
+            workers = 1
+        if workers is not None and workers < 1:
+            raise CommandError('--workers must be a positive number')
 
         if index_choice:
             # If we only want to reindex a subset of indexes.
@@ -206,7 +292,13 @@ class Command(BaseCommand):
         else:
             INDEXES = INDEXERS
 
-        if Reindexing.is_reindexing() and not force:
+        if resume:
+            flagged = Reindexing.objects.values_list('alias', flat=True)
+            INDEXES = [INDEXER for INDEXER in INDEXES if
+                       ES_INDEXES[INDEXER.get_mapping_type_name()] in flagged]
+            if not INDEXES:
+                raise CommandError('No indexation to resume.')
+        elif Reindexing.is_reindexing() and not force:
             raise CommandError('Indexation already occuring - use --force to '
                                'bypass')
         elif force:
@@ -217,7 +309,13 @@ class Command(BaseCommand):
             chunk_size = INDEXER.chunk_size
             alias = ES_INDEXES[index_name]
 
-            chunks, total = chunk_indexing(INDEXER, chunk_size)
+            if resume:
+                self.resume_index(INDEXER, alias, workers)
+                continue
+
+            # Local indexing needs the chunks ordered by id to checkpoint.
+            chunks, total = chunk_indexing(INDEXER, chunk_size,
+                                           after_id=0 if workers else None)
             if not total:
                 _print('No items to queue.', alias)
             else:
@@ -261,6 +359,14 @@ class Command(BaseCommand):
                                       {'number_of_replicas': num_replicas,
                                        'refresh_interval': '5s'})
 
+            if workers:
+                # Run everything here, without celery.
+                pre_task()
+                local_indexing(new_index, alias, index_name, chunks, total,
+                               workers)
+                post_task()
+                continue
+
             # Ship it.
             if not total:
                 # If there's no data we still create the index and alias.
@@ -279,4 +385,31 @@ class Command(BaseCommand):
                     chain(pre_task, chord(header=index_tasks,
                                           body=post_task)).apply_async()
 
-        _print('New index and indexing tasks all queued up.')
+        if not workers:
+            _print('New index and indexing tasks all queued up.')
+
+    def resume_index(self, indexer, alias, workers):
+        """Index what is left of an interrupted local indexing, then swap
+        the alias."""
+        index_name = indexer.get_mapping_type_name()
+        reindexing = Reindexing.objects.get(alias=alias)
+        new_index, old_index = reindexing.new_index, reindexing.old_index
+        if not ES.indices.exists(index=new_index):
+            raise CommandError('Index {index} does not exist, reindex with '
+                               '--force instead.'.format(index=new_index))
+
+        num_replicas = settings.ES_DEFAULT_NUM_REPLICAS
+        if old_index and ES.indices.exists(index=old_index):
+            num_replicas = (ES.indices.get_settings(index=old_index)
+                            .get(old_index, {}).get('settings', {})
+                            .get('number_of_replicas', num_replicas))
+
+        chunks, total = chunk_indexing(
+            indexer, indexer.chunk_size,
+            after_id=reindexing.last_indexed_id or 0)
+        _print('Resuming after {count} items, {total} items left to index'
+               .format(count=reindexing.indexed_count, total=total), alias)
+        local_indexing(new_index, alias, index_name, chunks, total, workers)
+        post_index(new_index, old_index, alias, index_name,
+                   {'number_of_replicas': num_replicas,
+                    'refresh_interval': '5s'})
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('es', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reindexing',
+            name='indexed_count',
+            field=models.PositiveIntegerField(default=0),
+            preserve_default=True,
+        ),
+        migrations.AddField(
+            model_name='reindexing',
+            name='last_indexed_id',
+            field=models.PositiveIntegerField(null=True),
+            preserve_default=True,
+        ),
+    ]
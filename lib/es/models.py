@@ -8,6 +8,10 @@ class Reindexing(models.Model):
     alias = models.CharField(max_length=255)
     old_index = models.CharField(max_length=255, null=True)
     new_index = models.CharField(max_length=255)
+    # Progress of a local reindexing (`reindex --workers`): all the objects up
+    # to `last_indexed_id` have been indexed in `new_index`.
+    last_indexed_id = models.PositiveIntegerField(null=True)
+    indexed_count = models.PositiveIntegerField(default=0)
 
     class Meta:
         db_table = 'zadmin_reindexing'
@@ -34,6 +38,12 @@ class Reindexing(models.Model):
             qs = qs.filter(alias=alias)
         qs.delete()
 
+    @classmethod
+    def checkpoint(cls, alias, last_indexed_id, indexed_count):
+        """Record the progress of the reindexing of an alias."""
+        cls.objects.filter(alias=alias).update(
+            last_indexed_id=last_indexed_id, indexed_count=indexed_count)
+
     @classmethod
     def get_indices(cls, alias):
         """
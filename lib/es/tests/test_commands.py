@@ -0,0 +1,90 @@
+from django import test
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+import mock
+from nose.tools import eq_
+
+import mkt.site.tests
+from lib.es.models import Reindexing
+from mkt.webapps.indexers import WebappIndexer
+
+
+@mock.patch('lib.es.management.commands.reindex.post_index')
+@mock.patch('lib.es.management.commands.reindex.run_indexing')
+@mock.patch('lib.es.management.commands.reindex.ES')
+class TestReindexResume(mkt.site.tests.TestCase):
+
+    def setUp(self):
+        self.alias = WebappIndexer.get_index()
+        self.ids = sorted(mkt.site.tests.app_factory().pk for i in range(3))
+        self.reindexing = Reindexing.objects.create(
+            alias=self.alias, new_index='new', old_index='old')
+
+    def resume(self):
+        with mock.patch.object(WebappIndexer, 'chunk_size', 1):
+            call_command('reindex', resume=True, index='apps')
+
+    def test_resume(self, es_mock, run_mock, post_mock):
+        Reindexing.checkpoint(self.alias, last_indexed_id=self.ids[0],
+                              indexed_count=1)
+        self.resume()
+        eq_([call[0] for call in run_mock.call_args_list],
+            [('new', 'webapp', [self.ids[1]]),
+             ('new', 'webapp', [self.ids[2]])])
+        reindexing = Reindexing.objects.get(alias=self.alias)
+        eq_(reindexing.last_indexed_id, self.ids[2])
+        eq_(reindexing.indexed_count, 3)
+        eq_(post_mock.call_args[0][:4], ('new', 'old', self.alias, 'webapp'))
+
+    def test_failed_chunk_is_checkpointed(self, es_mock, run_mock,
+                                          post_mock):
+        run_mock.side_effect = [None, Exception('oops'), None]
+        with self.assertRaises(CommandError):
+            self.resume()
+        reindexing = Reindexing.objects.get(alias=self.alias)
+        eq_(reindexing.last_indexed_id, self.ids[0])
+        eq_(reindexing.indexed_count, 1)
+        assert not post_mock.called
+
+    def test_nothing_to_resume(self, es_mock, run_mock, post_mock):
+        Reindexing.unflag_reindexing()
+        with self.assertRaises(CommandError):
+            self.resume()
+
+    def test_resume_force(self, es_mock, run_mock, post_mock):
+        with self.assertRaises(CommandError):
+            call_command('reindex', resume=True, force=True)
+
+
+@mock.patch('lib.es.management.commands.reindex.post_index')
+@mock.patch('lib.es.management.commands.reindex.run_indexing')
+@mock.patch('lib.es.management.commands.reindex.ES')
+class TestReindexWorkers(mkt.site.tests.MockEsMixin, test.TransactionTestCase):
+    """Runs the indexing in a real pool of local processes, which need the
+    database connections to be closed before forking."""
+
+    def setUp(self):
+        self.alias = WebappIndexer.get_index()
+        self.ids = sorted(mkt.site.tests.app_factory().pk for i in range(3))
+        Reindexing.objects.create(alias=self.alias, new_index='new',
+                                  old_index='old')
+
+    def resume(self):
+        with mock.patch.object(WebappIndexer, 'chunk_size', 1):
+            call_command('reindex', resume=True, index='apps', workers=2)
+
+    def test_workers(self, es_mock, run_mock, post_mock):
+        self.resume()
+        # The indexing itself happens in the workers, only the checkpoints
+        # are visible here.
+        reindexing = Reindexing.objects.get(alias=self.alias)
+        eq_(reindexing.last_indexed_id, self.ids[2])
+        eq_(reindexing.indexed_count, 3)
+        eq_(post_mock.call_args[0][:4], ('new', 'old', self.alias, 'webapp'))
+
+    def test_worker_error(self, es_mock, run_mock, post_mock):
+        run_mock.side_effect = Exception('oops')
+        with self.assertRaises(CommandError):
+            self.resume()
+        assert not post_mock.called
@@ -61,3 +61,11 @@ class TestReindexing(mkt.site.tests.TestCase):
 
         # Doesn't clash on other aliases.
         self.assertSetEqual(Reindexing.get_indices('other'), ['other'])
+
+    def test_checkpoint(self):
+        Reindexing.objects.create(alias='foo', new_index='bar',
+                                  old_index='baz')
+        Reindexing.checkpoint('foo', last_indexed_id=42, indexed_count=10)
+        reindexing = Reindexing.objects.get(alias='foo')
+        eq_(reindexing.last_indexed_id, 42)
+        eq_(reindexing.indexed_count, 10)
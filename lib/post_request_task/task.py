@@ -1,6 +1,10 @@
+import hashlib
 import threading
+import uuid
 from functools import partial
 
+from django.conf import settings
+from django.core.cache import cache
 from django.core.signals import got_request_exception, request_finished
 
 import commonware.log
@@ -14,6 +18,9 @@ log = commonware.log.getLogger('z.post_request_task')
 
 _locals = threading.local()
 
+# Keyword argument used to tell a debounced task where to find its ids.
+DEBOUNCE_KWARG = '_debounce_batch'
+
 
 def _get_task_queue():
     """Returns the calling thread's task queue."""
@@ -23,9 +30,13 @@ def _get_task_queue():
 def _send_tasks(**kwargs):
     """Sends all delayed Celery tasks."""
     queue = _get_task_queue()
+    window = getattr(settings, 'POST_REQUEST_TASK_DEBOUNCE', 0)
     while queue:
         cls, args, kwargs = queue.pop(0)
-        cls.original_apply_async(*args, **kwargs)
+        if cls.coalesce and window:
+            _debounce_task(cls, args, kwargs, window)
+        else:
+            cls.original_apply_async(*args, **kwargs)
 
 
 def _discard_tasks(**kwargs):
@@ -40,12 +51,120 @@ def _append_task(t):
 
     This doesn't append to queue if the argument is already in the queue.
 
+    If the task has `coalesce` set, it's merged with a pending call to the
+    same task that only differs by its ids (see `_merge_tasks()`).
+
     """
     queue = _get_task_queue()
-    if t not in queue:
-        queue.append(t)
-    else:
+    if t in queue:
         log.debug('Removed duplicate task: %s' % (t,))
+        return
+
+    if t[0].coalesce:
+        for i, queued in enumerate(queue):
+            merged = _merge_tasks(queued, t)
+            if merged:
+                queue[i] = merged
+                log.debug('Coalesced task: %s' % (t,))
+                return
+
+    queue.append(t)
+
+
+def _union(ids, other_ids):
+    """Returns the ids from both lists, de-duped, keeping their order."""
+    ids = list(ids)
+    seen = set(ids)
+    for id_ in other_ids:
+        if id_ not in seen:
+            seen.add(id_)
+            ids.append(id_)
+    return ids
+
+
+def _merge_tasks(t1, t2):
+    """Merge two queued calls to a coalescing task.
+
+    Both calls can be merged if they target the same task with the same
+    options and arguments, apart from the list of ids passed as the first
+    positional argument. Returns the merged (task class, args, kwargs) tuple,
+    or None if the calls can't be merged.
+
+    """
+    cls1, (args1, kwargs1), options1 = t1
+    cls2, (args2, kwargs2), options2 = t2
+    if (cls1.name != cls2.name or not args1 or not args2 or
+            args1[1:] != args2[1:] or kwargs1 != kwargs2 or
+            options1 != options2):
+        return None
+    args = (_union(args1[0], args2[0]),) + tuple(args1[1:])
+    return (cls1, (args, kwargs1), options1)
+
+
+def _debounce_keys(batch):
+    return ('post_request_task:debounce:%s:count' % batch,
+            'post_request_task:debounce:%s:ids:%%s' % batch)
+
+
+def _debounce_task(cls, args, kwargs, window):
+    """Send a coalescing task through a cache-backed debounce window.
+
+    The first call for a given task and arguments opens a batch for `window`
+    seconds and schedules the task to run after twice that time. Calls made
+    while the batch is open, from any process, only add their ids to it. The
+    extra delay leaves time for late writers to store their ids before the
+    task collects them in `PostRequestTask.__call__`.
+
+    """
+    (task_args, task_kwargs), options = args, kwargs
+    signature = hashlib.md5(repr((
+        cls.name, task_args[1:], sorted((task_kwargs or {}).items()),
+        sorted(options.items())))).hexdigest()
+    lock_key = 'post_request_task:debounce:%s' % signature
+
+    batch = cache.get(lock_key)
+    scheduled = False
+    if batch is None:
+        batch = '%s:%s' % (signature, uuid.uuid4().hex)
+        scheduled = cache.add(lock_key, batch, window)
+        if not scheduled:
+            batch = cache.get(lock_key)
+
+    count_key, ids_key = _debounce_keys(batch)
+    try:
+        if batch is None:
+            raise ValueError('Debounce batch expired.')
+        # Each writer gets its own slot so concurrent writers don't overwrite
+        # each other's ids.
+        cache.add(count_key, 0, window * 10)
+        slot = cache.incr(count_key)
+    except ValueError:
+        log.info('Could not debounce task %s, sending it now.' % cls.name)
+        cls.original_apply_async(*args, **kwargs)
+        return
+    cache.set(ids_key % slot, list(task_args[0]), window * 10)
+
+    if scheduled:
+        task_kwargs = dict(task_kwargs or {}, **{DEBOUNCE_KWARG: batch})
+        cls.original_apply_async(
+            ([],) + tuple(task_args[1:]), task_kwargs,
+            **dict(options, countdown=window * 2))
+    else:
+        log.debug('Debounced task %s into batch %s' % (cls.name, batch))
+
+
+def _collect_debounced_ids(batch):
+    """Returns all the ids stored for a debounce batch and clears it."""
+    count_key, ids_key = _debounce_keys(batch)
+    keys = [ids_key % slot for slot in
+            range(1, (cache.get(count_key) or 0) + 1)]
+    stored = cache.get_many(keys)
+    cache.delete_many(keys + [count_key])
+
+    ids = []
+    for key in keys:
+        ids = _union(ids, stored.get(key, []))
+    return ids
 
 
 class PostRequestTask(Task):
@@ -54,14 +173,31 @@ class PostRequestTask(Task):
     This simply wraps celery's `@task` decorator and stores the task calls
     until after the request is finished, then fires them off.
 
+    Tasks taking a list of ids as their first argument can pass
+    `coalesce=True` to the decorator: pending calls that only differ by their
+    ids are then merged into a single call. If the
+    `POST_REQUEST_TASK_DEBOUNCE` setting is set, those calls are also merged
+    across requests for that many seconds.
+
     """
     abstract = True
+    coalesce = False
+
+    def __call__(self, *args, **kwargs):
+        batch = kwargs.pop(DEBOUNCE_KWARG, None)
+        if batch is not None:
+            ids = _collect_debounced_ids(batch)
+            if not ids:
+                log.info('No ids found for debounced task %s' % self.name)
+                return
+            args = (ids,) + tuple(args[1:])
+        return super(PostRequestTask, self).__call__(*args, **kwargs)
 
     def original_apply_async(self, *args, **kwargs):
         return super(PostRequestTask, self).apply_async(*args, **kwargs)
 
-    def apply_async(self, *args, **kwargs):
-        _append_task((self, args, kwargs))
+    def apply_async(self, args=None, kwargs=None, **options):
+        _append_task((self, (tuple(args or ()), kwargs or {}), options))
 
 
 # Replacement `@task` decorator.
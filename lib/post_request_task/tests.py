@@ -1,3 +1,4 @@
+from django.core.cache import cache
 from django.core.signals import request_finished
 from django.test import TestCase
 
@@ -5,7 +6,8 @@ from celery.signals import task_postrun
 from mock import Mock, patch
 from nose.tools import eq_
 
-from lib.post_request_task.task import task, _get_task_queue, _discard_tasks
+from lib.post_request_task.task import (DEBOUNCE_KWARG, task,
+                                        _get_task_queue, _discard_tasks)
 
 
 task_mock = Mock()
@@ -16,6 +18,11 @@ def test_task():
     task_mock()
 
 
+@task(coalesce=True)
+def test_coalesce_task(ids, name, **kw):
+    task_mock(ids, name)
+
+
 class TestTask(TestCase):
 
     def setUp(self):
@@ -93,3 +100,45 @@ class TestTask(TestCase):
             test_task.delay()
 
         self._verify_task_filled()
+
+    def test_coalesce(self):
+        """Test calls only differing by their ids are merged."""
+        with self.settings(CELERY_ALWAYS_EAGER=False):
+            test_coalesce_task.delay([1, 2], 'a')
+            test_coalesce_task.delay([3], 'b')
+            test_coalesce_task.delay([2, 4], 'a')
+
+        queue = _get_task_queue()
+        eq_(len(queue), 2)
+        eq_(queue[0][1], (([1, 2, 4], 'a'), {}))
+        eq_(queue[1][1], (([3], 'b'), {}))
+
+    def test_no_coalesce(self):
+        """Test calls to tasks without `coalesce` are not merged."""
+        with self.settings(CELERY_ALWAYS_EAGER=False):
+            test_task.delay(1)
+            test_task.delay(2)
+        eq_(len(_get_task_queue()), 2)
+
+    @patch('lib.post_request_task.task.PostRequestTask.original_apply_async')
+    def test_debounce(self, _mock):
+        """Test coalescing tasks are merged across requests."""
+        cache.clear()
+        with self.settings(CELERY_ALWAYS_EAGER=False,
+                           POST_REQUEST_TASK_DEBOUNCE=5):
+            test_coalesce_task.delay([1, 2], 'a')
+            request_finished.send(sender=self)
+            test_coalesce_task.delay([2, 3], 'a')
+            request_finished.send(sender=self)
+        self._verify_task_empty()
+
+        # Only the first request sent the task, with a countdown.
+        eq_(_mock.call_count, 1)
+        args, kwargs = _mock.call_args
+        eq_(kwargs, {'countdown': 10})
+        eq_(args[0], ([], 'a'))
+        assert DEBOUNCE_KWARG in args[1]
+
+        # When the task runs, it picks up the ids from both requests.
+        test_coalesce_task(*args[0], **args[1])
+        task_mock.assert_called_with([1, 2, 3], 'a')
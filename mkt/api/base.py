@@ -1,6 +1,8 @@
 import functools
 
+from django.core.paginator import InvalidPage
 from django.db.models.sql import EmptyResultSet
+from django.http import Http404
 
 import commonware.log
 from rest_framework.decorators import api_view
@@ -128,7 +130,8 @@ class MarketplaceView(object):
 
     - A implementation of paginate_queryset() that goes with our custom
       pagination handler. It does tastypie-like offset pagination instead of
-      the default page mechanism.
+      the default page mechanism, or cursor pagination when a `cursor` is
+      passed and the paginator supports it for the sort of the queryset.
     """
     def handle_exception(self, exc):
         exc._request = self.request._request
@@ -136,6 +139,19 @@ class MarketplaceView(object):
         return super(MarketplaceView, self).handle_exception(exc)
 
     def paginate_queryset(self, queryset, page_size=None):
+        cursor = self.request.QUERY_PARAMS.get('cursor')
+        if (cursor is not None and
+                getattr(self.paginator_class, 'cursor_pagination', False)):
+            paginator = self.paginator_class(
+                queryset, page_size or self.get_paginate_by(), cursor=cursor)
+            # Searches sorted by relevance ignore the cursor, and go through
+            # the usual page and offset handling below.
+            if paginator.get_sort_keys() is not None:
+                try:
+                    return paginator.page(1)
+                except InvalidPage as exc:
+                    raise Http404('Invalid cursor: %s' % exc)
+
         page = self.request.QUERY_PARAMS.get(self.page_kwarg)
         offset = self.request.QUERY_PARAMS.get('offset')
 
@@ -215,6 +215,36 @@ class ESTranslationSerializerField(TranslationSerializerField):
             obj, field_name)
 
 
+class ESFragmentField(fields.Field):
+    """
+    Wraps a field to read its value from the response fragment precomputed at
+    indexing time, that we previously attached on the object as `es_fragment`.
+
+    The parent serializer turns the stored value into the field value with
+    its `from_fragment()` method, which raises KeyError if it can't be used.
+    In that case, or if there is no fragment, the wrapped field is used.
+    """
+    def __init__(self, field, *args, **kwargs):
+        self.field = field
+        kwargs.setdefault('label', field.label)
+        kwargs.setdefault('help_text', field.help_text)
+        super(ESFragmentField, self).__init__(*args, **kwargs)
+
+    def initialize(self, parent, field_name):
+        super(ESFragmentField, self).initialize(parent, field_name)
+        self.field.initialize(parent, field_name)
+
+    def field_to_native(self, obj, field_name):
+        fragment = getattr(obj, 'es_fragment', None)
+        if fragment and field_name in fragment:
+            try:
+                return self.parent.from_fragment(field_name,
+                                                 fragment[field_name])
+            except KeyError:
+                pass
+        return self.field.field_to_native(obj, field_name)
+
+
 class GuessLanguageTranslationField(TranslationSerializerField):
     def field_from_native(self, data, files, field_name, into):
         value = data.get(field_name)
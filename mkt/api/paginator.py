@@ -1,8 +1,12 @@
+import base64
+import json
 import urlparse
 
-from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.core.paginator import (EmptyPage, InvalidPage, Page,
+                                   PageNotAnInteger, Paginator)
 from django.utils.http import urlencode
 
+from elasticsearch_dsl import F
 from rest_framework import pagination, serializers
 
 
@@ -14,7 +18,26 @@ class ESPaginator(Paginator):
     results contain the total number of results, we can take an optimistic
     slice and then adjust the count.
 
+    Passing a `cursor` (an empty string for the first page) switches to keyset
+    pagination: instead of an offset, each page is fetched with a range filter
+    starting after the sort values of the last hit of the previous page, which
+    are encoded in the `next_cursor` of the page. This keeps deep pages as
+    cheap as the first one, but only works for searches sorted on fields.
+
+    The sort fields must have a single value in every document: the range
+    filter never matches documents missing one of them, so they are left out
+    of the pages after the first, and multi-valued fields can return a
+    document on more than one page.
+
     """
+    # Whether the paginator accepts a `cursor`.
+    cursor_pagination = True
+
+    def __init__(self, *args, **kwargs):
+        self.cursor = kwargs.pop('cursor', None)
+        self.cursor_offset = 0
+        super(ESPaginator, self).__init__(*args, **kwargs)
+
     def validate_number(self, number):
         """
         Validates the given 1-based page number.
@@ -37,14 +60,96 @@ class ESPaginator(Paginator):
         assigns the count from the ES result to the Paginator.
         """
         number = self.validate_number(number)
-        bottom = (number - 1) * self.per_page
-        top = bottom + self.per_page
+        if self.cursor is not None:
+            sort_keys = self.get_sort_keys()
+            if sort_keys:
+                return self.cursor_page(sort_keys)
+            # Sorted by relevance: fall back to offsets.
+            self.cursor = None
 
         # Force the search to evaluate and then attach the count. We want to
         # avoid an extra useless query even if there are no results, so we
         # directly fetch the count from hits.
+        result = self.page_search(number).execute()
+        return self.page_from_result(number, result)
+
+    def get_sort_keys(self):
+        """
+        Returns the list of (field, descending) the search is sorted on, with
+        `id` as a tie-breaker, or None if it's sorted by score.
+        """
+        sort_keys = []
+        for key in self.object_list._sort:
+            if isinstance(key, dict):
+                field, options = key.items()[0]
+                if isinstance(options, dict):
+                    options = options.get('order')
+                descending = options == 'desc'
+            else:
+                field, descending = key, False
+            sort_keys.append((field, descending))
+
+        fields = [key[0] for key in sort_keys]
+        if not fields or '_score' in fields:
+            return None
+        if 'id' not in fields:
+            sort_keys.append(('id', False))
+        return sort_keys
+
+    def get_cursor_filter(self, sort_keys, values):
+        """
+        Returns the filter matching the hits sorted after the given values:
+        greater on the first key, or equal on the first and greater on the
+        second, etc.
+        """
+        should = []
+        for i, (field, descending) in enumerate(sort_keys):
+            must = [F('term', **{key[0]: value})
+                    for key, value in zip(sort_keys[:i], values[:i])]
+            must.append(F('range', **{
+                field: {'lt' if descending else 'gt': values[i]}}))
+            should.append(F('bool', must=must))
+        return F('bool', should=should)
+
+    def cursor_page(self, sort_keys):
+        """
+        Returns the page object starting after `self.cursor`.
+        """
+        search = self.object_list.sort(*[
+            {field: {'order': 'desc' if descending else 'asc'}}
+            for field, descending in sort_keys])
+        if self.cursor:
+            values, self.cursor_offset = decode_cursor(self.cursor)
+            if len(values) != len(sort_keys):
+                raise InvalidPage('That cursor is invalid')
+            search = search.filter(self.get_cursor_filter(sort_keys, values))
+
+        result = search[0:self.per_page].execute()
+        page = Page(result.hits, 1, self)
+        # The total only counts the hits after the cursor.
+        self._count = self.cursor_offset + result.hits.total
+
+        page.next_cursor = None
+        if result.hits.total > len(result.hits) > 0:
+            page.next_cursor = encode_cursor(
+                list(result.hits[-1].meta.sort),
+                self.cursor_offset + len(result.hits))
+        return page
+
+    def page_search(self, number):
+        """
+        Returns the search fetching the given 1-based page, for callers that
+        want to execute it themselves, e.g. in a multi-search.
+        """
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        return self.object_list[bottom:top]
+
+    def page_from_result(self, number, result):
+        """
+        Returns a page object from the ES result of `page_search(number)`.
+        """
         # Overwrite `object_list` with the list of ES results.
-        result = self.object_list[bottom:top].execute()
         page = Page(result.hits, number, self)
         # Update the `_count`.
         self._count = page.object_list.total
@@ -60,6 +165,20 @@ class ESPaginator(Paginator):
         return page
 
 
+def encode_cursor(values, offset):
+    """Returns the opaque cursor for the given sort values and offset."""
+    return base64.urlsafe_b64encode(json.dumps([values, offset]))
+
+
+def decode_cursor(cursor):
+    """Returns the sort values and offset of a cursor."""
+    try:
+        values, offset = json.loads(base64.urlsafe_b64decode(str(cursor)))
+        return list(values), int(offset)
+    except (TypeError, ValueError):
+        raise InvalidPage('That cursor is invalid')
+
+
 class MetaSerializer(serializers.Serializer):
     """
     Serializer for the 'meta' dict holding pagination info that allows to stay
@@ -88,15 +207,32 @@ class MetaSerializer(serializers.Serializer):
         per_page = page.paginator.per_page
         params = {'offset': number * per_page, 'limit': per_page}
         request_data = request and request.GET.dict() or {}
+        # A cursor would take precedence over the offset.
+        request_data.pop('cursor', None)
         return self.replace_query_params(url, request_data, params)
 
+    def get_cursor_link(self, page):
+        request = self.context.get('request')
+        url = request and request.get_full_path() or ''
+        request_data = request and request.GET.dict() or {}
+        request_data.pop('offset', None)
+        request_data.pop('page', None)
+        params = {'cursor': page.next_cursor, 'limit': page.paginator.per_page}
+        return self.replace_query_params(url, request_data, params)
+
+    def is_cursor_page(self, page):
+        return getattr(page.paginator, 'cursor', None) is not None
+
     def get_next(self, page):
+        if self.is_cursor_page(page):
+            return page.next_cursor and self.get_cursor_link(page)
         if not page.has_next():
             return None
         return self.get_offset_link_for_page(page, page.next_page_number())
 
     def get_previous(self, page):
-        if not page.has_previous():
+        # Cursors only go forward.
+        if self.is_cursor_page(page) or not page.has_previous():
             return None
         return self.get_offset_link_for_page(page, page.previous_page_number())
 
@@ -104,6 +240,8 @@ class MetaSerializer(serializers.Serializer):
         return page.paginator.count
 
     def get_offset(self, page):
+        if self.is_cursor_page(page):
+            return page.paginator.cursor_offset
         index = page.start_index()
         if index > 0:
             # start_index() is 1-based, and we want a 0-based offset, so we
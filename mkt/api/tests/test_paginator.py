@@ -1,14 +1,14 @@
 # -*- coding: utf-8 -*-
 from urlparse import urlparse
 
-from django.core.paginator import Paginator
+from django.core.paginator import InvalidPage, Paginator
 from django.http import QueryDict
 from django.test.client import RequestFactory
 
 from nose.tools import eq_
 
 from mkt.api.paginator import ESPaginator, MetaSerializer
-from mkt.site.tests import ESTestCase, TestCase
+from mkt.site.tests import app_factory, ESTestCase, TestCase
 from mkt.webapps.indexers import WebappIndexer
 
 
@@ -31,6 +31,40 @@ class TestSearchPaginator(ESTestCase):
 
         es.search = orig_search
 
+    def test_cursor(self):
+        ids = sorted([app_factory().pk for i in range(5)], reverse=True)
+        self.refresh('webapp')
+        search = WebappIndexer.search().sort('-id')
+
+        seen, cursor = [], ''
+        while cursor is not None:
+            page = ESPaginator(search, 2, cursor=cursor).page(1)
+            eq_(page.paginator.count, len(ids))
+            eq_(page.paginator.cursor_offset, len(seen))
+            seen += [hit.id for hit in page]
+            cursor = page.next_cursor
+        eq_(seen, ids)
+
+        url = '/api/whatever/?cursor=&offset=2'
+        page = ESPaginator(search, 2, cursor='').page(1)
+        meta = MetaSerializer(
+            page, context={'request': RequestFactory().get(url)}).data
+        eq_(QueryDict(urlparse(meta['next']).query),
+            QueryDict('limit=2&cursor=%s' % page.next_cursor))
+        eq_(meta['previous'], None)
+
+    def test_cursor_sorted_by_score(self):
+        paginator = ESPaginator(WebappIndexer.search(), 2, cursor='')
+        paginator.page(1)
+        # Falls back to offsets.
+        eq_(paginator.cursor, None)
+
+    def test_invalid_cursor(self):
+        paginator = ESPaginator(WebappIndexer.search().sort('-id'), 2,
+                                cursor='nope')
+        with self.assertRaises(InvalidPage):
+            paginator.page(1)
+
 
 class TestMetaSerializer(TestCase):
     def setUp(self):
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from datetime import datetime
+
+from django.db import models, migrations
+from django.conf import settings
+
+import mkt
+
+
+def add_review_counts(apps, schema_editor):
+    ActivityLog = apps.get_model('developers', 'ActivityLog')
+    ReviewCount = apps.get_model('developers', 'ReviewCount')
+    month = datetime.now().date().replace(day=1)
+    logs = (ActivityLog.objects.filter(action__in=mkt.LOG_REVIEW_QUEUE,
+                                       user__isnull=False)
+                               .values_list('user').order_by())
+    monthly = dict(logs.filter(created__gte=month)
+                       .annotate(models.Count('id')))
+    ReviewCount.objects.bulk_create(
+        [ReviewCount(user_id=user_id, total=total,
+                     month=month if user_id in monthly else None,
+                     monthly=monthly.get(user_id, 0))
+         for user_id, total in logs.annotate(models.Count('id'))],
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('developers', '0004_auto_20150824_0820'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewCount',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('modified', models.DateTimeField(auto_now=True)),
+                ('total', models.IntegerField(default=0, db_index=True)),
+                ('month', models.DateField(null=True)),
+                ('monthly', models.IntegerField(default=0)),
+                ('user', models.OneToOneField(related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'log_activity_review_counts',
+            },
+            bases=(models.Model,),
+        ),
+        migrations.AlterIndexTogether(
+            name='reviewcount',
+            index_together=set([('month', 'monthly')]),
+        ),
+        migrations.RunPython(add_review_counts),
+    ]
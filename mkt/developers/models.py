@@ -11,6 +11,7 @@ from django.apps import apps
 from django.conf import settings
 from django.core.urlresolvers import reverse
 from django.db import models
+from django.db.models import F, Q
 from django.utils.safestring import mark_safe
 
 import bleach
@@ -323,38 +324,45 @@ class ActivityLogManager(ManagerBase):
                   .exclude(user__id=settings.TASK_USER_ID))
 
     def total_reviews(self, webapp=False):
-        qs = self._by_type(webapp)
         """Return the top users, and their # of reviews."""
-        return (qs.values('user', 'user__display_name', 'user__email')
-                  .filter(action__in=mkt.LOG_REVIEW_QUEUE)
-                  .exclude(user__id=settings.TASK_USER_ID)
-                  .annotate(approval_count=models.Count('id'))
-                  .order_by('-approval_count'))
+        return self._review_counts('total')
 
     def monthly_reviews(self, webapp=False):
         """Return the top users for the month, and their # of reviews."""
-        qs = self._by_type(webapp)
-        now = datetime.now()
-        created_date = datetime(now.year, now.month, 1)
-        return (qs.values('user', 'user__display_name', 'user__email')
-                  .filter(created__gte=created_date,
-                          action__in=mkt.LOG_REVIEW_QUEUE)
-                  .exclude(user__id=settings.TASK_USER_ID)
-                  .annotate(approval_count=models.Count('id'))
-                  .order_by('-approval_count'))
-
-    def user_position(self, values_qs, user):
-        try:
-            return next(i for (i, d) in enumerate(list(values_qs))
-                        if d.get('user') == user.id) + 1
-        except StopIteration:
-            return None
+        return self._review_counts('monthly', month=ReviewCount.this_month())
 
     def total_reviews_user_position(self, user, webapp=False):
-        return self.user_position(self.total_reviews(webapp), user)
+        return self._review_position('total', user)
 
     def monthly_reviews_user_position(self, user, webapp=False):
-        return self.user_position(self.monthly_reviews(webapp), user)
+        return self._review_position('monthly', user,
+                                     month=ReviewCount.this_month())
+
+    def _review_counts(self, field, **filters):
+        """
+        Returns the ReviewCount values of the users with reviews, ordered by
+        their `field` count, which is also in `approval_count`.
+        """
+        return (ReviewCount.objects
+                .filter(**filters)
+                .filter(**{'%s__gt' % field: 0})
+                .exclude(user=settings.TASK_USER_ID)
+                .extra(select={'approval_count': '%s.%s' % (
+                    ReviewCount._meta.db_table, field)})
+                .values('user', 'user__display_name', 'user__email',
+                        'approval_count')
+                .order_by('-%s' % field, 'user'))
+
+    def _review_position(self, field, user, **filters):
+        """Returns the position of the user in _review_counts(), or None."""
+        qs = (ReviewCount.objects.filter(**filters)
+                                 .exclude(user=settings.TASK_USER_ID))
+        count = list(qs.filter(user=user).values_list(field, flat=True))
+        if not count or count[0] <= 0:
+            return None
+        ahead = qs.filter(Q(**{'%s__gt' % field: count[0]}) |
+                          Q(**{field: count[0], 'user__lt': user.id}))
+        return ahead.count() + 1
 
     def _by_type(self, webapp=False):
         qs = super(ActivityLogManager, self).get_queryset()
@@ -521,6 +529,80 @@ class ActivityLog(ModelBase):
         return self
 
 
+class ReviewCount(ModelBase):
+    """
+    The number of review actions logged by a user, for all time and for the
+    month starting on `month`, the latest one the user reviewed in.
+    Maintained by the ActivityLog signals, so the reviewer rankings don't go
+    through the whole activity log.
+    """
+    user = models.OneToOneField(UserProfile, related_name='+')
+    total = models.IntegerField(default=0, db_index=True)
+    month = models.DateField(null=True)
+    monthly = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'log_activity_review_counts'
+        index_together = (('month', 'monthly'),)
+
+    @staticmethod
+    def this_month():
+        return datetime.now().date().replace(day=1)
+
+    @classmethod
+    def add(cls, user_id, created, count):
+        """
+        Adds `count` reviews made at `created` to the counts of the user. The
+        monthly count only follows the latest month, reviews of earlier months
+        only count in the total.
+        """
+        month = created.date().replace(day=1)
+        if count > 0:
+            cls.objects.get_or_create(user_id=user_id)
+        rows = cls.objects.filter(user=user_id)
+        rows.update(total=F('total') + count)
+        if (rows.filter(month=month).update(monthly=F('monthly') + count) or
+                count < 0):
+            return
+        if not (rows.filter(Q(month=None) | Q(month__lt=month))
+                    .update(month=month, monthly=count)):
+            # Another review started the month in the meantime.
+            rows.filter(month=month).update(monthly=F('monthly') + count)
+
+
+def take_back_review_count(sender, instance, **kwargs):
+    """
+    Takes a review action back from the counts before its log is changed or
+    deleted, it is counted again once the log is saved.
+    """
+    if kwargs.get('raw') or not instance.pk:
+        return
+    old = list(ActivityLog.objects.filter(pk=instance.pk).values_list(
+        'user', 'action', 'created'))
+    if old:
+        user_id, action, created = old[0]
+        if user_id and action in mkt.LOG_REVIEW_QUEUE:
+            ReviewCount.add(user_id, created, -1)
+
+
+def update_review_count(sender, instance, **kwargs):
+    if kwargs.get('raw'):
+        return
+    if instance.user_id and instance.action in mkt.LOG_REVIEW_QUEUE:
+        ReviewCount.add(instance.user_id, instance.created, 1)
+
+
+models.signals.pre_save.connect(
+    take_back_review_count, sender=ActivityLog,
+    dispatch_uid='activitylog-save-take-back-review')
+models.signals.pre_delete.connect(
+    take_back_review_count, sender=ActivityLog,
+    dispatch_uid='activitylog-delete-take-back-review')
+models.signals.post_save.connect(
+    update_review_count, sender=ActivityLog,
+    dispatch_uid='activitylog-save-review-count')
+
+
 # TODO: remove once we migrate to CommAtttachment (ngoke).
 class ActivityLogAttachment(ModelBase):
     """
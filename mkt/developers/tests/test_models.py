@@ -80,6 +80,43 @@ class TestActivityLogCount(mkt.site.tests.TestCase):
         eq_(result[0]['approval_count'], 1)
         eq_(result[0]['user'], self.user.pk)
 
+    def test_total_delete(self):
+        log = mkt.log(mkt.LOG['APPROVE_VERSION'], Webapp.objects.get())
+        log.delete()
+        eq_(len(ActivityLog.objects.total_reviews()), 0)
+        eq_(len(ActivityLog.objects.monthly_reviews()), 0)
+
+    def test_task_user(self):
+        with self.settings(TASK_USER_ID=self.user.pk):
+            mkt.log(mkt.LOG['APPROVE_VERSION'], Webapp.objects.get())
+            eq_(len(ActivityLog.objects.total_reviews()), 0)
+
+    def test_user_position(self):
+        user2 = user_factory()
+        user3 = user_factory()
+        app = Webapp.objects.get()
+        for x in range(0, 3):
+            mkt.log(mkt.LOG['APPROVE_VERSION'], app, user=user2)
+        mkt.log(mkt.LOG['APPROVE_VERSION'], app, user=user3)
+        log = mkt.log(mkt.LOG['APPROVE_VERSION'], app, user=user3)
+        log.update(created=self.lm)
+        mkt.log(mkt.LOG['APPROVE_VERSION'], app)
+
+        eq_([r['user'] for r in ActivityLog.objects.total_reviews()],
+            [user2.pk, user3.pk, self.user.pk])
+        eq_(ActivityLog.objects.total_reviews_user_position(user3), 2)
+
+        # Ties are ordered by user.
+        monthly = ActivityLog.objects.monthly_reviews()
+        eq_([r['user'] for r in monthly],
+            [user2.pk] + sorted([self.user.pk, user3.pk]))
+        eq_([r['approval_count'] for r in monthly], [3, 1, 1])
+        eq_(ActivityLog.objects.monthly_reviews_user_position(user2), 1)
+        eq_(ActivityLog.objects.monthly_reviews_user_position(user3),
+            2 if user3.pk < self.user.pk else 3)
+        eq_(ActivityLog.objects.monthly_reviews_user_position(
+            user_factory()), None)
+
     def test_log_admin(self):
         mkt.log(mkt.LOG['OBJECT_EDITED'], Webapp.objects.get())
         eq_(len(ActivityLog.objects.admin_events()), 1)
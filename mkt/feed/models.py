@@ -24,16 +24,19 @@ import mkt.regions
 from mkt.constants.categories import CATEGORY_CHOICES
 from mkt.feed import indexers
 from mkt.ratings.validators import validate_rating
+from mkt.search.signals import index_updated
 from mkt.site.decorators import use_master
 from mkt.site.fields import ColorField
 from mkt.site.models import ManagerBase, ModelBase
 from mkt.translations.fields import PurifiedField, TranslatedField, save_signal
+from mkt.webapps.indexers import WebappIndexer
 from mkt.webapps.models import clean_slug, Preview, Webapp
 from mkt.webapps.tasks import index_webapps
 
 from .constants import (BRAND_LAYOUT_CHOICES, BRAND_TYPE_CHOICES,
                         COLLECTION_TYPE_CHOICES,
                         FEEDAPP_TYPE_CHOICES)
+from .utils import in_snapshots, refresh_snapshots
 
 
 class BaseFeedCollection(ModelBase):
@@ -447,6 +450,7 @@ def update_search_index(sender, instance, **kw):
           dispatch_uid='feeditem.search.unindex')
 def delete_search_index(sender, instance, **kw):
     instance.get_indexer().unindex(instance.id)
+    refresh_snapshots()
 
 
 # Save translations when saving instance with translated fields.
@@ -476,3 +480,21 @@ def remove_memberships(*args, **kwargs):
 
 post_delete.connect(remove_memberships, sender=Webapp, weak=False,
                     dispatch_uid='cleanup_feed_membership')
+
+
+# Refresh the feed snapshots once the feed items or their apps are indexed.
+@receiver(index_updated, sender=indexers.FeedAppIndexer,
+          dispatch_uid='feedapp.snapshots.refresh')
+@receiver(index_updated, sender=indexers.FeedBrandIndexer,
+          dispatch_uid='feedbrand.snapshots.refresh')
+@receiver(index_updated, sender=indexers.FeedCollectionIndexer,
+          dispatch_uid='feedcollection.snapshots.refresh')
+@receiver(index_updated, sender=indexers.FeedShelfIndexer,
+          dispatch_uid='feedshelf.snapshots.refresh')
+@receiver(index_updated, sender=indexers.FeedItemIndexer,
+          dispatch_uid='feeditem.snapshots.refresh')
+@receiver(index_updated, sender=WebappIndexer,
+          dispatch_uid='webapp.snapshots.refresh')
+def refresh_snapshots_after_indexing(sender, ids, **kw):
+    if sender is not WebappIndexer or any(in_snapshots(pk) for pk in ids):
+        refresh_snapshots()
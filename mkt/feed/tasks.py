@@ -1,7 +1,16 @@
 import logging
 from celery import task
 
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.urlresolvers import reverse
+from django.test.client import RequestFactory
+from django.utils import translation
+
+import mkt
+from lib.post_request_task.task import task as post_request_task
 from mkt.feed.models import FeedApp, FeedCollection
+from mkt.feed.utils import forget_snapshots, get_snapshot_combinations
 
 log = logging.getLogger('z.feed')
 
@@ -30,3 +39,34 @@ def _migrate_collection_colors(ids, model):
             obj.update(color=color)
             log.info('Migrated %s:%s from %s to %s' %
                      (model, unicode(obj.id), obj.background_color, color))
+
+
+@post_request_task
+def refresh_feed_snapshots():
+    """
+    Rebuild the feed snapshots of the combinations requested so far, up to
+    FEED_SNAPSHOT_MAX_REFRESH of them. The others are dropped, to be rebuilt
+    on their next request.
+    """
+    from mkt.feed.views import FeedView
+    view = FeedView.as_view(refresh_snapshot=True)
+    url = reverse('api-v2:feed.get')
+
+    combinations = get_snapshot_combinations()
+    limit = settings.FEED_SNAPSHOT_MAX_REFRESH
+    if len(combinations) > limit:
+        log.info('Dropping %s feed snapshots' % (len(combinations) - limit))
+        forget_snapshots(combinations[limit:])
+        combinations = combinations[:limit]
+    log.info('Refreshing %s feed snapshots' % len(combinations))
+    for params in combinations:
+        lang = params['lang']
+        request = RequestFactory().get(url, dict(
+            (k, v) for k, v in params.items() if k != 'lang'))
+        request.API = True
+        request.API_VERSION = 2
+        request.LANG = lang
+        request.REGION = mkt.regions.REGIONS_DICT[params['region']]
+        request.user = AnonymousUser()
+        with translation.override(lang):
+            view(request)
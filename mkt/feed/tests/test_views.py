@@ -2,7 +2,9 @@
 import json
 import os
 
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
+from django.test.utils import override_settings
 from django.utils.text import slugify
 
 import mock
@@ -18,10 +20,13 @@ from mkt.api.tests.test_oauth import RestOAuth
 from mkt.constants import applications
 from mkt.feed.models import (FeedApp, FeedBrand, FeedCollection, FeedItem,
                              FeedShelf)
+from mkt.feed.tasks import refresh_feed_snapshots
 from mkt.feed.tests.test_models import FeedAppMixin, FeedTestMixin
+from mkt.feed.utils import get_snapshot_combinations, SNAPSHOT_LOCK_KEY
 from mkt.feed.views import FeedView
 from mkt.fireplace.tests.test_views import assert_fireplace_app
 from mkt.operators.models import OperatorPermission
+from mkt.search.utils import multi_search
 from mkt.site.fixtures import fixture
 from mkt.site.tests import app_factory, ESTestCase, TestCase
 from mkt.tags.models import Tag
@@ -1548,6 +1553,83 @@ class TestFeedView(BaseTestFeedESView, BaseTestFeedItemViewSet):
         eq_(data['objects'][0]['item_type'], 'shelf')
         eq_(data['objects'][0]['shelf']['id'], shelf.id)
 
+    @mock.patch('mkt.feed.views.multi_search', wraps=multi_search)
+    def test_restofworld_fallback_single_feed_query(self, multi_search_mock):
+        feed_items = self.feed_factory()
+        self.featured_mow_factory(n_www=2)
+        res, data = self._get(region='us')
+        eq_(len(data['objects']), len(feed_items))
+        eq_(len(data['websites']), 2)
+        # Region feed, RESTOFWORLD feed and websites in a single request.
+        eq_(multi_search_mock.call_count, 1)
+        eq_(len(multi_search_mock.call_args[0][0]), 3)
+
+    @override_settings(FEED_SNAPSHOT_TIMEOUT=60)
+    @mock.patch('mkt.feed.views.statsd.incr')
+    def test_snapshot(self, incr_mock):
+        self.feed_factory()
+        res1, data1 = self._get()
+        incr_mock.assert_called_with('mkt.feed.view.snapshot.miss')
+        res2, data2 = self._get()
+        incr_mock.assert_called_with('mkt.feed.view.snapshot.hit')
+        eq_(data1, data2)
+
+        # Other carriers get their own snapshot.
+        self._get(carrier='tmn')
+        incr_mock.assert_called_with('mkt.feed.view.snapshot.miss')
+
+    @override_settings(FEED_SNAPSHOT_TIMEOUT=60)
+    @mock.patch('mkt.feed.views.statsd.incr')
+    def test_no_snapshot_when_paginating(self, incr_mock):
+        self.feed_factory()
+        self._get(offset=1)
+        ok_(not incr_mock.called)
+
+    @override_settings(FEED_SNAPSHOT_TIMEOUT=60)
+    def test_snapshot_refresh(self):
+        self.feed_item_factory()
+        res, data = self._get()
+        eq_(len(data['objects']), 1)
+
+        self.feed_item_factory()
+        self._refresh()
+        refresh_feed_snapshots()
+        res, data = self._get()
+        eq_(len(data['objects']), 2)
+
+    @override_settings(FEED_SNAPSHOT_TIMEOUT=60, FEED_SNAPSHOT_MAX_REFRESH=1)
+    @mock.patch('mkt.feed.views.statsd.incr')
+    def test_snapshot_refresh_limit(self, incr_mock):
+        self.feed_item_factory()
+        self._get()
+        self._get(carrier='tmn')
+        eq_(len(get_snapshot_combinations()), 2)
+
+        refresh_feed_snapshots()
+        # Only one combination is refreshed, the other one is dropped.
+        eq_(len(get_snapshot_combinations()), 1)
+        kept = get_snapshot_combinations()[0]['carrier']
+        self._get(carrier=kept)
+        incr_mock.assert_called_with('mkt.feed.view.snapshot.hit')
+        self._get(carrier='tmn' if kept == self.carrier else self.carrier)
+        incr_mock.assert_called_with('mkt.feed.view.snapshot.miss')
+        eq_(len(get_snapshot_combinations()), 2)
+
+    @override_settings(FEED_SNAPSHOT_TIMEOUT=60)
+    @mock.patch('mkt.feed.utils.time.sleep')
+    @mock.patch('mkt.feed.views.statsd.incr')
+    def test_no_snapshot_when_locked(self, incr_mock, sleep_mock):
+        self.feed_item_factory()
+        cache.add(SNAPSHOT_LOCK_KEY, True)
+        self._get()
+        eq_(get_snapshot_combinations(), [])
+        self._get()
+        incr_mock.assert_called_with('mkt.feed.view.snapshot.miss')
+
+        cache.delete(SNAPSHOT_LOCK_KEY)
+        self._get()
+        eq_(len(get_snapshot_combinations()), 1)
+
     def test_shelf_only_404(self):
         shelf = self.feed_shelf_factory()
         shelf.feeditem_set.create(region=mkt.regions.USA.id,
@@ -0,0 +1,119 @@
+import hashlib
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+log = logging.getLogger('z.feed')
+
+SNAPSHOT_COMBINATIONS_KEY = 'feed-snapshot:combinations'
+SNAPSHOT_APP_IDS_KEY = 'feed-snapshot:app-ids'
+SNAPSHOT_LOCK_KEY = 'feed-snapshot:lock'
+SNAPSHOT_LOCK_TIMEOUT = 5
+SNAPSHOT_LOCK_ATTEMPTS = 10
+
+
+def snapshot_key(params):
+    """Returns the cache key of the feed snapshot for the given params."""
+    return 'feed-snapshot:%s' % hashlib.md5(
+        json.dumps(sorted(params.items()))).hexdigest()
+
+
+def get_snapshot(params):
+    """
+    Returns the feed snapshot for the given params, a dict holding the
+    response `data`, its `status` and the time it was `created` at, or None.
+    """
+    return cache.get(snapshot_key(params))
+
+
+def _update_registry(update):
+    """
+    Calls `update` with the combinations and app ids of the feed snapshots,
+    and stores them back, while holding a lock so that concurrent updates
+    don't overwrite each other. Returns False if the lock couldn't be taken.
+    """
+    for attempt in range(SNAPSHOT_LOCK_ATTEMPTS):
+        if cache.add(SNAPSHOT_LOCK_KEY, True, SNAPSHOT_LOCK_TIMEOUT):
+            break
+        time.sleep(0.05)
+    else:
+        log.warning('Could not lock the feed snapshot combinations.')
+        return False
+    try:
+        combinations = cache.get(SNAPSHOT_COMBINATIONS_KEY) or {}
+        app_ids = cache.get(SNAPSHOT_APP_IDS_KEY) or set()
+        update(combinations, app_ids)
+        cache.set_many({SNAPSHOT_COMBINATIONS_KEY: combinations,
+                        SNAPSHOT_APP_IDS_KEY: app_ids},
+                       settings.FEED_SNAPSHOT_TIMEOUT)
+    finally:
+        cache.delete(SNAPSHOT_LOCK_KEY)
+    return True
+
+
+def set_snapshot(params, data, status, app_ids):
+    """
+    Stores the feed snapshot for the given params, and remembers the params
+    and the apps of the snapshot so that it can be refreshed when the feed or
+    those apps change. The snapshot isn't stored if they can't be remembered,
+    as it would never be refreshed.
+    """
+    key = snapshot_key(params)
+
+    def register(combinations, snapshot_app_ids):
+        combinations.setdefault(key, {'params': params,
+                                      'registered': time.time()})
+        snapshot_app_ids.update(app_ids)
+
+    if (key not in (cache.get(SNAPSHOT_COMBINATIONS_KEY) or {}) or
+            not (cache.get(SNAPSHOT_APP_IDS_KEY) or set()).issuperset(
+                app_ids)):
+        if not _update_registry(register):
+            return
+    cache.set(key, {'data': data, 'status': status, 'created': time.time()},
+              settings.FEED_SNAPSHOT_TIMEOUT)
+
+
+def forget_snapshots(combinations):
+    """
+    Deletes the feed snapshots for the given list of params, which will be
+    rendered and remembered again on their next request.
+    """
+    keys = [snapshot_key(params) for params in combinations]
+
+    def forget(combinations, snapshot_app_ids):
+        for key in keys:
+            combinations.pop(key, None)
+
+    cache.delete_many(keys)
+    _update_registry(forget)
+
+
+def get_snapshot_combinations():
+    """
+    Returns the list of params of the feed snapshots to refresh, the ones
+    requested first coming first.
+    """
+    combinations = (cache.get(SNAPSHOT_COMBINATIONS_KEY) or {}).values()
+    return [c['params'] for c in
+            sorted(combinations, key=lambda c: c['registered'])]
+
+
+def in_snapshots(app_id):
+    """Returns whether the given app is part of any feed snapshot."""
+    return app_id in (cache.get(SNAPSHOT_APP_IDS_KEY) or set())
+
+
+def refresh_snapshots():
+    """
+    Schedules the refresh of the feed snapshots, after a delay for ES to
+    refresh the index. Call it once the changes have been written to ES.
+    """
+    from mkt.feed.tasks import refresh_feed_snapshots
+    if settings.FEED_SNAPSHOT_TIMEOUT:
+        refresh_feed_snapshots.apply_async(
+            countdown=settings.FEED_SNAPSHOT_REFRESH_DELAY)
@@ -1,6 +1,8 @@
+import time
 from datetime import datetime
 
 from django.conf import settings
+from django.core.paginator import InvalidPage
 from django.db.models import Q
 from django.db.transaction import non_atomic_requests
 from django.utils.datastructures import MultiValueDictKeyError
@@ -36,6 +38,7 @@ from mkt.feed.indexers import FeedItemIndexer
 from mkt.operators.models import OperatorPermission
 from mkt.search.filters import (DeviceTypeFilter, ProfileFilter,
                                 PublicContentFilter, RegionFilter)
+from mkt.search.utils import multi_search
 from mkt.site.storage_utils import public_storage
 from mkt.site.utils import get_file_response
 from mkt.webapps.indexers import WebappIndexer
@@ -51,6 +54,7 @@ from .serializers import (FeedAppESSerializer, FeedAppSerializer,
                           FeedCollectionESSerializer, FeedCollectionSerializer,
                           FeedItemESSerializer, FeedItemSerializer,
                           FeedShelfESSerializer, FeedShelfSerializer)
+from .utils import get_snapshot, refresh_snapshots, set_snapshot
 
 
 log = commonware.log.getLogger('z.feed')
@@ -260,6 +264,7 @@ class FeedBuilderView(CORSMixin, APIView):
         feed_item_ids = list(FeedItem.objects.filter(region__in=regions)
                              .values_list('id', flat=True))
         FeedItem.get_indexer().index_ids(feed_item_ids, no_delay=True)
+        refresh_snapshots()
 
         return response.Response(status=status.HTTP_201_CREATED)
 
@@ -740,7 +745,8 @@ class FeedElementSearchView(BaseFeedESView):
 class FeedView(MarketplaceView, BaseFeedESView, generics.GenericAPIView):
     """
     THE feed view. It hits ES with:
-    - a weighted function score query to get feed items
+    - a multi-search getting the feed items for the region and RESTOFWORLD
+      (weighted function score queries) and the featured websites
     - a filter to deserialize feed elements
     - a filter to deserialize apps
     """
@@ -748,6 +754,11 @@ class FeedView(MarketplaceView, BaseFeedESView, generics.GenericAPIView):
     cors_allowed_methods = ('get',)
     paginator_class = ESPaginator
     permission_classes = []
+    # Query params a feed snapshot can be built for, see `get()`.
+    snapshot_params = ('carrier', 'dev', 'device', 'filtering', 'lang',
+                       'region')
+    # Set by the task refreshing the snapshots to bypass the current ones.
+    refresh_snapshot = False
 
     def get_es_feed_query(self, sq, region=mkt.regions.RESTOFWORLD.id,
                           carrier=None, original_region=None):
@@ -824,7 +835,7 @@ class FeedView(MarketplaceView, BaseFeedESView, generics.GenericAPIView):
         """
         return int(datetime.now().strftime('%Y%m%d'))
 
-    def get_featured_websites(self):
+    def get_featured_websites_query(self):
         """
         Get up to 11 featured MOWs for the request's region. If less than 11
         are available, make up the difference with globally-featured MOWs.
@@ -841,65 +852,87 @@ class FeedView(MarketplaceView, BaseFeedESView, generics.GenericAPIView):
                 es_function.BoostFactor(value=100.0, filter=region_filter)
             ],
         )
-        es = Search(using=WebsiteIndexer.get_es())[:11]
-        results = es.query(mow_query).execute().hits
-        return ESWebsiteSerializer(results, many=True).data
+        es = Search(using=WebsiteIndexer.get_es(),
+                    index=WebsiteIndexer.get_index())[:11]
+        return es.query(mow_query)
 
-    def _check_empty_feed(self, items, rest_of_world):
+    def _check_empty_feed(self, items):
         """
-        Return -1 if feed is empty and we are already falling back to RoW.
-        Return 0 if feed is empty and we are not falling back to RoW yet.
-        Return 1 if at least one feed item and the only feed item is not shelf.
+        Return False if feed is empty or if its only feed item is a shelf.
         """
-        if not items or (len(items) == 1 and items[0].get('shelf')):
-            # Empty feed.
-            if rest_of_world:
-                return -1
-            return 0
-        return 1
-
-    def _handle_empty_feed(self, empty_feed_code, region, request, args,
-                           kwargs):
+        return bool(items) and not (len(items) == 1 and items[0].get('shelf'))
+
+    def get_page_number(self):
+        """
+        Return the requested page number, handling tastypie-style offsets like
+        `paginate_queryset()` does.
         """
-        If feed is empty, this method handles appropriately what to return.
-        If empty_feed_code == 0: try to fallback to RoW.
-        If empty_feed_code == -1: 404.
+        page = self.request.QUERY_PARAMS.get(self.page_kwarg)
+        offset = self.request.QUERY_PARAMS.get('offset')
+        if page is None and offset is not None:
+            try:
+                page = int(offset) / self.get_paginate_by() + 1
+            except ValueError:
+                pass  # Swallow and ignore invalid input.
+        return page or 1
+
+    def get_feed_pages(self, region, carrier):
         """
-        if empty_feed_code == 0:
-            return self._get(request, rest_of_world=True,
-                             original_region=region, *args, **kwargs)
-        return response.Response(status=status.HTTP_404_NOT_FOUND)
+        Fetch the requested page of the region feed, the page of the
+        RESTOFWORLD feed to fall back to if the region feed is empty, and the
+        featured websites, all in a single ES request.
 
-    def _get(self, request, rest_of_world=False, original_region=None,
-             *args, **kwargs):
+        Return the list of feed pages to try in order and the websites.
+        """
         es = FeedItemIndexer.get_es()
+        page_size = self.get_paginate_by()
+        paginators = [self.paginator_class(
+            self.get_es_feed_query(FeedItemIndexer.search(using=es),
+                                   region=region, carrier=carrier),
+            page_size)]
+        if region != mkt.regions.RESTOFWORLD.id:
+            paginators.append(self.paginator_class(
+                self.get_es_feed_query(FeedItemIndexer.search(using=es),
+                                       region=mkt.regions.RESTOFWORLD.id,
+                                       carrier=carrier,
+                                       original_region=region),
+                page_size))
+
+        try:
+            number = paginators[0].validate_number(self.get_page_number())
+        except InvalidPage:
+            raise Http404('Invalid page.')
+        searches = [paginator.page_search(number) for paginator in paginators]
+        searches.append(self.get_featured_websites_query())
+        with statsd.timer('mkt.feed.view.feed_query'):
+            results = multi_search(searches, using=es)
+        websites = results.pop().hits
+
+        pages = []
+        for i, (paginator, result) in enumerate(zip(paginators, results)):
+            try:
+                pages.append(paginator.page_from_result(number, result))
+            except InvalidPage as exc:
+                if not i:
+                    raise Http404('Invalid page (%s): %s' % (number, exc))
+        return pages, websites
+
+    def _get(self, request, *args, **kwargs):
+        self.app_ids = []
 
         # Parse region.
-        if rest_of_world:
-            region = mkt.regions.RESTOFWORLD.id
-        else:
-            region = request.REGION.id
+        region = request.REGION.id
         # Parse carrier.
         carrier = None
         q = request.QUERY_PARAMS
         if q.get('carrier') and q['carrier'] in mkt.carriers.CARRIER_MAP:
             carrier = mkt.carriers.CARRIER_MAP[q['carrier']].id
 
-        # Fetch FeedItems.
-        sq = self.get_es_feed_query(FeedItemIndexer.search(using=es),
-                                    region=region, carrier=carrier,
-                                    original_region=original_region)
-        # The paginator triggers the ES request.
-        with statsd.timer('mkt.feed.view.feed_query'):
-            feed_items = self.paginate_queryset(sq)
-        feed_ok = self._check_empty_feed(feed_items, rest_of_world)
-        if feed_ok != 1:
-            return self._handle_empty_feed(feed_ok, region, request, args,
-                                           kwargs)
-
-        # Build the meta object.
-        meta = mkt.api.paginator.CustomPaginationSerializer(
-            feed_items, context={'request': request}).data['meta']
+        # Fetch FeedItems, for the region and RESTOFWORLD at once.
+        pages, websites = self.get_feed_pages(region, carrier)
+        pages = [page for page in pages if self._check_empty_feed(page)]
+        if not pages:
+            return response.Response(status=status.HTTP_404_NOT_FOUND)
 
         # Set up serializer context.
         feed_element_map = {
@@ -909,10 +942,14 @@ class FeedView(MarketplaceView, BaseFeedESView, generics.GenericAPIView):
             feed.FEED_TYPE_SHELF: {},
         }
 
-        # Fetch feed elements to attach to FeedItems later.
+        # Fetch feed elements to attach to FeedItems later. The elements of
+        # the RESTOFWORLD feed are fetched in the same request in case the
+        # region feed is emptied by the app filtering.
         apps = []
         sq = self.get_es_feed_element_query(
-            Search(using=es, index=self.get_feed_element_index()), feed_items)
+            Search(using=FeedItemIndexer.get_es(),
+                   index=self.get_feed_element_index()),
+            [feed_item for page in pages for feed_item in page])
         with statsd.timer('mkt.feed.view.feed_element_query'):
             feed_elements = sq.execute().hits
         for feed_elm in feed_elements:
@@ -923,41 +960,74 @@ class FeedView(MarketplaceView, BaseFeedESView, generics.GenericAPIView):
 
         # Remove dupes from apps list.
         apps = list(set(apps))
+        self.app_ids = apps
 
         # Fetch apps to attach to feed elements later.
         app_map = self.get_apps(request, apps)
 
-        # Super serialize.
-        with statsd.timer('mkt.feed.view.serialize'):
-            feed_items = FeedItemESSerializer(feed_items, many=True, context={
-                'app_map': app_map,
-                'feed_element_map': feed_element_map,
-                'request': request
-            }).data
-
-        # Filter excluded apps. If there are feed items that have all their
-        # apps excluded, they will be removed from the feed.
-        feed_items = self.filter_feed_items(request, feed_items)
-        feed_ok = self._check_empty_feed(feed_items, rest_of_world)
-        if feed_ok != 1:
-            if not rest_of_world:
-                log.warning('Feed empty for region {0}. Requerying feed with '
+        for i, page in enumerate(pages):
+            if i:
+                log.warning('Feed empty for region {0}. Using the feed for '
                             'region=RESTOFWORLD'.format(region))
-            return self._handle_empty_feed(feed_ok, region, request, args,
-                                           kwargs)
 
-        with statsd.timer('mkt.feed.view.feed_website_query'):
-            websites = self.get_featured_websites()
+            # Super serialize.
+            with statsd.timer('mkt.feed.view.serialize'):
+                feed_items = FeedItemESSerializer(page, many=True, context={
+                    'app_map': app_map,
+                    'feed_element_map': feed_element_map,
+                    'request': request
+                }).data
+
+            # Filter excluded apps. If there are feed items that have all
+            # their apps excluded, they will be removed from the feed.
+            feed_items = self.filter_feed_items(request, feed_items)
+            if self._check_empty_feed(feed_items):
+                break
+        else:
+            return response.Response(status=status.HTTP_404_NOT_FOUND)
+
+        # Build the meta object.
+        meta = mkt.api.paginator.CustomPaginationSerializer(
+            page, context={'request': request}).data['meta']
 
         return response.Response({
             'meta': meta,
             'objects': feed_items,
-            'websites': websites
+            'websites': ESWebsiteSerializer(websites, many=True).data
         }, status=status.HTTP_200_OK)
 
+    def get_snapshot_params(self, request):
+        """
+        Return the params identifying the feed snapshot for this request, or
+        None if it can't be served from a snapshot.
+        """
+        if (not settings.FEED_SNAPSHOT_TIMEOUT or
+                set(request.QUERY_PARAMS) - set(self.snapshot_params) or
+                request.QUERY_PARAMS.get('region') == 'None'):
+            return None
+        params = dict((k, request.QUERY_PARAMS[k]) for k in
+                      self.snapshot_params if k in request.QUERY_PARAMS)
+        # Use the language and region the request ended up with.
+        params.update(lang=request.LANG, region=request.REGION.slug)
+        return params
+
     def get(self, request, *args, **kwargs):
+        params = self.get_snapshot_params(request)
+        if params and not self.refresh_snapshot:
+            snapshot = get_snapshot(params)
+            if snapshot:
+                statsd.incr('mkt.feed.view.snapshot.hit')
+                statsd.timing('mkt.feed.view.snapshot.age',
+                              (time.time() - snapshot['created']) * 1000)
+                return response.Response(snapshot['data'],
+                                         status=snapshot['status'])
+            statsd.incr('mkt.feed.view.snapshot.miss')
+
         with statsd.timer('mkt.feed.view'):
-            return self._get(request, *args, **kwargs)
+            res = self._get(request, *args, **kwargs)
+        if params:
+            set_snapshot(params, res.data, res.status_code, self.app_ids)
+        return res
 
 
 class FeedElementGetView(BaseFeedESView):
@@ -0,0 +1,9 @@
+import cronjobs
+
+from mkt.games import tasks
+
+
+@cronjobs.register
+def warm_daily_games():
+    """Warm up the daily games cache right after the daily seed changed."""
+    tasks.warm_daily_games.delay()
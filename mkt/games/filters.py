@@ -1,10 +1,9 @@
-import datetime
-
 import elasticsearch_dsl.filter as es_filter
 from elasticsearch_dsl import aggs, query, SF
 from rest_framework.filters import BaseFilterBackend
 
 from mkt.games.constants import GAME_CATEGORIES
+from mkt.games.utils import get_daily_seed
 
 
 class DailyGamesFilter(BaseFilterBackend):
@@ -14,13 +13,13 @@ class DailyGamesFilter(BaseFilterBackend):
 
     The query:
         - Selects only games that match the featured game category tags.
-        - Scores randomly using random_score using date as seed.
+        - Scores randomly using random_score using the UTC date as seed.
         - Buckets by tag, using Top Hits with size=1 to select only one game
           from each category.
         - elastic.co/guide/en/elasticsearch/guide/current/top-hits.html
     """
     def filter_queryset(self, request, queryset, view):
-        daily_seed = int(datetime.datetime.now().strftime('%Y%m%d'))
+        daily_seed = get_daily_seed()
 
         # Map over the game categories to create a function score query for one
         # and dump it into a Bool should.
@@ -1,7 +1,13 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
 from django.core.paginator import Page
 
 from mkt.api.paginator import ESPaginator
 from mkt.games.constants import GAME_CATEGORIES
+from mkt.games.utils import seconds_until_rollover
 
 
 class ESGameAggregationPaginator(ESPaginator):
@@ -19,10 +25,38 @@ class ESGameAggregationPaginator(ESPaginator):
     Ideally, this class would be able to be configured with different
     aggregation and bucket names, but currently it's only used here.
     """
+    cursor_pagination = False
+
     def page(self, number):
         """
         Returns a page object.
+
+        The search only changes with the daily seed, so its results are kept
+        in the cache until the seed changes.
         """
+        key = self.get_cache_key()
+        hits = cache.get(key) if settings.DAILY_GAMES_CACHE else None
+        if hits is None:
+            hits = self.get_hits()
+            if settings.DAILY_GAMES_CACHE:
+                cache.set(key, hits, seconds_until_rollover())
+
+        page = Page(hits, number, self)
+
+        # Update the `_count`.
+        self._count = len(page.object_list)
+
+        return page
+
+    def get_cache_key(self):
+        """Returns the cache key of the results of the search."""
+        search = self.object_list
+        return 'games:daily:%s' % hashlib.md5(json.dumps(
+            [search._index, search._doc_type, search.to_dict()],
+            sort_keys=True)).hexdigest()
+
+    def get_hits(self):
+        """Runs the search and returns one hit per game category."""
         # Don't fetch hits, only care about aggregations.
         self.object_list._params['search_type'] = 'count'
         result = self.object_list.execute()
@@ -37,10 +71,4 @@ class ESGameAggregationPaginator(ESPaginator):
             # categories.
             if bucket['key'] in GAME_CATEGORIES:
                 hits.append(bucket['first_game']['hits']['hits'][0])
-
-        page = Page(hits, number, self)
-
-        # Update the `_count`.
-        self._count = len(page.object_list)
-
-        return page
+        return hits
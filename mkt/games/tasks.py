@@ -0,0 +1,29 @@
+import logging
+
+from celery import task
+from django.contrib.auth.models import AnonymousUser
+from django.core.urlresolvers import reverse
+from django.test.client import RequestFactory
+
+import mkt
+from mkt.games.utils import get_daily_games_params
+
+log = logging.getLogger('z.games')
+
+
+@task
+def warm_daily_games():
+    """Fill the daily games cache for all the params requested lately."""
+    from mkt.games.views import DailyGamesView
+    view = DailyGamesView.as_view()
+    url = reverse('api-v2:games.daily')
+
+    all_params = get_daily_games_params()
+    log.info('Warming up the daily games for %s params' % len(all_params))
+    for params in all_params:
+        request = RequestFactory().get(url, params)
+        request.API = True
+        request.API_VERSION = 2
+        request.REGION = mkt.regions.RESTOFWORLD
+        request.user = AnonymousUser()
+        view(request)
@@ -22,7 +22,7 @@ class TestDailyGamesFilter(FilterTestsBase):
 
         # Test function.
         eq_(functions[0]['random_score']['seed'],
-            int(datetime.datetime.now().strftime('%Y%m%d')))
+            int(datetime.datetime.utcnow().strftime('%Y%m%d')))
 
         for i, cat in enumerate(GAME_CATEGORIES):
             # Test tags.
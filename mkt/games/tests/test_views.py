@@ -1,12 +1,18 @@
 import datetime
 
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
+from django.test.utils import override_settings
 
 from mock import patch
 from nose.tools import eq_, ok_
 
 from mkt.api.tests.test_oauth import RestOAuth
 from mkt.games.constants import GAME_CATEGORIES
+from mkt.games.paginator import ESGameAggregationPaginator
+from mkt.games.tasks import warm_daily_games
+from mkt.games.utils import (get_daily_games_params,
+                             remember_daily_games_params)
 from mkt.site.fixtures import fixture
 from mkt.site.tests import app_factory, ESTestCase
 from mkt.tags.models import Tag
@@ -129,9 +135,9 @@ class TestDailyGamesView(RestOAuth, ESTestCase):
 
         eq_(set1, set2)
 
-    @patch('mkt.games.filters.datetime')
+    @patch('mkt.games.utils.datetime')
     def test_randomization(self, datetime_mock):
-        datetime_mock.datetime.now.return_value = datetime.datetime.now()
+        datetime_mock.datetime.utcnow.return_value = datetime.datetime.now()
 
         for x in range(4):
             self._create_group_of_games()
@@ -143,9 +149,53 @@ class TestDailyGamesView(RestOAuth, ESTestCase):
         set1 = map(get_id, res1.json['objects'])
 
         # Change the date.
-        datetime_mock.datetime.now.return_value = (
+        datetime_mock.datetime.utcnow.return_value = (
             datetime.datetime.now() - datetime.timedelta(days=30))
         res2 = self.anon.get(self.url)
         set2 = map(get_id, res2.json['objects'])
 
         ok_(set1 != set2)
+
+    @override_settings(DAILY_GAMES_CACHE=True)
+    def test_cached(self):
+        for x in range(4):
+            self._create_group_of_games()
+        res = self.anon.get(self.url, {'dev': 'firefoxos'})
+        eq_(len(res.json['objects']), 4)
+
+        with patch.object(ESGameAggregationPaginator, 'get_hits') as get_hits:
+            cached = self.anon.get(self.url, {'dev': 'firefoxos',
+                                              'lang': 'fr'})
+            ok_(not get_hits.called)
+            eq_([game['id'] for game in cached.json['objects']],
+                [game['id'] for game in res.json['objects']])
+
+            # Other devices get their own results.
+            self.anon.get(self.url, {'dev': 'android', 'device': 'mobile'})
+            eq_(get_hits.call_count, 1)
+
+    @override_settings(DAILY_GAMES_CACHE=True)
+    def test_warm(self):
+        self.anon.get(self.url, {'dev': 'firefoxos', 'lang': 'fr'})
+        eq_(get_daily_games_params(), [{'dev': 'firefoxos'}])
+
+        cache.clear()
+        remember_daily_games_params({'dev': 'firefoxos'})
+        warm_daily_games()
+        with patch.object(ESGameAggregationPaginator, 'get_hits') as get_hits:
+            self.anon.get(self.url, {'dev': 'firefoxos'})
+            ok_(not get_hits.called)
+
+    def test_remember_invalid_params(self):
+        self.anon.get(self.url, {'dev': 'junk'})
+        remember_daily_games_params({'doc_type': 'junk'})
+        remember_daily_games_params({'dev': 'firefoxos', 'other': 'junk'})
+        eq_(get_daily_games_params(), [])
+
+    @patch('mkt.games.utils.DAILY_GAMES_PARAMS_MAX', 2)
+    def test_remember_max_params(self):
+        remember_daily_games_params({'dev': 'firefoxos'})
+        remember_daily_games_params({'dev': 'android'})
+        remember_daily_games_params({'dev': 'desktop'})
+        eq_(sorted(params['dev'] for params in get_daily_games_params()),
+            ['android', 'firefoxos'])
@@ -0,0 +1,51 @@
+import datetime
+
+from django.core.cache import cache
+
+from mkt.search.forms import DEV_CHOICES, DEVICE_CHOICES
+
+
+DAILY_GAMES_PARAMS_KEY = 'games:daily:params'
+# Stop warming up the cache for params that weren't requested for that long.
+DAILY_GAMES_PARAMS_TIMEOUT = 60 * 60 * 24 * 7
+# The most params remembered, and the values they can take.
+DAILY_GAMES_PARAMS_MAX = 50
+DAILY_GAMES_PARAMS_CHOICES = {
+    'dev': set(k for k, v in DEV_CHOICES),
+    'device': set(k for k, v in DEVICE_CHOICES),
+    'doc_type': set(['all', 'webapp', 'website']),
+}
+
+
+def get_daily_seed():
+    """Returns the seed used to shuffle the daily games: the UTC date."""
+    return int(datetime.datetime.utcnow().strftime('%Y%m%d'))
+
+
+def seconds_until_rollover():
+    """Returns the number of seconds until the daily seed changes."""
+    now = datetime.datetime.utcnow()
+    tomorrow = datetime.datetime.combine(
+        now.date() + datetime.timedelta(days=1), datetime.time())
+    return max(int((tomorrow - now).total_seconds()), 1)
+
+
+def get_daily_games_params():
+    """Returns the query params the daily games were requested with."""
+    return (cache.get(DAILY_GAMES_PARAMS_KEY) or {}).values()
+
+
+def remember_daily_games_params(params):
+    """
+    Remembers the query params the daily games were requested with, so that
+    the cache can be warmed up for them once the seed changes. Invalid params
+    are ignored, and at most DAILY_GAMES_PARAMS_MAX of them are remembered.
+    """
+    if any(value not in DAILY_GAMES_PARAMS_CHOICES.get(name, ())
+           for name, value in params.items()):
+        return
+    key = repr(sorted(params.items()))
+    known = cache.get(DAILY_GAMES_PARAMS_KEY) or {}
+    if key not in known and len(known) < DAILY_GAMES_PARAMS_MAX:
+        known[key] = params
+        cache.set(DAILY_GAMES_PARAMS_KEY, known, DAILY_GAMES_PARAMS_TIMEOUT)
@@ -1,9 +1,18 @@
 from mkt.fireplace.views import MultiSearchView
 from mkt.games.filters import DailyGamesFilter
 from mkt.games.paginator import ESGameAggregationPaginator
+from mkt.games.utils import remember_daily_games_params
 from mkt.search.filters import DeviceTypeFilter, PublicContentFilter
 
 
 class DailyGamesView(MultiSearchView):
     filter_backends = [PublicContentFilter, DeviceTypeFilter, DailyGamesFilter]
     paginator_class = ESGameAggregationPaginator
+    # The query params changing the search, see `warm_daily_games`.
+    search_params = ('dev', 'device', 'doc_type')
+
+    def get(self, request, *args, **kwargs):
+        remember_daily_games_params(
+            dict((k, request.GET[k]) for k in self.search_params
+                 if k in request.GET))
+        return super(DailyGamesView, self).get(request, *args, **kwargs)
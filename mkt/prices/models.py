@@ -271,14 +271,27 @@ def update_price_currency(sender, instance, **kw):
         return
 
     try:
-        ids = list(instance.tier.addonpremium_set
-                           .values_list('addon_id', flat=True))
+        index_tier_apps(instance.tier, 'PriceCurrency')
     except Price.DoesNotExist:
         return
 
+
+@receiver(models.signals.post_save, sender=Price, dispatch_uid='save_price')
+def update_price(sender, instance, **kw):
+    """
+    Ensure that when a price tier is updated, all the apps that use it are
+    re-indexed into ES so that the tier and its prices will be correct.
+    """
+    if not kw.get('raw'):
+        index_tier_apps(instance, 'Price')
+
+
+def index_tier_apps(tier, reason):
+    """Re-index the apps using the price `tier`."""
+    ids = list(tier.addonpremium_set.values_list('addon_id', flat=True))
     if ids:
-        log.info('Indexing {0} add-ons due to PriceCurrency changes'
-                 .format(len(ids)))
+        log.info('Indexing {0} add-ons due to {1} changes'
+                 .format(len(ids), reason))
 
         # Circular import sad face.
         from mkt.webapps.tasks import index_webapps
@@ -194,6 +194,16 @@ class TestPriceCurrencyChanges(mkt.site.tests.TestCase):
         self.currency.delete()
         eq_(index_webapps.delay.call_args[0][0], [self.addon.pk])
 
+    @mock.patch('mkt.webapps.tasks.index_webapps')
+    def test_save_tier(self, index_webapps):
+        self.addon.premium.price.save()
+        eq_(index_webapps.delay.call_args[0][0], [self.addon.pk])
+
+    @mock.patch('mkt.webapps.tasks.index_webapps')
+    def test_save_premium(self, index_webapps):
+        self.addon.premium.update(price=self.make_price('0.99'))
+        eq_(index_webapps.delay.call_args[0][0], [self.addon.pk])
+
 
 class ContributionMixin(object):
 
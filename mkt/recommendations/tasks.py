@@ -0,0 +1,13 @@
+from django.core.cache import cache
+
+from celery import task
+
+from mkt.recommendations.utils import (fetch_recommendations,
+                                       recommendations_key)
+
+
+@task
+def refresh_recommendations(user_hash):
+    """Refresh the cached recommendations of a user."""
+    fetch_recommendations(user_hash)
+    cache.delete(recommendations_key(user_hash) + ':refresh')
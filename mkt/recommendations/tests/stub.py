@@ -0,0 +1,58 @@
+import json
+import re
+import threading
+from wsgiref.simple_server import make_server, WSGIRequestHandler
+
+
+class QuietHandler(WSGIRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+
+class StubRecommendationServer(object):
+    """
+    A local recommendation API to point RECOMMENDATIONS_API_URL at in tests.
+
+    It recommends `recommendations` to every user, and keeps the list of the
+    user hashes it was called for in `calls`.
+
+        >>> with StubRecommendationServer([1, 2]) as server:
+        ...     with self.settings(RECOMMENDATIONS_API_URL=server.url):
+        ...         ...
+
+    """
+    path_re = re.compile(r'^/api/v2/recommend/(\d+)/(\w+)/$')
+
+    def __init__(self, recommendations=None, status=200):
+        self.recommendations = recommendations or []
+        self.status = status
+        self.calls = []
+
+    def __enter__(self):
+        self.server = make_server('127.0.0.1', 0, self.app,
+                                  handler_class=QuietHandler)
+        self.url = 'http://127.0.0.1:%s' % self.server.server_port
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def app(self, environ, start_response):
+        match = self.path_re.match(environ['PATH_INFO'])
+        if not match:
+            start_response('404 Not Found', [])
+            return ['']
+
+        limit, user_hash = match.groups()
+        self.calls.append(user_hash)
+        start_response('%s Stub' % self.status,
+                       [('Content-Type', 'application/json')])
+        return [json.dumps({
+            'user': user_hash,
+            'recommendations': self.recommendations[:int(limit)]})]
@@ -1,5 +1,7 @@
 import json
+import time
 
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
 from django.test.utils import override_settings
 
@@ -10,8 +12,11 @@ from requests.exceptions import RequestException, Timeout
 
 import mkt
 from mkt.api.tests.test_oauth import RestOAuth
+from mkt.recommendations.tests.stub import StubRecommendationServer
+from mkt.recommendations.utils import recommendations_key
 from mkt.site.fixtures import fixture
 from mkt.site.tests import app_factory, ESTestCase
+from mkt.webapps.indexers import WebappIndexer
 from mkt.webapps.models import Webapp
 
 
@@ -29,7 +34,7 @@ class TestRecommendationView(RestOAuth, ESTestCase):
         super(TestRecommendationView, self).setUp()
         self.url = reverse('api-v2:apps-recommend')
 
-        self.requests_patcher = patch('mkt.recommendations.views.requests')
+        self.requests_patcher = patch('mkt.recommendations.utils.requests')
         self.patched_requests = self.requests_patcher.start()
         self.patched_requests.patcher = self.requests_patcher
         self.addCleanup(self.requests_patcher.stop)
@@ -70,7 +75,7 @@ class TestRecommendationView(RestOAuth, ESTestCase):
             res = self.client.get(self.url)
             eq_(res.status_code, 200)
 
-    @patch('mkt.recommendations.views.statsd')
+    @patch('mkt.recommendations.utils.statsd')
     def test_recommendation_statsd(self, statsd):
         with self.settings(RECOMMENDATIONS_API_URL='http://hy.fr',
                            RECOMMENDATIONS_ENABLED=True):
@@ -94,7 +99,7 @@ class TestRecommendationViewMocked(RestOAuth, ESTestCase):
         super(TestRecommendationViewMocked, self).setUp()
         self.url = reverse('api-v2:apps-recommend')
 
-        self.requests_patcher = patch('mkt.recommendations.views.requests')
+        self.requests_patcher = patch('mkt.recommendations.utils.requests')
         self.patched_requests = self.requests_patcher.start()
         self.patched_requests.patcher = self.requests_patcher
         self.addCleanup(self.requests_patcher.stop)
@@ -162,3 +167,61 @@ class TestRecommendationViewMocked(RestOAuth, ESTestCase):
         objects = res.json['objects']
         eq_(len(objects), 1)
         self.assertSetEqual([a['id'] for a in objects], [self.apps[1].pk])
+
+
+@override_settings(RECOMMENDATIONS_ENABLED=True)
+class TestRecommendationCache(RestOAuth, ESTestCase):
+    """
+    Tests the caching of the recommendations against a local recommendation
+    API.
+    """
+    fixtures = fixture('user_2519')
+
+    def setUp(self):
+        super(TestRecommendationCache, self).setUp()
+        self.url = reverse('api-v2:apps-recommend')
+        self.apps = [app_factory() for i in range(3)]
+        self.refresh('webapp')
+        self.key = recommendations_key(self.profile.recommendation_hash)
+
+    def get_ids(self, server):
+        with self.settings(RECOMMENDATIONS_API_URL=server.url):
+            res = self.client.get(self.url)
+        eq_(res.status_code, 200)
+        return [a['id'] for a in res.json['objects']]
+
+    def test_cached(self):
+        ids = [self.apps[0].pk, self.apps[1].pk]
+        with StubRecommendationServer(ids) as server:
+            self.assertSetEqual(self.get_ids(server), ids)
+            self.assertSetEqual(self.get_ids(server), ids)
+        eq_(server.calls, [self.profile.recommendation_hash])
+        eq_(cache.get(self.key)['app_ids'], ids)
+
+    def test_stale_refreshed(self):
+        cache.set(self.key, {'app_ids': [self.apps[0].pk],
+                             'created': time.time() - 60 * 60 * 2}, 60)
+        ids = [self.apps[1].pk, self.apps[2].pk]
+        with StubRecommendationServer(ids) as server:
+            # The stale recommendations are used while they get refreshed.
+            eq_(self.get_ids(server), [self.apps[0].pk])
+            self.assertSetEqual(self.get_ids(server), ids)
+        eq_(len(server.calls), 1)
+
+    def test_api_error_not_cached(self):
+        with StubRecommendationServer(status=500) as server:
+            self.get_ids(server)
+            self.get_ids(server)
+        eq_(len(server.calls), 2)
+        eq_(cache.get(self.key), None)
+
+    def test_installed_excluded_in_query(self):
+        self.profile.installed_set.create(addon=self.apps[0])
+        ids = [app.pk for app in self.apps]
+        with StubRecommendationServer(ids) as server:
+            with patch.object(WebappIndexer, 'filter_by_apps',
+                              wraps=WebappIndexer.filter_by_apps) as filter_:
+                self.assertSetEqual(self.get_ids(server), ids[1:])
+        queryset = filter_.call_args[0][1].to_dict()
+        ok_({'terms': {'id': [self.apps[0].pk]}} in
+            queryset['query']['filtered']['filter']['bool']['must_not'])
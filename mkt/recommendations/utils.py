@@ -0,0 +1,73 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+import commonware.log
+import requests
+from django_statsd.clients import statsd
+from requests.exceptions import RequestException, Timeout
+
+
+log = commonware.log.getLogger('z.recommendations')
+
+
+def recommendations_key(user_hash):
+    """Returns the cache key of the recommendations of a user."""
+    return 'recommendations:%s' % user_hash
+
+
+def fetch_recommendations(user_hash):
+    """
+    Fetches the ids of the apps recommended to a user from the recommendation
+    API, and caches them. Returns None if the API call failed.
+    """
+    url = '{base_url}/api/v2/recommend/{limit}/{user_hash}/'.format(
+        base_url=settings.RECOMMENDATIONS_API_URL,
+        limit=20, user_hash=user_hash)
+
+    app_ids = None
+    try:
+        with statsd.timer('recommendation.get'):
+            resp = requests.get(
+                url, timeout=settings.RECOMMENDATIONS_API_TIMEOUT)
+        if resp.status_code == 200:
+            app_ids = resp.json()['recommendations']
+    except Timeout as e:
+        log.warning(u'Recommendation timeout: {error}'.format(error=e))
+    except RequestException as e:
+        # On recommendation API exceptions we return popular.
+        log.error(u'Recommendation exception: {error}'.format(error=e))
+
+    if app_ids is not None:
+        cache.set(recommendations_key(user_hash),
+                  {'app_ids': app_ids, 'created': time.time()},
+                  settings.RECOMMENDATIONS_CACHE_STALE_TIMEOUT)
+    return app_ids
+
+
+def get_recommendations(user_hash):
+    """
+    Returns the ids of the apps recommended to a user, from the cache when
+    possible.
+
+    Recommendations older than RECOMMENDATIONS_CACHE_TIMEOUT are still
+    returned, but refreshed in a task for the next requests.
+    """
+    from mkt.recommendations.tasks import refresh_recommendations
+
+    cached = cache.get(recommendations_key(user_hash))
+    if cached is None:
+        statsd.incr('recommendation.cache.miss')
+        return fetch_recommendations(user_hash) or []
+
+    age = time.time() - cached['created']
+    if age > settings.RECOMMENDATIONS_CACHE_TIMEOUT:
+        statsd.incr('recommendation.cache.stale')
+        # Only schedule one refresh at a time for a given user.
+        if cache.add(recommendations_key(user_hash) + ':refresh', True,
+                     settings.RECOMMENDATIONS_API_TIMEOUT * 2):
+            refresh_recommendations.delay(user_hash)
+    else:
+        statsd.incr('recommendation.cache.hit')
+    return cached['app_ids']
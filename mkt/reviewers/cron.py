@@ -0,0 +1,12 @@
+import cronjobs
+
+from mkt.reviewers.utils import set_queue_counts
+
+
+@cronjobs.register
+def update_reviewer_queue_counts():
+    """
+    Count the reviewer queues again, to catch up with the changes that were
+    made without sending signals, like queryset updates.
+    """
+    set_queue_counts()
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from collections import defaultdict
+
+from django.db import models, migrations
+from django.conf import settings
+
+
+def add_rollups(apps, schema_editor):
+    ReviewerScore = apps.get_model('reviewers', 'ReviewerScore')
+    ReviewerScoreRollup = apps.get_model('reviewers', 'ReviewerScoreRollup')
+    totals = defaultdict(int)
+    scores = ReviewerScore.objects.values_list('user', 'created', 'note_key',
+                                               'score')
+    for user_id, created, note_key, score in scores.iterator():
+        totals[(user_id, None, None)] += score
+        totals[(user_id, created.date(), note_key)] += score
+    ReviewerScoreRollup.objects.bulk_create(
+        [ReviewerScoreRollup(user_id=user_id, day=day, note_key=note_key,
+                             score=score)
+         for (user_id, day, note_key), score in totals.items()],
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('reviewers', '0005_merge'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewerScoreRollup',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('modified', models.DateTimeField(auto_now=True)),
+                ('day', models.DateField(null=True, db_index=True)),
+                ('note_key', models.SmallIntegerField(null=True)),
+                ('score', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'reviewer_score_rollups',
+            },
+            bases=(models.Model,),
+        ),
+        migrations.RunPython(add_rollups),
+    ]
@@ -1,21 +1,25 @@
 import datetime
 
 from django.core.cache import cache
-from django.db import models
-from django.db.models import Sum
+from django.db import models, transaction
+from django.db.models import F, Sum
 
 import commonware.log
 
 import mkt
 import mkt.constants.comm as comm
+from mkt.abuse.models import AbuseReport
 from mkt.comm.utils import create_comm_note
+from mkt.files.models import File
+from mkt.ratings.models import Review, ReviewFlag
 from mkt.site.models import ManagerBase, ModelBase
 from mkt.site.utils import cache_ns_key
 from mkt.tags.models import Tag
 from mkt.translations.fields import save_signal, TranslatedField
 from mkt.users.models import UserProfile
+from mkt.versions.models import Version
 from mkt.webapps.indexers import WebappIndexer
-from mkt.webapps.models import Webapp
+from mkt.webapps.models import Geodata, Webapp
 from mkt.websites.models import Website
 
 
@@ -55,6 +59,15 @@ class ReviewerScore(ModelBase):
         db_table = 'reviewer_scores'
         ordering = ('-created',)
 
+    def save(self, *args, **kwargs):
+        # The rollups are updated by the signals, in the same transaction.
+        with transaction.atomic():
+            return super(ReviewerScore, self).save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super(ReviewerScore, self).delete(*args, **kwargs)
+
     @classmethod
     def get_key(cls, key=None, invalidate=False):
         namespace = 'riscore'
@@ -126,7 +139,6 @@ class ReviewerScore(ModelBase):
             score += cls.get_extra_platform_points(addon, status)
             cls.objects.create(user=user, addon=addon, score=score,
                                note_key=event)
-            cls.get_key(invalidate=True)
             user_log.info(
                 (u'Awarding %s points to user %s for "%s" for addon %s'
                  % (score, user, mkt.REVIEWED_CHOICES[event], addon.id))
@@ -141,7 +153,6 @@ class ReviewerScore(ModelBase):
         score = mkt.REVIEWED_SCORES.get(event)
 
         cls.objects.create(user=user, addon=addon, score=score, note_key=event)
-        cls.get_key(invalidate=True)
         user_log.info(
             u'Awarding %s points to user %s for "%s" for review %s' % (
                 score, user, mkt.REVIEWED_CHOICES[event], review_id))
@@ -154,7 +165,6 @@ class ReviewerScore(ModelBase):
         score = mkt.REVIEWED_SCORES.get(event)
 
         cls.objects.create(user=user, addon=addon, score=score, note_key=event)
-        cls.get_key(invalidate=True)
         user_log.info(
             u'Awarding %s points to user %s for "%s" for addon %s' %
             (score, user, mkt.REVIEWED_CHOICES[event], addon.id))
@@ -173,7 +183,6 @@ class ReviewerScore(ModelBase):
 
         cls.objects.create(user=user, addon=addon, website=website,
                            score=score, note_key=event)
-        cls.get_key(invalidate=True)
         user_log.info(
             u'Awarding %s points to user %s for "%s"' %
             (score, user, mkt.REVIEWED_CHOICES[event]))
@@ -186,9 +195,9 @@ class ReviewerScore(ModelBase):
         if val is not None:
             return val
 
-        val = (ReviewerScore.objects.filter(user=user)
-                                    .aggregate(total=Sum('score'))
-                                    .values())[0]
+        val = (ReviewerScoreRollup.objects.filter(user=user, day=None)
+                                          .aggregate(total=Sum('score'))
+                                          .values())[0]
         if val is None:
             val = 0
 
@@ -209,47 +218,47 @@ class ReviewerScore(ModelBase):
         cache.set(key, val, None)
         return val
 
+    @classmethod
+    def _performance_query(cls, user, since=None):
+        """
+        Returns the sum of the points of the user as a list holding a dict
+        with a `total` key, or an empty list if there are no points.
+        """
+        query = ReviewerScoreRollup.objects.filter(user=user)
+        if since is None:
+            query = query.filter(day=None)
+        else:
+            query = query.filter(day__gte=since)
+        return list(query.values('user').annotate(total=Sum('score'))
+                         .order_by())
+
     @classmethod
     def get_performance(cls, user):
         """Returns sum of reviewer points."""
-        key = cls.get_key('get_performance:%s' % user.id)
+        # The key differs from the one used to cache the ReviewerScore
+        # instances before the rollups, which is never invalidated.
+        key = cls.get_key('get_performance_rollup:%s' % user.id)
         val = cache.get(key)
         if val is not None:
             return val
 
-        sql = """
-             SELECT `reviewer_scores`.*,
-                    SUM(`reviewer_scores`.`score`) AS `total`
-             FROM `reviewer_scores`
-             LEFT JOIN `addons` ON (`reviewer_scores`.`addon_id`=`addons`.`id`)
-             WHERE `reviewer_scores`.`user_id` = %s
-             ORDER BY `total` DESC
-        """
-        val = list(ReviewerScore.objects.raw(sql, [user.id]))
+        val = cls._performance_query(user)
         cache.set(key, val, None)
         return val
 
     @classmethod
     def get_performance_since(cls, user, since):
         """
-        Returns sum of reviewer points since the given datetime.
+        Returns sum of reviewer points since the day of the given date or
+        datetime.
         """
-        key = cls.get_key('get_performance:%s:%s' % (
+        key = cls.get_key('get_performance_rollup:%s:%s' % (
             user.id, since.isoformat()))
         val = cache.get(key)
         if val is not None:
             return val
 
-        sql = """
-             SELECT `reviewer_scores`.*,
-                    SUM(`reviewer_scores`.`score`) AS `total`
-             FROM `reviewer_scores`
-             LEFT JOIN `addons` ON (`reviewer_scores`.`addon_id`=`addons`.`id`)
-             WHERE `reviewer_scores`.`user_id` = %s AND
-                   `reviewer_scores`.`created` >= %s
-             ORDER BY `total` DESC
-        """
-        val = list(ReviewerScore.objects.raw(sql, [user.id, since]))
+        val = cls._performance_query(user, since=since)
         cache.set(key, val, 3600)
         return val
 
@@ -258,15 +267,21 @@ class ReviewerScore(ModelBase):
         """
         Returns common SQL to leaderboard calls.
         """
-        query = (cls.objects
-                    .values_list('user__id', 'user__display_name')
-                    .annotate(total=Sum('score'))
-                    .exclude(user__groups__name__in=('No Reviewer Incentives',
-                                                     'Staff', 'Admins'))
-                    .order_by('-total'))
-
+        query = (
+            ReviewerScoreRollup.objects
+            .values_list('user__id', 'user__display_name')
+            .annotate(total=Sum('score'))
+            .exclude(user__groups__name__in=('No Reviewer Incentives',
+                                             'Staff', 'Admins'))
+            .order_by('-total'))
+
+        if since is None and types is None:
+            # The all time rollups are enough.
+            return query.filter(day=None)
+
+        query = query.filter(day__isnull=False)
         if since is not None:
-            query = query.filter(created__gte=since)
+            query = query.filter(day__gte=since)
 
         if types is not None:
             query = query.filter(note_key__in=types)
@@ -288,13 +303,15 @@ class ReviewerScore(ModelBase):
         elements instead of the normal 3.
 
         """
-        key = cls.get_key('get_leaderboards:%s' % user.id)
+        week_ago = datetime.date.today() - datetime.timedelta(days=days)
+
+        key = cls.get_key('get_leaderboards:%s:%s:%s' % (
+            user.id, week_ago.isoformat(),
+            ','.join(map(str, sorted(types or [])))))
         val = cache.get(key)
         if val is not None:
             return val
 
-        week_ago = datetime.date.today() - datetime.timedelta(days=days)
-
         leader_top = []
         leader_near = []
 
@@ -378,6 +395,82 @@ class ReviewerScore(ModelBase):
 ReviewerScore._meta.get_field('created').db_index = True
 
 
+class ReviewerScoreRollup(ModelBase):
+    """
+    The sum of the ReviewerScore points of a user, for all time when `day` is
+    None, or for a day and a `note_key`. Maintained by the ReviewerScore
+    signals, so the totals and the leaderboards don't scan the scores.
+    """
+    user = models.ForeignKey(UserProfile, related_name='+')
+    day = models.DateField(null=True, db_index=True)
+    note_key = models.SmallIntegerField(null=True)
+    score = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'reviewer_score_rollups'
+
+    @classmethod
+    def add(cls, user_id, day, note_key, score, create=True):
+        """
+        Adds `score` points to the all time rollup of the user, and to the one
+        for `day` and `note_key`. Missing rollups are created only if `create`
+        is true, points taken back always have a rollup to come from.
+
+        Concurrent awards can create two rollups for the same user, day and
+        note key. The reads sum them, and only one of them is updated here.
+        """
+        for day, note_key in ((None, None), (day, note_key)):
+            pks = list(cls.objects.filter(user=user_id, day=day,
+                                          note_key=note_key)
+                                  .values_list('pk', flat=True)[:1])
+            if pks:
+                cls.objects.filter(pk=pks[0]).update(score=F('score') + score)
+            elif create:
+                cls.objects.create(user_id=user_id, day=day,
+                                   note_key=note_key, score=score)
+
+
+def take_back_reviewer_score(sender, instance, **kwargs):
+    """
+    Takes the points of a score back from its rollups before it is changed
+    or deleted, they are added again once it is saved.
+    """
+    if kwargs.get('raw') or not instance.pk:
+        return
+    old = list(ReviewerScore.objects.filter(pk=instance.pk).values_list(
+        'user', 'created', 'note_key', 'score'))
+    if old:
+        user_id, created, note_key, score = old[0]
+        ReviewerScoreRollup.add(user_id, created.date(), note_key, -score,
+                                create=False)
+
+
+def update_reviewer_score_rollups(sender, instance, **kwargs):
+    if kwargs.get('raw'):
+        return
+    ReviewerScoreRollup.add(instance.user_id, instance.created.date(),
+                            instance.note_key, instance.score)
+    ReviewerScore.get_key(invalidate=True)
+
+
+def invalidate_reviewer_scores(sender, instance, **kwargs):
+    ReviewerScore.get_key(invalidate=True)
+
+
+models.signals.pre_save.connect(
+    take_back_reviewer_score, sender=ReviewerScore,
+    dispatch_uid='reviewerscore-save-take-back')
+models.signals.pre_delete.connect(
+    take_back_reviewer_score, sender=ReviewerScore,
+    dispatch_uid='reviewerscore-delete-take-back')
+models.signals.post_save.connect(
+    update_reviewer_score_rollups, sender=ReviewerScore,
+    dispatch_uid='reviewerscore-save-rollups')
+models.signals.post_delete.connect(
+    invalidate_reviewer_scores, sender=ReviewerScore,
+    dispatch_uid='reviewerscore-delete-invalidate')
+
+
 class EscalationQueue(ModelBase):
     addon = models.ForeignKey(Webapp)
 
@@ -515,3 +608,23 @@ for model in (RereviewQueue, EscalationQueue):
     models.signals.post_delete.connect(
         update_search_index, sender=model,
         dispatch_uid='%s-delete-update-index' % model._meta.model_name)
+
+
+def update_queue_counts(sender, instance, **kwargs):
+    if kwargs.get('raw'):
+        return
+    from mkt.reviewers.utils import refresh_queue_counts
+    refresh_queue_counts()
+
+
+# The models whose changes can move apps and websites in or out of the
+# reviewer queues.
+for model in (Webapp, Version, File, Geodata, Website, RereviewQueue,
+              EscalationQueue, AdditionalReview, Review, ReviewFlag,
+              AbuseReport):
+    models.signals.post_save.connect(
+        update_queue_counts, sender=model,
+        dispatch_uid='%s-save-queue-counts' % model._meta.model_name)
+    models.signals.post_delete.connect(
+        update_queue_counts, sender=model,
+        dispatch_uid='%s-delete-queue-counts' % model._meta.model_name)
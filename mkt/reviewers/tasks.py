@@ -0,0 +1,13 @@
+import logging
+
+from lib.post_request_task.task import task as post_request_task
+from mkt.reviewers.utils import set_queue_counts
+
+log = logging.getLogger('z.reviewers')
+
+
+@post_request_task
+def refresh_queue_counts():
+    """Count the reviewer queues again and materialize the counts."""
+    log.info('Refreshing the reviewer queue counts')
+    set_queue_counts()
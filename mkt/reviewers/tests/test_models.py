@@ -3,6 +3,7 @@ import time
 from datetime import datetime
 
 from django.core import mail
+from django.core.cache import cache
 
 import mock
 from nose.tools import eq_, ok_
@@ -14,7 +15,8 @@ from mkt.constants import comm
 from mkt.comm.models import CommunicationNote
 from mkt.reviewers.models import (AdditionalReview, EscalationQueue,
                                   QUEUE_TARAKO, RereviewQueue, ReviewerScore,
-                                  tarako_failed, tarako_passed)
+                                  ReviewerScoreRollup, tarako_failed,
+                                  tarako_passed)
 from mkt.site.fixtures import fixture
 from mkt.site.tests import app_factory, user_factory
 from mkt.tags.models import Tag
@@ -193,6 +195,14 @@ class TestReviewerScore(mkt.site.tests.TestCase):
         performance = ReviewerScore.get_performance(self.user)
         eq_(len(performance), 1)
 
+    def test_get_performance_old_cache(self):
+        # The ReviewerScore instances cached before the rollups are ignored.
+        self._give_points()
+        cache.set(ReviewerScore.get_key('get_performance:%s' % self.user.id),
+                  list(ReviewerScore.objects.all()), None)
+        performance = ReviewerScore.get_performance(self.user)
+        eq_(performance[0]['total'], ReviewerScore.get_total(self.user))
+
     def test_get_performance_since(self):
         self._give_points()
         ReviewerScore.award_moderation_points(self.user, self.app, 1)
@@ -268,6 +278,81 @@ class TestReviewerScore(mkt.site.tests.TestCase):
         with self.assertNumQueries(1):
             ReviewerScore.get_performance(self.user)
 
+    def test_get_leaderboards_types(self):
+        user2 = UserProfile.objects.get(email='regular@mozilla.com')
+        self._give_points()
+        ReviewerScore.award_moderation_points(user2, self.app, 1)
+        leaders = ReviewerScore.get_leaderboards(
+            self.user, types=[mkt.REVIEWED_APP_REVIEW])
+        eq_([l['user_id'] for l in leaders['leader_top']], [user2.id])
+        leaders = ReviewerScore.get_leaderboards(self.user)
+        eq_([l['user_id'] for l in leaders['leader_top']],
+            [self.user.id, user2.id])
+
+    def test_get_leaderboards_old_points(self):
+        self._give_points()
+        ReviewerScore.objects.get().update(created=self.days_ago(8))
+        eq_(ReviewerScore.get_leaderboards(self.user)['leader_top'], [])
+        eq_(ReviewerScore.get_leaderboards(self.user, days=10)['user_rank'], 1)
+
+    def test_manual_points_invalidate_caches(self):
+        self._give_points()
+        eq_(ReviewerScore.get_total(self.user), 60)
+        score = ReviewerScore.objects.create(
+            user=self.user, score=10, note_key=mkt.REVIEWED_MANUAL)
+        eq_(ReviewerScore.get_total(self.user), 70)
+        score.update(score=-10)
+        eq_(ReviewerScore.get_total(self.user), 50)
+        score.delete()
+        eq_(ReviewerScore.get_total(self.user), 60)
+
+
+class TestReviewerScoreRollup(mkt.site.tests.TestCase):
+
+    def setUp(self):
+        self.user = user_factory()
+
+    def rollups(self):
+        return sorted(ReviewerScoreRollup.objects.filter(user=self.user)
+                      .values_list('day', 'note_key', 'score'))
+
+    def test_award(self):
+        ReviewerScore.objects.create(user=self.user, score=10,
+                                     note_key=mkt.REVIEWED_WEBAPP_HOSTED)
+        ReviewerScore.objects.create(user=self.user, score=-1,
+                                     note_key=mkt.REVIEWED_APP_REVIEW_UNDO)
+        ReviewerScore.objects.create(user=self.user, score=5,
+                                     note_key=mkt.REVIEWED_WEBAPP_HOSTED)
+        today = datetime.today().date()
+        eq_(self.rollups(), [(None, None, 14),
+                             (today, mkt.REVIEWED_WEBAPP_HOSTED, 15),
+                             (today, mkt.REVIEWED_APP_REVIEW_UNDO, -1)])
+
+    def test_update(self):
+        score = ReviewerScore.objects.create(
+            user=self.user, score=10, note_key=mkt.REVIEWED_WEBAPP_HOSTED)
+        score.update(created=self.days_ago(3), score=20)
+        today = datetime.today().date()
+        eq_(self.rollups(), [(None, None, 20),
+                             (self.days_ago(3).date(),
+                              mkt.REVIEWED_WEBAPP_HOSTED, 20),
+                             (today, mkt.REVIEWED_WEBAPP_HOSTED, 0)])
+
+    def test_delete(self):
+        score = ReviewerScore.objects.create(
+            user=self.user, score=10, note_key=mkt.REVIEWED_WEBAPP_HOSTED)
+        score.delete()
+        today = datetime.today().date()
+        eq_(self.rollups(), [(None, None, 0),
+                             (today, mkt.REVIEWED_WEBAPP_HOSTED, 0)])
+
+    def test_duplicate_rollups(self):
+        ReviewerScoreRollup.objects.create(user=self.user, score=10)
+        ReviewerScoreRollup.objects.create(user=self.user, score=5)
+        ReviewerScore.objects.create(user=self.user, score=1,
+                                     note_key=mkt.REVIEWED_WEBAPP_HOSTED)
+        eq_(ReviewerScore.get_total(self.user), 16)
+
 
 class TestAdditionalReview(mkt.site.tests.TestCase):
     fixtures = fixture('webapp_337141')
@@ -1,7 +1,21 @@
 # -*- coding: utf8 -*-
-import mkt.site.tests
+from django.conf import settings
+from django.core.cache import cache
+from django.test.utils import override_settings
+
+import mock
+from nose.tools import eq_
 
-from mkt.reviewers.utils import create_sort_link
+import mkt
+import mkt.site.tests
+from lib.post_request_task import task as post_request_task
+from mkt.abuse.models import AbuseReport
+from mkt.reviewers.models import EscalationQueue
+from mkt.reviewers.tasks import refresh_queue_counts
+from mkt.reviewers.utils import (create_sort_link, get_queue_counts,
+                                 get_viewer_names, get_viewers,
+                                 QUEUE_COUNTS_REFRESH_KEY, review_viewing_key,
+                                 set_queue_counts)
 
 
 class TestCreateSortLink(mkt.site.tests.TestCase):
@@ -43,3 +57,93 @@ class TestCreateSortLink(mkt.site.tests.TestCase):
         assert 'sort=name' in link
         assert 'order=asc' in link
         assert 'text_query=Feliz+A%C3%B1o' in link
+
+
+@override_settings(REVIEWER_QUEUE_COUNTS_TIMEOUT=60)
+class TestQueueCounts(mkt.site.tests.TestCase):
+
+    def setUp(self):
+        self.app = mkt.site.tests.app_factory(
+            status=mkt.STATUS_PENDING,
+            file_kw={'status': mkt.STATUS_PENDING})
+        post_request_task._discard_tasks()
+        cache.delete(QUEUE_COUNTS_REFRESH_KEY)
+
+    def test_counts(self):
+        counts = get_queue_counts()
+        eq_(counts['pending'], 1)
+        eq_(counts['escalated'], 0)
+        eq_(counts['abuse'], 0)
+        eq_(sorted(counts), ['abuse', 'abusewebsites', 'additional_tarako',
+                             'escalated', 'moderated', 'pending',
+                             'region_cn', 'rereview', 'updates'])
+
+    def test_materialized(self):
+        eq_(get_queue_counts()['pending'], 1)
+        with self.assertNumQueries(0):
+            eq_(get_queue_counts()['pending'], 1)
+
+        # Changes made without signals show up on the next recount.
+        self.app.update(status=mkt.STATUS_PUBLIC, _signal=False)
+        eq_(get_queue_counts()['pending'], 1)
+        set_queue_counts()
+        eq_(get_queue_counts()['pending'], 0)
+
+    def test_refresh_on_change(self):
+        eq_(get_queue_counts()['pending'], 1)
+        EscalationQueue.objects.create(addon=self.app)
+        AbuseReport.objects.create(addon=self.app, message='bad')
+        # Still the materialized counts until the tasks are sent.
+        eq_(get_queue_counts()['escalated'], 0)
+
+        post_request_task._send_tasks()
+        counts = get_queue_counts()
+        eq_(counts['pending'], 0)
+        eq_(counts['escalated'], 1)
+        eq_(counts['abuse'], 1)
+
+    @mock.patch.object(refresh_queue_counts, 'original_apply_async')
+    def test_refresh_debounced(self, apply_async):
+        EscalationQueue.objects.create(addon=self.app)
+        post_request_task._send_tasks()
+        AbuseReport.objects.create(addon=self.app, message='bad')
+        post_request_task._send_tasks()
+        # A single refresh per window, across requests.
+        delay = settings.REVIEWER_QUEUE_COUNTS_REFRESH_DELAY
+        apply_async.assert_called_once_with(((), {}), countdown=delay * 2)
+
+        cache.delete(QUEUE_COUNTS_REFRESH_KEY)
+        AbuseReport.objects.create(addon=self.app, message='worse')
+        post_request_task._send_tasks()
+        eq_(apply_async.call_count, 2)
+
+    @override_settings(REVIEWER_QUEUE_COUNTS_TIMEOUT=0)
+    def test_not_materialized(self):
+        eq_(get_queue_counts()['pending'], 1)
+        self.app.update(status=mkt.STATUS_PUBLIC, _signal=False)
+        eq_(get_queue_counts()['pending'], 0)
+
+
+class TestViewers(mkt.site.tests.TestCase):
+
+    def setUp(self):
+        self.user = mkt.site.tests.user_factory(display_name=u'Me')
+        self.other = mkt.site.tests.user_factory(display_name=u'Other')
+        self.another = mkt.site.tests.user_factory(display_name=u'Another')
+        cache.set(review_viewing_key(1), self.other.id, 100)
+        cache.set(review_viewing_key(2), self.user.id, 100)
+        cache.set(review_viewing_key(3), self.another.id, 100)
+
+    def test_get_viewers(self):
+        eq_(get_viewers(['1', '2', '4']), {'1': self.other.id,
+                                           '2': self.user.id})
+        eq_(get_viewers([]), {})
+
+    def test_get_viewer_names(self):
+        with self.assertNumQueries(1):
+            eq_(get_viewer_names(['1', '2', '3', '4'], self.user.id),
+                {'1': u'Other', '3': u'Another'})
+
+    def test_get_viewer_names_nobody_else(self):
+        with self.assertNumQueries(0):
+            eq_(get_viewer_names(['2', '4'], self.user.id), {})
@@ -9,6 +9,7 @@ from os import path
 from django import test
 from django.conf import settings
 from django.core import mail
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
 from django.test.client import RequestFactory
 from django.test.utils import override_settings
@@ -39,7 +40,7 @@ from mkt.files.models import File
 from mkt.ratings.models import Review, ReviewFlag
 from mkt.reviewers.models import (CannedResponse, EscalationQueue,
                                   RereviewQueue, ReviewerScore, QUEUE_TARAKO)
-from mkt.reviewers.utils import ReviewersQueuesHelper
+from mkt.reviewers.utils import ReviewersQueuesHelper, review_viewing_key
 from mkt.reviewers.views import (_progress, app_review, queue_apps,
                                  route_reviewer)
 from mkt.site.fixtures import fixture
@@ -284,6 +285,20 @@ class TestReviewersHome(AppReviewerTest, AccessMixin):
         self.assertAlmostEqual(percentages['updates']['old'], 33.333333333333)
         self.assertAlmostEqual(percentages['updates']['med'], 33.333333333333)
 
+    def test_progress_queries(self):
+        # A single query for each of the 4 queues.
+        with self.assertNumQueries(4):
+            counts, percentages = _progress()
+        eq_(counts['rereview']['new'], 1)
+        eq_(counts['escalated']['new'], 1)
+
+    @override_settings(REVIEWER_PROGRESS_TIMEOUT=60)
+    def test_progress_cached(self):
+        progress = _progress()
+        self.apps[0].latest_version.update(nomination=self.days_ago(15))
+        with self.assertNumQueries(0):
+            eq_(_progress(), progress)
+
     def test_stats_waiting(self):
         self.apps[0].latest_version.update(nomination=self.days_ago(1))
         self.apps[1].latest_version.update(nomination=self.days_ago(5))
@@ -458,6 +473,18 @@ class TestAppQueue(AppReviewerTest, AccessMixin, FlagsMixin, SearchMixin,
         eq_(self.client.post(reverse('reviewers.queue_viewing')).status_code,
             200)
 
+    def test_queue_viewing(self):
+        self.admin_user.update(display_name=u'Admin')
+        for app in self.apps[:2]:
+            cache.set(review_viewing_key(app.id), self.admin_user.id, 100)
+        cache.set(review_viewing_key(self.apps[2].id), self.reviewer_user.id,
+                  100)
+        res = self.client.post(reverse('reviewers.queue_viewing'), {
+            'addon_ids': ' ,'.join(str(app.id) for app in self.apps)})
+        eq_(res.status_code, 200)
+        eq_(json.loads(res.content), {str(self.apps[0].id): u'Admin',
+                                      str(self.apps[1].id): u'Admin'})
+
     def test_template_links(self):
         r = self.client.get(self.url)
         eq_(r.status_code, 200)
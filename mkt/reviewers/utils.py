@@ -8,21 +8,26 @@ from django.core.cache import cache
 from django.db.models import Q
 
 import commonware.log
+import waffle
 from elasticsearch_dsl import filter as es_filter
 from tower import ugettext_lazy as _lazy
 
 import mkt
+import mkt.regions
 from mkt.abuse.models import AbuseReport
 from mkt.access import acl
 from mkt.comm.utils import create_comm_note
 from mkt.constants import comm
 from mkt.files.models import File
 from mkt.ratings.models import Review
-from mkt.reviewers.models import EscalationQueue, RereviewQueue, ReviewerScore
+from mkt.reviewers.models import (QUEUE_TARAKO, AdditionalReview,
+                                  EscalationQueue, RereviewQueue,
+                                  ReviewerScore)
 from mkt.site.helpers import product_as_dict
 from mkt.site.models import manual_order
 from mkt.site.utils import cached_property, JSONEncoder
 from mkt.translations.query import order_by_translation
+from mkt.users.models import UserProfile
 from mkt.versions.models import Version
 from mkt.webapps.models import Webapp
 from mkt.webapps.indexers import WebappIndexer
@@ -595,6 +600,42 @@ def create_sort_link(pretty_name, sort_field, get_params, sort, order):
                                         url_class, pretty_name)
 
 
+def review_viewing_key(addon_id):
+    """Returns the cache key of the id of the reviewer viewing an app."""
+    return '%s:review_viewing:%s' % (settings.CACHE_PREFIX, addon_id)
+
+
+def get_viewers(addon_ids):
+    """
+    Returns a dict of the ids of the reviewers currently viewing the given
+    apps, keyed by app id, with a single cache request. Apps nobody is viewing
+    are left out.
+    """
+    keys = dict((review_viewing_key(addon_id), addon_id)
+                for addon_id in addon_ids)
+    if not keys:
+        return {}
+    return dict((keys[key], user_id)
+                for key, user_id in cache.get_many(keys.keys()).items()
+                if user_id)
+
+
+def get_viewer_names(addon_ids, user_id):
+    """
+    Returns a dict of the display names of the reviewers other than
+    `user_id` currently viewing the given apps, keyed by app id. Costs a
+    single cache request and at most one query.
+    """
+    viewers = dict((addon_id, viewer_id) for addon_id, viewer_id
+                   in get_viewers(addon_ids).items() if viewer_id != user_id)
+    if not viewers:
+        return {}
+    users = UserProfile.objects.in_bulk(set(viewers.values()))
+    return dict((addon_id, users[viewer_id].display_name)
+                for addon_id, viewer_id in viewers.items()
+                if viewer_id in users)
+
+
 class AppsReviewing(object):
     """
     Class to manage the list of apps a reviewer is currently reviewing.
@@ -608,14 +649,12 @@ class AppsReviewing(object):
         self.key = '%s:myapps:%s' % (settings.CACHE_PREFIX, self.user_id)
 
     def get_apps(self):
-        ids = []
         my_apps = cache.get(self.key)
+        ids = []
         if my_apps:
-            for id in my_apps.split(','):
-                valid = cache.get(
-                    '%s:review_viewing:%s' % (settings.CACHE_PREFIX, id))
-                if valid and valid == self.user_id:
-                    ids.append(id)
+            ids = [addon_id for addon_id, viewer_id
+                   in get_viewers(my_apps.split(',')).items()
+                   if viewer_id == self.user_id]
 
         apps = []
         for app in Webapp.objects.filter(id__in=ids):
@@ -812,3 +851,69 @@ class ReviewersQueuesHelper(object):
         order_by = ('-' if order == 'desc' else '') + sort_type
 
         return qs.sort(order_by)
+
+
+QUEUE_COUNTS_REFRESH_KEY = 'reviewers:queue-counts:refresh'
+
+
+def queue_counts_key(use_es):
+    return 'reviewers:queue-counts:%s' % ('es' if use_es else 'db')
+
+
+def count_queues(use_es=False):
+    """Returns the number of items in each of the reviewer queues."""
+    queues_helper = ReviewersQueuesHelper(use_es=use_es)
+    return {
+        'pending': queues_helper.get_pending_queue().count(),
+        'rereview': queues_helper.get_rereview_queue().count(),
+        'updates': queues_helper.get_updates_queue().count(),
+        'escalated': queues_helper.get_escalated_queue().count(),
+        'moderated': queues_helper.get_moderated_queue().count(),
+        'abuse': queues_helper.get_abuse_queue().count(),
+        'abusewebsites': queues_helper.get_abuse_queue_websites().count(),
+        'region_cn': Webapp.objects.pending_in_region(mkt.regions.CHN).count(),
+        'additional_tarako': (
+            AdditionalReview.objects
+                            .unreviewed(queue=QUEUE_TARAKO, and_approved=True)
+                            .count()),
+    }
+
+
+def get_queue_counts():
+    """
+    Returns the materialized counts of the reviewer queues, counting them if
+    they are not in the cache.
+    """
+    use_es = waffle.switch_is_active('reviewer-tools-elasticsearch')
+    counts = None
+    if settings.REVIEWER_QUEUE_COUNTS_TIMEOUT:
+        counts = cache.get(queue_counts_key(use_es))
+    if counts is None:
+        counts = set_queue_counts(use_es)
+    return counts
+
+
+def set_queue_counts(use_es=None):
+    """Counts the reviewer queues, materializes the counts and returns them."""
+    if use_es is None:
+        use_es = waffle.switch_is_active('reviewer-tools-elasticsearch')
+    counts = count_queues(use_es)
+    if settings.REVIEWER_QUEUE_COUNTS_TIMEOUT:
+        cache.set(queue_counts_key(use_es), counts,
+                  settings.REVIEWER_QUEUE_COUNTS_TIMEOUT)
+    return counts
+
+
+def refresh_queue_counts():
+    """
+    Schedules the refresh of the reviewer queue counts after an app or a queue
+    changed. A single refresh is scheduled across requests per window of
+    REVIEWER_QUEUE_COUNTS_REFRESH_DELAY seconds. It runs once the window is
+    over and the changes made during the window have had the same delay to
+    make it to ES.
+    """
+    from mkt.reviewers.tasks import refresh_queue_counts
+    delay = settings.REVIEWER_QUEUE_COUNTS_REFRESH_DELAY
+    if (settings.REVIEWER_QUEUE_COUNTS_TIMEOUT and
+            cache.add(QUEUE_COUNTS_REFRESH_KEY, True, delay)):
+        refresh_queue_counts.apply_async(countdown=delay * 2)
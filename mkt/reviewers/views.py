@@ -54,21 +54,24 @@ from mkt.regions.utils import parse_region
 from mkt.reviewers.forms import (ApiReviewersSearchForm, ApproveRegionForm,
                                  ModerateLogDetailForm, ModerateLogForm,
                                  MOTDForm, TestedOnFormSet)
-from mkt.reviewers.models import (QUEUE_TARAKO, AdditionalReview,
-                                  CannedResponse, ReviewerScore)
+from mkt.reviewers.models import (AdditionalReview, CannedResponse,
+                                  ReviewerScore)
 from mkt.reviewers.serializers import (AdditionalReviewSerializer,
                                        CannedResponseSerializer,
                                        ReviewerAdditionalReviewSerializer,
                                        ReviewerScoreSerializer,
                                        ReviewersESAppSerializer,
                                        ReviewingSerializer)
-from mkt.reviewers.utils import (AppsReviewing, ReviewApp,
-                                 ReviewersQueuesHelper, log_reviewer_action)
+from mkt.reviewers.utils import (AppsReviewing, get_queue_counts,
+                                 get_viewer_names, ReviewApp,
+                                 ReviewersQueuesHelper, log_reviewer_action,
+                                 review_viewing_key)
 from mkt.search.filters import (ReviewerSearchFormFilter, SearchQueryFilter,
                                 SortingFilter)
 from mkt.search.views import SearchView
 from mkt.site.decorators import json_view, login_required, permission_required
 from mkt.site.helpers import absolutify, product_as_dict
+from mkt.site.models import CountIf
 from mkt.site.utils import (JSONEncoder, days_ago, escape_all,
                             get_file_response, paginate, redirect_for_login,
                             smart_decode)
@@ -85,6 +88,7 @@ from . import forms
 
 
 QUEUE_PER_PAGE = 100
+PROGRESS_CACHE_KEY = 'reviewers:progress'
 log = commonware.log.getLogger('z.reviewers')
 app_view_with_deleted = app_view_factory(Webapp.with_deleted.all)
 
@@ -155,23 +159,7 @@ def home(request):
 
 
 def queue_counts(request):
-    use_es = waffle.switch_is_active('reviewer-tools-elasticsearch')
-    queues_helper = ReviewersQueuesHelper(use_es=use_es)
-
-    counts = {
-        'pending': queues_helper.get_pending_queue().count(),
-        'rereview': queues_helper.get_rereview_queue().count(),
-        'updates': queues_helper.get_updates_queue().count(),
-        'escalated': queues_helper.get_escalated_queue().count(),
-        'moderated': queues_helper.get_moderated_queue().count(),
-        'abuse': queues_helper.get_abuse_queue().count(),
-        'abusewebsites': queues_helper.get_abuse_queue_websites().count(),
-        'region_cn': Webapp.objects.pending_in_region(mkt.regions.CHN).count(),
-        'additional_tarako': (
-            AdditionalReview.objects
-                            .unreviewed(queue=QUEUE_TARAKO, and_approved=True)
-                            .count()),
-    }
+    counts = get_queue_counts()
 
     rv = {}
     if isinstance(type, basestring):
@@ -186,8 +174,13 @@ def _progress():
     """Returns unreviewed apps progress.
 
     Return the number of apps still unreviewed for a given period of time and
-    the percentage.
+    the percentage. Each queue is counted with a single query, and the result
+    is cached for settings.REVIEWER_PROGRESS_TIMEOUT seconds.
     """
+    if settings.REVIEWER_PROGRESS_TIMEOUT:
+        cached = cache.get(PROGRESS_CACHE_KEY)
+        if cached is not None:
+            return cached
 
     queues_helper = ReviewersQueuesHelper()
 
@@ -202,25 +195,21 @@ def _progress():
                     'nomination')
     }
 
-    operators_and_values = {
-        'new': ('gt', days_ago(5)),
-        'med': ('range', (days_ago(10), days_ago(5))),
-        'old': ('lt', days_ago(10)),
-        'week': ('gte', days_ago(7))
+    conditions_and_values = {
+        'new': ('> %s', [days_ago(5)]),
+        'med': ('BETWEEN %s AND %s', [days_ago(10), days_ago(5)]),
+        'old': ('< %s', [days_ago(10)]),
+        'week': ('>= %s', [days_ago(7)])
     }
 
     types = base_filters.keys()
     progress = {}
 
     for t in types:
-        tmp = {}
         base_query, field = base_filters[t]
-        for k in operators_and_values.keys():
-            operator, value = operators_and_values[k]
-            filter_ = {}
-            filter_['%s__%s' % (field, operator)] = value
-            tmp[k] = base_query.filter(**filter_).count()
-        progress[t] = tmp
+        progress[t] = base_query.aggregate(**dict(
+            (k, CountIf(field, condition=condition, params=values))
+            for k, (condition, values) in conditions_and_values.items()))
 
     def pct(p, t):
         # Return the percent of (p)rogress out of (t)otal.
@@ -233,6 +222,9 @@ def _progress():
         for duration in ('new', 'med', 'old'):
             percentage[t][duration] = pct(progress[t][duration], total)
 
+    if settings.REVIEWER_PROGRESS_TIMEOUT:
+        cache.set(PROGRESS_CACHE_KEY, (progress, percentage),
+                  settings.REVIEWER_PROGRESS_TIMEOUT)
     return (progress, percentage)
 
 
@@ -904,7 +896,7 @@ def performance(request, email=None):
     years = ReviewerScore.get_performance_since(user, year_ago)
 
     def _sum(iter):
-        return sum(s.total or 0 for s in iter)
+        return sum(s['total'] or 0 for s in iter)
 
     performance = {
         'month': _sum(months),
@@ -1265,7 +1257,7 @@ def review_viewing(request):
     user_id = request.user.id
     current_name = ''
     is_user = 0
-    key = '%s:review_viewing:%s' % (settings.CACHE_PREFIX, addon_id)
+    key = review_viewing_key(addon_id)
     interval = mkt.EDITOR_VIEWING_INTERVAL
 
     # Check who is viewing.
@@ -1295,19 +1287,9 @@ def queue_viewing(request):
     if 'addon_ids' not in request.POST:
         return {}
 
-    viewing = {}
-    user_id = request.user.id
-
-    for addon_id in request.POST['addon_ids'].split(','):
-        addon_id = addon_id.strip()
-        key = '%s:review_viewing:%s' % (settings.CACHE_PREFIX, addon_id)
-        currently_viewing = cache.get(key)
-        if currently_viewing and currently_viewing != user_id:
-            viewing[addon_id] = (UserProfile.objects
-                                            .get(id=currently_viewing)
-                                            .display_name)
-
-    return viewing
+    addon_ids = [addon_id.strip()
+                 for addon_id in request.POST['addon_ids'].split(',')]
+    return get_viewer_names(addon_ids, request.user.id)
 
 
 class CannedResponseViewSet(CORSMixin, MarketplaceView, viewsets.ModelViewSet):
@@ -0,0 +1,217 @@
+"""
+Benchmark of the search, feed and Rocketbar API endpoints, run by the
+`benchmark_search` command.
+
+The ES responses can be recorded while running against a local ES, and
+replayed later, so that only the cost of building the queries and serializing
+the results is measured, without ES in the way.
+"""
+import hashlib
+import json
+import math
+import time
+import urllib
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.client import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from elasticsearch.connection import Connection, Urllib3HttpConnection
+from elasticsearch.exceptions import TransportError
+
+
+# Name, path and the list of query strings of the benchmarked endpoints. The
+# queries match the names of the apps created by mkt.webapps.fakedata.
+ENDPOINTS = (
+    ('search', '/api/v2/apps/search/',
+     [{}, {'q': 'pizza'}, {'q': 'spicy sandwich'}, {'cat': 'games'},
+      {'sort': 'popularity'}]),
+    ('feed', '/api/v2/feed/get/',
+     [{}, {'region': 'us'}]),
+    ('rocketbar', '/api/v2/apps/search/rocketbar/',
+     [{'q': 'pi'}, {'q': 'spicy'}, {'q': 'elegant waf'}]),
+)
+
+# The settings disabling the caches in front of the benchmarked code.
+NO_CACHES = {
+    'FEED_SNAPSHOT_TIMEOUT': 0,
+    'ROCKETBAR_INDEX_MAX_APPS': 0,
+    'SEARCH_RESPONSE_CACHE_TIMEOUT': 0,
+}
+
+PERCENTILES = (50, 90, 99)
+
+
+def request_key(method, url, params, body):
+    """
+    Returns the key of an ES request in a Recording. The JSON documents of the
+    body are normalized, their keys don't come in a stable order.
+    """
+    lines = []
+    for line in (body or '').splitlines():
+        try:
+            line = json.dumps(json.loads(line), sort_keys=True)
+        except ValueError:
+            pass
+        lines.append(line)
+    params = urllib.urlencode(sorted((params or {}).items()))
+    return hashlib.md5('%s %s?%s\n%s' % (method, url, params,
+                                         '\n'.join(lines))).hexdigest()
+
+
+class Recording(object):
+    """
+    ES responses keyed by request, with the count of the ES requests made and
+    the list of the requests missing from the recording.
+    """
+
+    def __init__(self, responses=None):
+        self.responses = responses or {}
+        self.requests = 0
+        self.misses = []
+
+    @classmethod
+    def load(cls, filename):
+        with open(filename) as f:
+            return cls(json.load(f))
+
+    def save(self, filename):
+        with open(filename, 'w') as f:
+            json.dump(self.responses, f, indent=1, sort_keys=True)
+
+    def add(self, method, url, params, body, status, data):
+        self.responses[request_key(method, url, params, body)] = {
+            'request': '%s %s' % (method, url), 'status': status,
+            'data': data}
+
+    def get(self, method, url, params, body):
+        response = self.responses.get(request_key(method, url, params, body))
+        if response is None:
+            self.misses.append('%s %s' % (method, url))
+        return response
+
+
+class RecordingConnection(Urllib3HttpConnection):
+    """Talks to ES, and keeps its responses in `recording`."""
+    recording = None
+
+    def perform_request(self, method, url, params=None, body=None,
+                        timeout=None, ignore=()):
+        self.recording.requests += 1
+        status, headers, data = super(
+            RecordingConnection, self).perform_request(
+                method, url, params, body, timeout=timeout, ignore=ignore)
+        self.recording.add(method, url, params, body, status, data)
+        return status, headers, data
+
+
+class ReplayConnection(Connection):
+    """Serves the responses of `recording` instead of talking to ES."""
+    recording = None
+
+    def perform_request(self, method, url, params=None, body=None,
+                        timeout=None, ignore=()):
+        self.recording.requests += 1
+        response = self.recording.get(method, url, params, body)
+        if response is None:
+            raise TransportError('N/A', 'No recorded response for %s %s' %
+                                 (method, url))
+        return response['status'], {}, response['data']
+
+
+@contextmanager
+def use_recording(connection_class, recording):
+    """
+    Makes the indexers talk to ES through `connection_class`, one of
+    RecordingConnection or ReplayConnection, using `recording`.
+    """
+    connection_class.recording = recording
+    try:
+        with override_settings(ES_CONNECTION_CLASS='%s.%s' % (
+                connection_class.__module__, connection_class.__name__)):
+            yield recording
+    finally:
+        connection_class.recording = None
+
+
+def percentile(values, pct):
+    """Returns the `pct` percentile of `values`, by nearest rank."""
+    values = sorted(values)
+    rank = int(math.ceil(pct / 100.0 * len(values)))
+    return values[max(rank, 1) - 1]
+
+
+class Benchmark(object):
+    """
+    Requests each of the `endpoints` with each of their query strings
+    `iterations` times, after `warmup` untimed rounds, and keeps per endpoint
+    the latencies in milliseconds, the number of SQL queries and of ES
+    requests of each request, and the number of non 200 responses.
+
+    The ES requests are counted on `recording`, which must be in use.
+    """
+
+    def __init__(self, recording, endpoints=ENDPOINTS, iterations=20,
+                 warmup=2):
+        self.recording = recording
+        self.endpoints = endpoints
+        self.iterations = iterations
+        self.warmup = warmup
+        self.client = Client()
+
+    def request(self, path, params):
+        """Returns the response, latency, SQL queries and ES requests."""
+        es_requests = self.recording.requests
+        with CaptureQueriesContext(connection) as queries:
+            start = time.time()
+            response = self.client.get(path, params)
+            latency = (time.time() - start) * 1000
+        return (response, latency, len(queries),
+                self.recording.requests - es_requests)
+
+    def run(self):
+        results = OrderedDict()
+        for name, path, queries in self.endpoints:
+            for i in range(self.warmup):
+                for params in queries:
+                    self.request(path, params)
+
+            result = results[name] = {'latencies': [], 'queries': [],
+                                      'es_requests': [], 'errors': 0}
+            for i in range(self.iterations):
+                for params in queries:
+                    response, latency, num_queries, es_requests = (
+                        self.request(path, params))
+                    result['latencies'].append(latency)
+                    result['queries'].append(num_queries)
+                    result['es_requests'].append(es_requests)
+                    if response.status_code != 200:
+                        result['errors'] += 1
+        return results
+
+    @staticmethod
+    def report(results):
+        """Returns the lines of the report of the results of run()."""
+        header = ['endpoint', 'requests'] + [
+            'p%s ms' % pct for pct in PERCENTILES] + [
+            'max ms', 'sql', 'es', 'errors']
+        rows = [header]
+        for name, result in results.items():
+            latencies = result['latencies']
+            if not latencies:
+                continue
+            rows.append(
+                [name, str(len(latencies))] +
+                ['%.1f' % percentile(latencies, pct) for pct in PERCENTILES] +
+                ['%.1f' % max(latencies)] +
+                ['%.1f' % (float(sum(result[key])) / len(latencies))
+                 for key in ('queries', 'es_requests')] +
+                [str(result['errors'])])
+        widths = [max(len(row[i]) for row in rows)
+                  for i in range(len(header))]
+        return ['  '.join(value.ljust(width) if i == 0 else value.rjust(width)
+                          for i, (value, width) in
+                          enumerate(zip(row, widths)))
+                for row in rows]
@@ -0,0 +1,9 @@
+import cronjobs
+
+from mkt.search.rocketbar import invalidate_prefix_index
+
+
+@cronjobs.register
+def update_rocketbar_index():
+    """Make the web processes rebuild their rocketbar suggestions index."""
+    invalidate_prefix_index()
@@ -1,3 +1,5 @@
+import json
+
 from django.conf import settings
 from django.utils import translation
 
@@ -11,12 +13,55 @@ from mkt.constants.applications import get_device_id
 from mkt.features.utils import get_feature_profile
 
 
+class QueryTemplate(object):
+    """
+    A query compiled ahead of time to a JSON string, with a `{{q}}`
+    placeholder where the user's search terms go.
+
+    The placeholder uses the mustache syntax, so `source` can also be stored
+    in ES as a search template and sent with the terms as its `q` param.
+    """
+    placeholder = '{{q}}'
+
+    def __init__(self, body):
+        self.source = json.dumps(body, sort_keys=True)
+
+    def render(self, q):
+        """Returns a fresh copy of the query dict searching for `q`."""
+        return json.loads(self.source.replace(json.dumps(self.placeholder),
+                                              json.dumps(q)))
+
+
+class CompiledQuery(query.Query):
+    """
+    An ES query whose dict was already built, added to a search as is instead
+    of being rebuilt from DSL objects.
+    """
+    name = 'compiled'
+
+    def __init__(self, body):
+        super(CompiledQuery, self).__init__()
+        self._body = body
+
+    def _clone(self):
+        return CompiledQuery(self._body)
+
+    def to_dict(self):
+        return self._body
+
+
 class SearchQueryFilter(BaseFilterBackend):
     """
     A django-rest-framework filter backend that scores the given ES queryset
     with a should query based on the search query found in the current
     request's query parameters.
+
+    The query only depends on the search terms through a handful of flags, so
+    it's compiled once per combination of those into a `QueryTemplate` and
+    reused by every request afterwards.
     """
+    _templates = {}
+
     def _get_locale_analyzer(self, lang):
         analyzer = mkt.SEARCH_LANGUAGE_TO_ANALYZER.get(lang)
         if (analyzer in mkt.SEARCH_ANALYZER_PLUGINS and
@@ -33,6 +78,30 @@ class SearchQueryFilter(BaseFilterBackend):
         if not q:
             return queryset
 
+        region = get_region_from_request(request)
+        template = self.get_template(
+            analyzer, region.id if region else None,
+            single_word=' ' not in q, numeric=q.isnumeric())
+        return queryset.query(CompiledQuery(template.render(q)))
+
+    @classmethod
+    def get_template(cls, analyzer, region_id, single_word, numeric):
+        """
+        Returns the `QueryTemplate` for the given locale analyzer, region and
+        search terms flags, compiling it on first use.
+        """
+        key = (analyzer, region_id, single_word, numeric)
+        if key not in cls._templates:
+            cls._templates[key] = QueryTemplate(cls.build_query(*key))
+        return cls._templates[key]
+
+    @classmethod
+    def build_query(cls, analyzer, region_id, single_word, numeric):
+        """
+        Builds the `function_score` query dict, with the template placeholder
+        in place of the search terms.
+        """
+        q = QueryTemplate.placeholder
         should = []
         rules = [
             (query.Match, {'query': q, 'boost': 3, 'analyzer': 'standard'}),
@@ -43,7 +112,7 @@ class SearchQueryFilter(BaseFilterBackend):
 
         # Only add fuzzy queries if q is a single word. It doesn't make sense
         # to do a fuzzy query for multi-word queries.
-        if ' ' not in q:
+        if single_word:
             rules.append(
                 (query.Fuzzy, {'value': q, 'boost': 2, 'prefix_length': 1}))
 
@@ -62,7 +131,7 @@ class SearchQueryFilter(BaseFilterBackend):
         # Do the same for GUID searches.
         should.append(query.Term(**{'guid': {'value': q, 'boost': 10}}))
         # If query is numeric, check if it is an ID.
-        if q.isnumeric():
+        if numeric:
             should.append(query.Term(**{'id': {'value': q, 'boost': 10}}))
 
         if analyzer:
@@ -90,7 +159,7 @@ class SearchQueryFilter(BaseFilterBackend):
 
         # Add searches on tag field.
         should.append(query.Term(tags={'value': q}))
-        if ' ' not in q:
+        if single_word:
             should.append(query.Fuzzy(tags={'value': q, 'prefix_length': 1}))
 
         # The list of functions applied to our `function_score` query.
@@ -99,18 +168,16 @@ class SearchQueryFilter(BaseFilterBackend):
         ]
 
         # Add a boost for the preferred region, if it exists.
-        region = get_region_from_request(request)
-        if region:
+        if region_id is not None:
             functions.append({
-                'filter': {'term': {'preferred_regions': region.id}},
+                'filter': {'term': {'preferred_regions': region_id}},
                 # TODO: When we upgrade to Elasticsearch 1.4, change this
                 # to 'weight'.
                 'boost_factor': 4,
             })
 
-        return queryset.query('function_score',
-                              query=query.Bool(should=should),
-                              functions=functions)
+        return query.Q('function_score', query=query.Bool(should=should),
+                       functions=functions).to_dict()
 
 
 class SearchFormFilter(BaseFilterBackend):
@@ -270,15 +337,19 @@ class ProfileFilter(BaseFilterBackend):
     A django-rest-framework filter backend that filters based on the feature
     profile provided.
 
+    Excludes apps requiring any of the features missing from the profile with
+    a single `terms` filter. ES caches it under a key derived from the profile
+    signature, so every device sharing a profile reuses the same filter.
+
     """
     def filter_queryset(self, request, queryset, view):
         profile = get_feature_profile(request)
         if profile:
-            must_not = []
-            for k in profile.to_kwargs(prefix='features.has_').keys():
-                must_not.append(F('term', **{k: True}))
-            if must_not:
-                return queryset.filter(Bool(must_not=must_not))
+            missing = [k for k, v in profile.iteritems() if not v]
+            if missing:
+                return queryset.filter(Bool(must_not=[F(
+                    'terms', features=missing, _cache=True,
+                    _cache_key='profile:%s' % profile.to_signature())]))
 
         return queryset
 
@@ -344,4 +415,4 @@ class OpenMobileACLFilter(BaseFilterBackend):
     """
     def filter_queryset(self, request, queryset, view):
         return queryset.filter(
-            Bool(must=[F('term', **{'features.has_openmobileacl': True})]))
+            Bool(must=[F('term', features='openmobileacl')]))
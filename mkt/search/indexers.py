@@ -1,24 +1,36 @@
+import collections
+import hashlib
+import json
 import logging
 import sys
 
 from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
 
 import elasticsearch
 from celery import task
 from elasticsearch import helpers
 from elasticsearch_dsl import Search
+from statsd import statsd
 
 import mkt
 from lib.es.models import Reindexing
 from lib.post_request_task.task import task as post_request_task
 from mkt.constants.regions import MATURE_REGION_IDS
-from mkt.search.utils import get_boost
+from mkt.search.signals import index_updated
+from mkt.search.utils import get_boost, invalidate_search_responses
 from mkt.site.decorators import use_master
+from mkt.site.utils import cache_ns_key, chunked
 from mkt.translations.utils import to_language
 
 
 log = logging.getLogger('z.task')
 
+# 0 is a special region when considering popularity/trending, it's the one
+# holding the global value.
+ALL_REGIONS_ID = 0
+
 
 class BaseIndexer(object):
     """
@@ -28,6 +40,9 @@ class BaseIndexer(object):
     - get_mapping(cls)
     - extract_document(cls, pk=None, obj=None)
 
+    It can also override extract_documents(cls, objs) to fetch related data
+    for a whole batch of objects at once.
+
     """
     _es = {}
 
@@ -39,6 +54,14 @@ class BaseIndexer(object):
     # about 2.5mb of data to Elasticsearch during bulk indexing.
     chunk_size = 500
 
+    # Maximum size in bytes of a single bulk request. Requests are split before
+    # they reach this size, whatever the number of documents.
+    bulk_max_bytes = 10 * 1024 * 1024
+
+    # Top level document fields left out of the fingerprints: a document that
+    # only differs from the indexed one by these is not written again.
+    fingerprint_exclude = ('modified',)
+
     @classmethod
     def _key(cls, es_settings):
         """
@@ -64,6 +87,9 @@ class BaseIndexer(object):
             'hosts': settings.ES_HOSTS,
             'timeout': getattr(settings, 'ES_TIMEOUT', 10),
         }
+        if getattr(settings, 'ES_CONNECTION_CLASS', None):
+            defaults['connection_class'] = import_string(
+                settings.ES_CONNECTION_CLASS)
         defaults.update(overrides)
 
         key = cls._key(defaults)
@@ -83,17 +109,224 @@ class BaseIndexer(object):
                  body=document, id=id_)
 
     @classmethod
-    def bulk_index(cls, documents, id_field='id', es=None, index=None):
-        """Index of a bunch of documents."""
+    def bulk_index(cls, documents, id_field='id', es=None, index=None,
+                   indices=None, skip_unchanged=False, written_ids=None):
+        """
+        Index a bunch of documents.
+
+        If `indices` is provided, the documents are indexed in each of them
+        instead of only `index`. Returns the list of failed bulk items.
+
+        If `skip_unchanged` is True, documents identical to the ones we last
+        wrote in an index are not sent again (see `get_fingerprints()`).
+
+        If `written_ids` is a list, the ids of the documents that were
+        successfully written are appended to it.
+        """
         es = es or cls.get_es()
-        index = index or cls.get_index()
+        indices = indices or [index or cls.get_index()]
+        type = cls.get_mapping_type_name()
+
+        if not settings.ES_USE_FINGERPRINTS:
+            documents = list(documents)
+            actions = (
+                {'_index': idx, '_type': type, '_id': d[id_field],
+                 '_source': d}
+                for d in documents for idx in indices)
+            errors = cls.bulk(actions, es=es)
+            if written_ids is not None:
+                failed = cls.failed_ids(errors)
+                written_ids.extend(d[id_field] for d in documents
+                                   if unicode(d[id_field]) not in failed)
+            return errors
+
+        documents = list(documents)
+        ids = [d[id_field] for d in documents]
+        fingerprints = [cls.fingerprint(d) for d in documents]
+
+        actions, written, skipped = [], {}, 0
+        for idx in indices:
+            stored = cls.get_fingerprints(ids, idx) if skip_unchanged else {}
+            for id_, doc, fingerprint in zip(ids, documents, fingerprints):
+                if stored.get(id_) == fingerprint:
+                    skipped += 1
+                    continue
+                actions.append({'_index': idx, '_type': type, '_id': id_,
+                                '_source': doc})
+                written[(idx, unicode(id_))] = (id_, fingerprint)
+
+        errors = cls.bulk(actions, es=es) if actions else []
+
+        # Only remember what was actually written. ES reports the concrete
+        # index of the failed items, not the alias we wrote to, so a failure
+        # forgets the document in all the indices.
+        failed = cls.failed_ids(errors)
+        written = dict((key, v) for key, v in written.items()
+                       if key[1] not in failed)
+        for idx in indices:
+            cls.set_fingerprints(
+                dict(v for (i, _), v in written.items() if i == idx), idx)
+        if written_ids is not None:
+            written_ids.extend(id_ for id_ in ids
+                               if any((idx, unicode(id_)) in written
+                                      for idx in indices))
+
+        statsd.incr('search.fingerprint.%s.written' % type, len(written))
+        statsd.incr('search.fingerprint.%s.skipped' % type, skipped)
+        if skipped:
+            log.info('Skipped {0} unchanged {1} documents.'.format(
+                skipped, cls.get_model()._meta.model_name))
+        return errors
+
+    @staticmethod
+    def failed_ids(errors):
+        """Returns the set of the ids of failed bulk items, as unicode."""
+        return set(unicode(item.values()[0].get('_id')) for item in errors)
+
+    @classmethod
+    def bulk_unindex(cls, ids, es=None, index=None, indices=None):
+        """
+        Remove a bunch of documents from the index.
+
+        If `indices` is provided, the documents are removed from each of them
+        instead of only `index`. Returns the list of failed bulk items.
+        """
+        es = es or cls.get_es()
+        indices = indices or [index or cls.get_index()]
         type = cls.get_mapping_type_name()
 
-        actions = [
-            {'_index': index, '_type': type, '_id': d['id'], '_source': d}
-            for d in documents]
+        for idx in indices:
+            cls.delete_fingerprints(ids, idx)
+
+        actions = (
+            {'_op_type': 'delete', '_index': idx, '_type': type, '_id': id_}
+            for id_ in ids for idx in indices)
 
-        helpers.bulk(es, actions)
+        return cls.bulk(actions, es=es)
+
+    @classmethod
+    def fingerprint(cls, document):
+        """
+        Returns a stable hash of the content of `document`, without the
+        `fingerprint_exclude` fields.
+        """
+        document = dict((k, v) for k, v in document.items()
+                        if k not in cls.fingerprint_exclude)
+        return hashlib.md5(json.dumps(document, sort_keys=True,
+                                      default=unicode)).hexdigest()
+
+    @classmethod
+    def _fingerprint_keys(cls, ids, index):
+        """Returns a dict mapping `ids` to their fingerprint cache keys."""
+        prefix = cache_ns_key('es-fingerprints:%s' % index)
+        return dict((id_, '%s:%s' % (prefix, id_)) for id_ in ids)
+
+    @classmethod
+    def get_fingerprints(cls, ids, index):
+        """
+        Returns a dict mapping `ids` to the fingerprint of the document we
+        last wrote in `index`, for the ones we know about.
+
+        Fingerprints are kept in the cache, so they are only a hint: an
+        unknown fingerprint just means the document will be written.
+        """
+        keys = cls._fingerprint_keys(ids, index)
+        stored = cache.get_many(keys.values())
+        return dict((id_, stored[key]) for id_, key in keys.items()
+                    if key in stored)
+
+    @classmethod
+    def set_fingerprints(cls, fingerprints, index):
+        """Store `fingerprints`, a dict mapping ids to fingerprints."""
+        if fingerprints:
+            keys = cls._fingerprint_keys(fingerprints.keys(), index)
+            cache.set_many(dict((keys[id_], fingerprint) for id_, fingerprint
+                                in fingerprints.items()),
+                           settings.ES_FINGERPRINTS_TIMEOUT)
+
+    @classmethod
+    def delete_fingerprints(cls, ids, index):
+        """Forget the fingerprints of `ids`, e.g. after changing them."""
+        if settings.ES_USE_FINGERPRINTS and ids:
+            cache.delete_many(cls._fingerprint_keys(ids, index).values())
+
+    @classmethod
+    def invalidate_fingerprints(cls, index):
+        """Forget all the fingerprints for `index`."""
+        cache_ns_key('es-fingerprints:%s' % index, increment=True)
+
+    @classmethod
+    def bulk_update(cls, partial_documents, es=None, index=None,
+                    indices=None):
+        """
+        Partially update a bunch of documents.
+
+        `partial_documents` is a dict mapping document ids to the fields to
+        update. If `indices` is provided, the documents are updated in each of
+        them instead of only `index`. Returns the list of failed bulk items.
+        """
+        es = es or cls.get_es()
+        indices = indices or [index or cls.get_index()]
+        type = cls.get_mapping_type_name()
+
+        # The documents won't match their fingerprints anymore.
+        for idx in indices:
+            cls.delete_fingerprints(partial_documents.keys(), idx)
+
+        actions = (
+            {'_op_type': 'update', '_index': idx, '_type': type, '_id': id_,
+             'doc': doc}
+            for id_, doc in partial_documents.iteritems() for idx in indices)
+
+        return cls.bulk(actions, es=es)
+
+    @classmethod
+    def bulk(cls, actions, es=None):
+        """
+        Send `actions` to Elasticsearch using the bulk API.
+
+        Requests are split so that they contain at most `chunk_size` actions
+        and stay under `bulk_max_bytes`. Failed items are logged, except for
+        deletions of documents that were not in the index, and returned.
+        """
+        es = es or cls.get_es()
+        serializer = es.transport.serializer
+
+        errors = []
+        chunk, chunk_bytes = [], 0
+        for action in actions:
+            action_bytes = len(serializer.dumps(action))
+            if chunk and (len(chunk) >= cls.chunk_size or
+                          chunk_bytes + action_bytes > cls.bulk_max_bytes):
+                errors.extend(cls._send_bulk_chunk(es, chunk))
+                chunk, chunk_bytes = [], 0
+            chunk.append(action)
+            chunk_bytes += action_bytes
+        if chunk:
+            errors.extend(cls._send_bulk_chunk(es, chunk))
+        return errors
+
+    @classmethod
+    def _send_bulk_chunk(cls, es, chunk):
+        """Send one bulk request and report its failed items."""
+        model_name = cls.get_model()._meta.model_name
+        success, items = helpers.bulk(es, chunk, chunk_size=len(chunk),
+                                      raise_on_error=False)
+
+        errors = []
+        for item in items:
+            op_type, result = item.items()[0]
+            if (op_type in ('delete', 'update') and
+                    result.get('status') == 404):
+                # Ignore if it's not there.
+                log.info(u'[%s:%s] object not found in index %s' %
+                         (model_name, result.get('_id'), result.get('_index')))
+                continue
+            log.error(u'[%s:%s] bulk %s failed in index %s: %s' %
+                      (model_name, result.get('_id'), op_type,
+                       result.get('_index'), result.get('error')))
+            errors.append(item)
+        return errors
 
     @classmethod
     def index_ids(cls, ids, no_delay=False):
@@ -285,14 +518,27 @@ class BaseIndexer(object):
         indices = Reindexing.get_indices(index)
 
         es = cls.get_es(urls=settings.ES_URLS)
-        for id_ in ids:
-            for idx in indices:
-                try:
-                    cls.unindex(id_=id_, es=es, index=idx)
-                except elasticsearch.exceptions.NotFoundError:
-                    # Ignore if it's not there.
-                    log.info(u'[%s:%s] object not found in index' %
-                             (cls.get_model()._meta.model_name, id_))
+        cls.bulk_unindex(ids, es=es, indices=indices)
+        invalidate_search_responses()
+        index_updated.send(sender=cls, ids=ids)
+
+    @classmethod
+    def extract_documents(cls, objs):
+        """
+        Extracts the documents for a list of instances, skipping (and logging)
+        the ones that fail.
+
+        By default this calls extract_document() for each instance. Indexers
+        can override it to fetch related data once for the whole list.
+        """
+        docs = []
+        for obj in objs:
+            try:
+                docs.append(cls.extract_document(obj.id, obj=obj))
+            except Exception as e:
+                log.error(u'Failed to index {0} {1}: {2}'.format(
+                    cls.get_model()._meta.model_name, obj.id, repr(e)))
+        return docs
 
     @classmethod
     def run_indexing(cls, ids, ES, index=None, **kw):
@@ -300,17 +546,9 @@ class BaseIndexer(object):
         sys.stdout.write('Indexing {0} {1}\n'.format(
             len(ids), cls.get_model()._meta.model_name))
 
-        # Fetch QS given the IDs.
-        docs = []
+        # Fetch QS given the IDs and extract the documents.
         qs = cls.get_model().objects.filter(id__in=ids)
-
-        # For each object, extract document.
-        for obj in qs:
-            try:
-                docs.append(cls.extract_document(obj.id, obj=obj))
-            except Exception as e:
-                sys.stdout.write('Failed to index {0} {1}: {2}\n'.format(
-                    cls.get_model()._meta.model_name, obj.id, e))
+        docs = cls.extract_documents(qs)
 
         # Index.
         if docs:
@@ -415,11 +653,76 @@ class BaseIndexer(object):
         return mapping
 
     @classmethod
-    def extract_popularity_trending_boost(cls, obj):
-        # 0 is a special region when considering popularity/trending, it's the
-        # one holding the global value.
-        ALL_REGIONS_ID = 0
+    def fetch_popularity_trending(cls, objs):
+        """
+        Returns a (popularity, trending) tuple of dicts mapping the ids of
+        `objs` to dicts of region ids to values, using one query for each.
+
+        The model needs `popularity` and `trending` reverse relations, like
+        Webapp and Website.
+        """
+        ids = [obj.id for obj in objs if not obj.is_dummy_content_for_qa()]
+        regions = MATURE_REGION_IDS + [ALL_REGIONS_ID]
+
+        results = []
+        for prop in ('popularity', 'trending'):
+            related = getattr(cls.get_model(), prop).related
+            fk_name = related.field.name
+            qs = (related.model.objects
+                  .filter(**{'%s__in' % fk_name: ids, 'region__in': regions})
+                  .values_list(fk_name, 'region', 'value'))
+            values = collections.defaultdict(dict)
+            for obj_id, region, value in qs:
+                values[obj_id][region] = value
+            results.append(dict(values))
+        return tuple(results)
+
+    @classmethod
+    def update_popularity_trending_boost(cls, ids, es=None, index=None):
+        """
+        Update the boost, popularity and trending fields of the documents
+        matching `ids`, and the fields depending on the boost, without
+        extracting the full documents.
+
+        If a reindexation is currently occurring, both the old and new indexes
+        are updated. Returns the list of failed bulk items.
+        """
+        log.info('Updating popularity and trending of {0} {1}'.format(
+            len(ids), cls.get_model()._meta.model_name))
 
+        errors = []
+        es = es or cls.get_es(urls=settings.ES_URLS)
+        indices = Reindexing.get_indices(index or cls.get_index())
+        for chunk in chunked(ids, cls.chunk_size):
+            objs = list(cls.get_indexable().filter(id__in=chunk)
+                        .no_transforms())
+            popularity, trending = cls.fetch_popularity_trending(objs)
+            docs = dict(
+                (obj.id, cls.extract_popularity_trending_boost(
+                    obj, popularity=popularity.get(obj.id, {}),
+                    trending=trending.get(obj.id, {})))
+                for obj in objs)
+            cls.extract_boost_dependent_fields(objs, docs)
+            errors.extend(cls.bulk_update(docs, es=es, indices=indices))
+        return errors
+
+    @classmethod
+    def extract_boost_dependent_fields(cls, objs, docs):
+        """
+        Adds to the partial documents `docs`, keyed by id, the other fields
+        computed from the boost of `objs`. Does nothing by default.
+        """
+
+    @classmethod
+    def extract_popularity_trending_boost(cls, obj, popularity=None,
+                                          trending=None):
+        """
+        Returns a dict with the boost, popularity and trending values to
+        store in ES for `obj`.
+
+        If `popularity` or `trending` dicts (mapping region ids to values) are
+        provided we'll use those instead of doing our own lookups.
+        """
         def get_dict(obj, prop):
             if obj.is_dummy_content_for_qa():
                 return {}
@@ -427,11 +730,17 @@ class BaseIndexer(object):
                 region__in=MATURE_REGION_IDS + [ALL_REGIONS_ID])
             return dict(qs.values_list('region', 'value'))
 
+        if obj.is_dummy_content_for_qa():
+            trending = popularity = {}
+        if trending is None:
+            trending = get_dict(obj, 'trending')
+        if popularity is None:
+            popularity = get_dict(obj, 'popularity')
+
         extend = {
-            'boost': get_boost(obj),
+            'boost': get_boost(obj,
+                               popularity=popularity.get(ALL_REGIONS_ID, 0)),
         }
-        trending = get_dict(obj, 'trending')
-        popularity = get_dict(obj, 'popularity')
 
         # Global popularity.
         extend['trending'] = trending.get(ALL_REGIONS_ID, 0)
@@ -500,7 +809,7 @@ class BaseIndexer(object):
         return extend_with_me
 
 
-@post_request_task(acks_late=True)
+@post_request_task(acks_late=True, coalesce=True)
 @use_master
 def index(ids, indexer, **kw):
     """
@@ -514,7 +823,13 @@ def index(ids, indexer, **kw):
     indices = Reindexing.get_indices(indexer.get_index())
 
     es = indexer.get_es(urls=settings.ES_URLS)
-    for obj in indexer.get_indexable().filter(id__in=ids):
-        doc = indexer.extract_document(obj.id, obj)
-        for idx in indices:
-            indexer.index(doc, id_=obj.id, es=es, index=idx)
+    written = []
+    for chunk in chunked(ids, indexer.chunk_size):
+        docs = indexer.extract_documents(
+            indexer.get_indexable().filter(id__in=chunk))
+        indexer.bulk_index(docs, es=es, indices=indices, skip_unchanged=True,
+                           written_ids=written)
+    # Cached responses only go stale if something changed in ES.
+    if written:
+        invalidate_search_responses()
+        index_updated.send(sender=indexer, ids=written)
@@ -0,0 +1,86 @@
+from optparse import make_option
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from mkt.feed.fakedata import generate_feed_data
+from mkt.search.benchmark import (Benchmark, ENDPOINTS, NO_CACHES, Recording,
+                                  RecordingConnection, ReplayConnection,
+                                  use_recording)
+from mkt.search.indexers import BaseIndexer
+from mkt.webapps.fakedata import generate_apps
+
+
+class Command(BaseCommand):
+    """
+    Usage:
+
+        python manage.py benchmark_search [--seed=<number of apps>]
+            [--record=<file> | --replay=<file>]
+
+    Without --replay, the endpoints are benchmarked against the local ES, and
+    its responses are saved in the --record file if given. With --replay, the
+    ES responses come from that file instead, to measure the cost of building
+    the queries and serializing the results alone.
+    """
+
+    help = 'Benchmark the search, feed and Rocketbar API endpoints'
+    option_list = BaseCommand.option_list + (
+        make_option('--seed', type='int', default=0,
+                    help=('Generate that many apps and the example feed, '
+                          'and reindex, before running the benchmark')),
+        make_option('--record',
+                    help='Save the ES responses in this file'),
+        make_option('--replay',
+                    help='Serve the ES responses recorded in this file'),
+        make_option('--endpoint', action='append',
+                    choices=[name for name, path, queries in ENDPOINTS],
+                    help='Only benchmark this endpoint, can be repeated'),
+        make_option('--iterations', type='int', default=20,
+                    help='Number of timed requests for each query'),
+        make_option('--warmup', type='int', default=2,
+                    help='Number of untimed requests for each query'),
+        make_option('--with-caches', action='store_true', default=False,
+                    help=('Keep the response, feed snapshot and Rocketbar '
+                          'caches enabled')))
+
+    def handle(self, *args, **kwargs):
+        if kwargs['replay'] and (kwargs['record'] or kwargs['seed']):
+            raise CommandError('--replay is incompatible with --record and '
+                               '--seed.')
+
+        if kwargs['seed']:
+            generate_apps(hosted=kwargs['seed'])
+            generate_feed_data()
+            call_command('reindex', workers=1)
+            BaseIndexer.get_es().indices.refresh()
+
+        if kwargs['replay']:
+            connection_class = ReplayConnection
+            recording = Recording.load(kwargs['replay'])
+        else:
+            connection_class = RecordingConnection
+            recording = Recording()
+
+        endpoints = [endpoint for endpoint in ENDPOINTS
+                     if not kwargs['endpoint'] or
+                     endpoint[0] in kwargs['endpoint']]
+        benchmark = Benchmark(recording, endpoints=endpoints,
+                              iterations=kwargs['iterations'],
+                              warmup=kwargs['warmup'])
+        with override_settings(**({} if kwargs['with_caches'] else
+                                  NO_CACHES)):
+            with use_recording(connection_class, recording):
+                results = benchmark.run()
+
+        if recording.misses:
+            raise CommandError(
+                '%s ES requests were not recorded, record them again with '
+                '--record: %s' % (len(recording.misses),
+                                  ', '.join(sorted(set(recording.misses)))))
+        if kwargs['record']:
+            recording.save(kwargs['record'])
+
+        for line in benchmark.report(results):
+            self.stdout.write(line)
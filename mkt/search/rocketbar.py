@@ -0,0 +1,165 @@
+import bisect
+import re
+import threading
+import time
+
+from django.conf import settings
+
+import commonware.log
+from elasticsearch import ElasticsearchException, helpers
+
+from mkt.site.utils import cache_ns_key
+from mkt.webapps.indexers import WebappIndexer
+
+
+log = commonware.log.getLogger('z.search')
+
+non_word_re = re.compile(r'\W+', re.UNICODE)
+
+# The index of the current process, when its version was last checked, and
+# the thread building its next version.
+_local = {'index': None, 'checked': 0, 'builder': None}
+_builder_lock = threading.Lock()
+
+
+def normalize(text):
+    """Lowercases `text` and collapses anything but letters and digits."""
+    return non_word_re.sub(u' ', text.lower()).strip()
+
+
+class PrefixIndex(object):
+    """
+    An in-memory copy of the `name_suggest` completion field, answering the
+    same prefix lookups as the ES completion suggester.
+
+    Each suggestion is stored once, ordered by weight. Prefix lookups are
+    done with a binary search over the sorted, normalized inputs, and the
+    results for the shortest prefixes, which match the most names, are
+    precomputed.
+    """
+    short_prefix_length = 2
+    bucket_size = 10
+
+    def __init__(self, suggestions, version=None, max_apps=None):
+        self.version = version
+        suggestions = sorted(suggestions, key=lambda s: -s['weight'])
+        if max_apps:
+            suggestions = suggestions[:max_apps]
+
+        # Same format as the options returned by the completion suggester.
+        self.options = []
+        keys = set()
+        for i, suggestion in enumerate(suggestions):
+            self.options.append({'text': suggestion['output'],
+                                 'score': float(suggestion['weight']),
+                                 'payload': suggestion['payload']})
+            inputs = suggestion['input']
+            if isinstance(inputs, basestring):
+                inputs = [inputs]
+            keys.update((normalize(text), i) for text in inputs if text)
+
+        # Parallel lists of normalized inputs and the position of their
+        # suggestion in `self.options`, sorted by input.
+        keys = sorted((text, i) for text, i in keys if text)
+        self.keys = [text for text, i in keys]
+        self.positions = [i for text, i in keys]
+
+        self.buckets = {}
+        for text in self.keys:
+            for length in range(1, self.short_prefix_length + 1):
+                prefix = text[:length]
+                if len(prefix) == length and prefix not in self.buckets:
+                    self.buckets[prefix] = self._lookup(prefix,
+                                                        self.bucket_size)
+
+    def __len__(self):
+        return len(self.options)
+
+    def _lookup(self, prefix, size):
+        start = bisect.bisect_left(self.keys, prefix)
+        end = bisect.bisect_left(self.keys, prefix + u'\uffff', start)
+        positions = sorted(set(self.positions[start:end]))[:size]
+        return [self.options[i] for i in positions]
+
+    def lookup(self, text, size):
+        """
+        Returns the `size` heaviest suggestions with an input starting with
+        `text`.
+        """
+        prefix = normalize(text)
+        if not prefix or size <= 0:
+            return []
+        if (len(prefix) <= self.short_prefix_length and
+                size <= self.bucket_size):
+            return self.buckets.get(prefix, [])[:size]
+        return self._lookup(prefix, size)
+
+
+def build_prefix_index(version=None):
+    """
+    Builds a `PrefixIndex` from the `name_suggest` field of the documents in
+    the apps index.
+    """
+    es = WebappIndexer.get_es()
+    hits = helpers.scan(
+        es, index=WebappIndexer.get_index(),
+        doc_type=WebappIndexer.get_mapping_type_name(),
+        query={'query': {'filtered': {
+            'filter': {'exists': {'field': 'name_suggest'}}}}},
+        _source_include=['name_suggest'])
+    return PrefixIndex((hit['_source']['name_suggest'] for hit in hits),
+                       version=version,
+                       max_apps=settings.ROCKETBAR_INDEX_MAX_APPS)
+
+
+def rebuild_prefix_index(version):
+    """
+    Builds the `PrefixIndex` of the current process for the given version,
+    replacing the current one once it is ready.
+    """
+    try:
+        index = build_prefix_index(version=version)
+    except ElasticsearchException as e:
+        # Keep the stale index, if any, until the next check.
+        log.error('Could not build the rocketbar index: %s' % e)
+        return
+    _local['index'] = index
+    log.info('Built the rocketbar index with %s apps.' % len(index))
+
+
+def get_prefix_index():
+    """
+    Returns the `PrefixIndex` of the current process, or None if it is
+    disabled or has not been built yet.
+
+    Every `ROCKETBAR_INDEX_CHECK_INTERVAL` seconds, its version is compared to
+    the one in the cache and the index is rebuilt in a background thread if
+    they differ, the current one being used until then. The version is bumped
+    periodically by the `update_rocketbar_index` cron.
+    """
+    if not settings.ROCKETBAR_INDEX_MAX_APPS:
+        return None
+
+    now = time.time()
+    if now - _local['checked'] < settings.ROCKETBAR_INDEX_CHECK_INTERVAL:
+        return _local['index']
+    _local['checked'] = now
+
+    version = cache_ns_key('rocketbar-index')
+    index = _local['index']
+    if index is None or index.version != version:
+        with _builder_lock:
+            builder = _local['builder']
+            if builder is None or not builder.is_alive():
+                builder = threading.Thread(target=rebuild_prefix_index,
+                                           args=(version,),
+                                           name='rocketbar-index')
+                builder.daemon = True
+                _local['builder'] = builder
+                builder.start()
+    return _local['index']
+
+
+def invalidate_prefix_index():
+    """Makes every process rebuild its `PrefixIndex` at its next check."""
+    cache_ns_key('rocketbar-index', increment=True)
@@ -0,0 +1,7 @@
+import django.dispatch
+
+
+# Sent by the index and unindexer tasks once documents have been written to or
+# removed from ES, with the indexer class as sender and the `ids` of those
+# documents. The changes are searchable after the next refresh of the index.
+index_updated = django.dispatch.Signal(providing_args=['ids'])
@@ -0,0 +1,38 @@
+import logging
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.urlresolvers import reverse
+from django.test.client import RequestFactory
+
+from lib.post_request_task.task import task as post_request_task
+from mkt.search.utils import get_openmobileacl_list
+
+log = logging.getLogger('z.search')
+
+
+@post_request_task(coalesce=True)
+def rebuild_openmobileacl_list(ids):
+    """
+    Rebuild the materialized OpenMobileACL list if any of the given apps is
+    or may now be part of it.
+    """
+    from mkt.search.views import OpenMobileACLSearchView
+    from mkt.webapps.models import AppFeatures
+
+    acl = get_openmobileacl_list()
+    if acl is None:
+        # Nothing to refresh, the next request will build the list.
+        return
+    if (not acl['app_ids'].intersection(ids) and
+            not AppFeatures.objects.filter(version__addon__in=ids,
+                                           has_openmobileacl=True).exists()):
+        return
+
+    log.info('Refreshing the OpenMobileACL list after apps %s changed'
+             % ids)
+    request = RequestFactory().get(
+        reverse('api-v2:openmobile_acl-search-api'))
+    request.API = True
+    request.API_VERSION = 2
+    request.user = AnonymousUser()
+    OpenMobileACLSearchView.as_view(refresh_list=True)(request)
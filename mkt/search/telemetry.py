@@ -0,0 +1,178 @@
+import json
+import random
+import threading
+import time
+
+from django.conf import settings
+
+import commonware.log
+from elasticsearch_dsl.filter import Filter
+from elasticsearch_dsl.query import Query
+from statsd import statsd
+
+
+log = commonware.log.getLogger('z.search')
+
+_local = threading.local()
+
+# Parameters of compound clauses which are also the names of clauses.
+CLAUSE_PARAMS = ('filter', 'query')
+
+
+def get_telemetry():
+    """Returns the SearchTelemetry of the current request, or None."""
+    return getattr(_local, 'telemetry', None)
+
+
+def record_search(took, start):
+    """
+    Records an ES request which started at `start` and took `took`
+    milliseconds in ES for the current request, if it has a SearchTelemetry.
+    """
+    telemetry = get_telemetry()
+    if telemetry is not None:
+        telemetry.searches.append((took, elapsed(start)))
+
+
+def elapsed(start):
+    """Returns the number of milliseconds since `start`."""
+    return (time.time() - start) * 1000
+
+
+def count_clauses(body):
+    """Returns the number of query and filter clauses in a search body."""
+    names = (set(Query._classes) | set(Filter._classes)) - set(CLAUSE_PARAMS)
+
+    def count(value):
+        if isinstance(value, dict):
+            return sum(int(key in names) + count(v)
+                       for key, v in value.items())
+        if isinstance(value, list):
+            return sum(count(v) for v in value)
+        return 0
+
+    return sum(count(body.get(key))
+               for key in ('query', 'filter', 'post_filter'))
+
+
+class SearchTelemetry(object):
+    """
+    Where the time of a search request goes: building the query in each filter
+    backend, the ES requests, and the serialization of the results.
+
+    Everything is sent to statsd under `search.view.<name>.` by emit(), and
+    slow requests are logged for a sample of them.
+    """
+
+    def __init__(self, name, path=None):
+        self.name = name
+        self.path = path
+        self.start = time.time()
+        # List of (backend name, milliseconds).
+        self.filters = []
+        # List of (ES took, wall time) in milliseconds.
+        self.searches = []
+        self.body = None
+        self.clauses = None
+        self.serialize_time = None
+
+    def activate(self):
+        """Makes this the SearchTelemetry of the current request."""
+        _local.telemetry = self
+        return self
+
+    def deactivate(self):
+        if get_telemetry() is self:
+            _local.telemetry = None
+
+    def record_filter(self, backend, start):
+        self.filters.append((backend.__name__, elapsed(start)))
+
+    def record_query(self, queryset):
+        """Records the shape of the query built by the filter backends."""
+        if hasattr(queryset, 'to_dict'):
+            self.body = queryset.to_dict()
+            self.clauses = count_clauses(self.body)
+
+    def record_serialize(self, start):
+        self.serialize_time = elapsed(start)
+
+    def get_timings(self, response_bytes):
+        """Returns the dict of the values to send to statsd."""
+        timings = {'bytes': response_bytes, 'total': elapsed(self.start)}
+        if self.filters:
+            for name, value in self.filters:
+                timings['filter.%s' % name] = value
+            timings['filters'] = sum(value for name, value in self.filters)
+        if self.searches:
+            timings['es.took'] = sum(took for took, wall in self.searches)
+            timings['es.wall'] = sum(wall for took, wall in self.searches)
+            timings['es.overhead'] = timings['es.wall'] - timings['es.took']
+        if self.clauses is not None:
+            timings['clauses'] = self.clauses
+        if self.serialize_time is not None:
+            timings['serialize'] = self.serialize_time
+        return timings
+
+    def emit(self, response_bytes):
+        timings = self.get_timings(response_bytes)
+        for key, value in timings.items():
+            statsd.timing('search.view.%s.%s' % (self.name, key), value)
+
+        if (timings['total'] >= settings.SEARCH_SLOW_QUERY_THRESHOLD and
+                random.random() < settings.SEARCH_SLOW_QUERY_SAMPLE_RATE):
+            log.warning('Slow search: %s' % json.dumps({
+                'view': self.name,
+                'path': self.path,
+                'timings': timings,
+                'searches': self.searches,
+                'query': self.body,
+            }, default=unicode))
+
+
+class SearchTelemetryMixin(object):
+    """
+    Mixin for search views recording a SearchTelemetry for each request, when
+    settings.SEARCH_TELEMETRY is True.
+    """
+    telemetry = None
+
+    def initial(self, request, *args, **kwargs):
+        super(SearchTelemetryMixin, self).initial(request, *args, **kwargs)
+        if settings.SEARCH_TELEMETRY:
+            self.telemetry = SearchTelemetry(
+                self.__class__.__name__, request.get_full_path()).activate()
+
+    def filter_queryset(self, queryset):
+        if self.telemetry is None:
+            return super(SearchTelemetryMixin, self).filter_queryset(queryset)
+
+        for backend in self.get_filter_backends():
+            start = time.time()
+            queryset = backend().filter_queryset(self.request, queryset, self)
+            self.telemetry.record_filter(backend, start)
+        self.telemetry.record_query(queryset)
+        return queryset
+
+    def get_pagination_serializer(self, page):
+        serializer = super(SearchTelemetryMixin,
+                           self).get_pagination_serializer(page)
+        if self.telemetry is not None:
+            # Serialize now to time it, the data is kept on the serializer.
+            start = time.time()
+            serializer.data
+            self.telemetry.record_serialize(start)
+        return serializer
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super(SearchTelemetryMixin, self).finalize_response(
+            request, response, *args, **kwargs)
+        telemetry = self.telemetry
+        if telemetry is not None:
+            telemetry.deactivate()
+            if getattr(response, 'is_rendered', True):
+                telemetry.emit(len(response.content))
+            else:
+                response.add_post_render_callback(
+                    lambda response: telemetry.emit(len(response.content)))
+        return response
@@ -0,0 +1,129 @@
+import os
+import tempfile
+
+from nose.tools import eq_, ok_
+
+from elasticsearch.exceptions import TransportError
+
+from mkt.search.benchmark import (Benchmark, NO_CACHES, percentile,
+                                  Recording, RecordingConnection,
+                                  ReplayConnection, request_key,
+                                  use_recording)
+from mkt.site.tests import app_factory, ESTestCase, TestCase
+from mkt.webapps.indexers import WebappIndexer
+
+
+class TestRecording(TestCase):
+
+    def test_request_key(self):
+        eq_(request_key('GET', '/apps/_search', {'a': 1, 'b': 2},
+                        '{"query": {"term": {"a": 1}}, "size": 10}'),
+            request_key('GET', '/apps/_search', {'b': 2, 'a': 1},
+                        '{"size": 10, "query": {"term": {"a": 1}}}'))
+        ok_(request_key('GET', '/apps/_search', None, '{"size": 10}') !=
+            request_key('GET', '/apps/_search', None, '{"size": 20}'))
+        ok_(request_key('GET', '/apps/_search', None, None) !=
+            request_key('POST', '/apps/_search', None, None))
+
+    def test_request_key_msearch(self):
+        eq_(request_key('GET', '/_msearch', None,
+                        '{"index": "apps", "type": "webapp"}\n{"size": 1}\n'),
+            request_key('GET', '/_msearch', None,
+                        '{"type": "webapp", "index": "apps"}\n{"size": 1}'))
+
+    def test_save_load(self):
+        recording = Recording()
+        recording.add('GET', '/apps/_search', None, '{}', 200, u'{"a": 1}')
+        fd, filename = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            recording.save(filename)
+            recording = Recording.load(filename)
+        finally:
+            os.remove(filename)
+        eq_(recording.get('GET', '/apps/_search', None, '{}'),
+            {'request': 'GET /apps/_search', 'status': 200,
+             'data': u'{"a": 1}'})
+        eq_(recording.misses, [])
+
+        eq_(recording.get('GET', '/apps/_search', None, '{"size": 1}'), None)
+        eq_(recording.misses, ['GET /apps/_search'])
+
+    def test_replay(self):
+        recording = Recording()
+        recording.add('GET', '/apps/_search', None, '{}', 200, u'{"a": 1}')
+        with use_recording(ReplayConnection, recording):
+            eq_(ReplayConnection().perform_request('GET', '/apps/_search',
+                                                   body='{}'),
+                (200, {}, u'{"a": 1}'))
+            with self.assertRaises(TransportError):
+                ReplayConnection().perform_request('GET', '/apps/_search',
+                                                   body='{"size": 1}')
+        eq_(recording.requests, 2)
+        eq_(recording.misses, ['GET /apps/_search'])
+        eq_(ReplayConnection.recording, None)
+
+
+class TestRecordReplay(ESTestCase):
+
+    def setUp(self):
+        self.app = app_factory()
+        self.refresh('webapp')
+
+    def tearDown(self):
+        self.app.delete()
+        self.refresh('webapp')
+        super(TestRecordReplay, self).tearDown()
+
+    def test_record_replay(self):
+        recording = Recording()
+        with use_recording(RecordingConnection, recording):
+            recorded = WebappIndexer.search().execute()
+        eq_(recording.requests, 1)
+        eq_(len(recording.responses), 1)
+
+        with use_recording(ReplayConnection, recording):
+            replayed = WebappIndexer.search().execute()
+        eq_(recording.requests, 2)
+        eq_(recording.misses, [])
+        eq_([hit.id for hit in replayed], [hit.id for hit in recorded])
+        eq_(replayed[0].id, self.app.pk)
+
+    def test_get_es(self):
+        with use_recording(ReplayConnection, Recording()):
+            es = WebappIndexer.get_es()
+        ok_(isinstance(es.transport.get_connection(), ReplayConnection))
+
+    def test_run(self):
+        recording = Recording()
+        endpoints = [('search', '/api/v2/apps/search/', [{}, {'q': 'x'}])]
+        with self.settings(**NO_CACHES), use_recording(RecordingConnection,
+                                                       recording):
+            results = Benchmark(recording, endpoints=endpoints, iterations=3,
+                                warmup=1).run()
+        eq_(results.keys(), ['search'])
+        eq_(len(results['search']['latencies']), 6)
+        eq_(len(results['search']['queries']), 6)
+        eq_(results['search']['es_requests'], [1] * 6)
+        eq_(results['search']['errors'], 0)
+
+
+class TestBenchmark(TestCase):
+
+    def test_percentile(self):
+        values = [5, 1, 4, 2, 3]
+        eq_(percentile(values, 50), 3)
+        eq_(percentile(values, 90), 5)
+        eq_(percentile(values, 1), 1)
+        eq_(percentile([7], 99), 7)
+
+    def test_report(self):
+        lines = Benchmark.report({'search': {
+            'latencies': [10.0, 20.0, 30.0, 40.0], 'queries': [1, 1, 2, 2],
+            'es_requests': [1, 1, 1, 1], 'errors': 1}})
+        eq_(len(lines), 2)
+        eq_(lines[0].split(), ['endpoint', 'requests', 'p50', 'ms', 'p90',
+                               'ms', 'p99', 'ms', 'max', 'ms', 'sql', 'es',
+                               'errors'])
+        eq_(lines[1].split(), ['search', '4', '20.0', '40.0', '40.0', '40.0',
+                               '1.5', '1.0', '1'])
@@ -81,6 +81,28 @@ class TestQueryFilter(FilterTestsBase):
              'filter': {'term': {'preferred_regions': mkt.regions.FRA.id}}}
             in qs['query']['function_score']['functions'])
 
+    def test_template_reused(self):
+        SearchQueryFilter._templates.clear()
+        self._filter(data={'q': 'search terms'})
+        self._filter(data={'q': 'other terms'})
+        eq_(SearchQueryFilter._templates.keys(),
+            [('english', mkt.regions.RESTOFWORLD.id, False, False)])
+        self._filter(data={'q': 'term'})
+        eq_(len(SearchQueryFilter._templates), 2)
+
+    def test_template_escaping(self):
+        qs = self._filter(data={'q': u'"qu\xf3tes"'})
+        should = (qs['query']['function_score']['query']['bool']['should'])
+        ok_({'term': {'guid': {'value': u'"qu\xf3tes"', 'boost': 10}}}
+            in should)
+
+    def test_template_source(self):
+        template = SearchQueryFilter.get_template(
+            'english', mkt.regions.FRA.id, single_word=True, numeric=False)
+        ok_('"{{q}}"' in template.source)
+        eq_(template.render('term'),
+            json.loads(template.source.replace('{{q}}', 'term')))
+
     @override_settings(ES_USE_PLUGINS=True)
     def test_polish_analyzer(self):
         """
@@ -314,14 +336,25 @@ class TestProfileFilter(FilterTestsBase):
             profile[feature] = False
         return {'pro': profile.to_signature(), 'dev': 'firefoxos'}
 
+    def missing_features(self, qs):
+        must_not = qs['query']['filtered']['filter']['bool']['must_not']
+        eq_(len(must_not), 1)
+        return must_not[0]['terms']['features']
+
     def test_filter_all_features_present(self):
         qs = self._filter(data=self.profile_qs())
         ok_('filtered' not in qs['query'].keys())
 
     def test_filter_one_feature_present(self):
         qs = self._filter(data=self.profile_qs(disabled_features=['sms']))
-        ok_({'term': {'features.has_sms': True}}
-            in qs['query']['filtered']['filter']['bool']['must_not'])
+        eq_(self.missing_features(qs), ['sms'])
+
+    def test_filter_cache_key(self):
+        data = self.profile_qs(disabled_features=['sms'])
+        qs = self._filter(data=data)
+        terms = qs['query']['filtered']['filter']['bool']['must_not'][0]
+        eq_(terms['terms']['_cache_key'], 'profile:%s' % data['pro'])
+        ok_(terms['terms']['_cache'])
 
     def test_filter_one_feature_present_desktop(self):
         data = self.profile_qs(disabled_features=['sms'])
@@ -332,10 +365,7 @@ class TestProfileFilter(FilterTestsBase):
     def test_filter_multiple_features_present(self):
         qs = self._filter(
             data=self.profile_qs(disabled_features=['sms', 'apps']))
-        ok_({'term': {'features.has_sms': True}}
-            in qs['query']['filtered']['filter']['bool']['must_not'])
-        ok_({'term': {'features.has_apps': True}}
-            in qs['query']['filtered']['filter']['bool']['must_not'])
+        eq_(sorted(self.missing_features(qs)), ['apps', 'sms'])
 
 
 class TestSortingFilter(FilterTestsBase):
@@ -412,4 +442,4 @@ class TestOpenMobileACLFilter(FilterTestsBase):
     def test_feature_acl(self):
         qs = self._filter(self.req)
         eq_(qs['query']['filtered']['filter']['bool']['must'],
-            [{'term': {'features.has_openmobileacl': True}}])
+            [{'term': {'features': 'openmobileacl'}}])
@@ -1,7 +1,11 @@
-from nose.tools import eq_
+from django.test.utils import override_settings
 
-from mkt.search.indexers import BaseIndexer
+import mock
+from nose.tools import eq_, ok_
+
+from mkt.search.indexers import BaseIndexer, index
 from mkt.site.tests import TestCase
+from mkt.webapps.indexers import WebappIndexer
 
 
 class TestBaseIndexer(TestCase):
@@ -13,3 +17,160 @@ class TestBaseIndexer(TestCase):
         es1 = self.indexer().get_es()
         es2 = self.indexer().get_es()
         eq_(id(es1), id(es2))
+
+
+@mock.patch('mkt.search.indexers.helpers.bulk')
+class TestBulk(TestCase):
+
+    def setUp(self):
+        self.indexer = WebappIndexer
+        self.es = mock.Mock()
+        self.es.transport.serializer.dumps = lambda action: 'x' * 10
+
+    def test_bulk_index_indices(self, bulk_mock):
+        bulk_mock.return_value = (4, [])
+        docs = [{'id': 1}, {'id': 2}]
+        errors = self.indexer.bulk_index(docs, es=self.es,
+                                         indices=['old', 'new'])
+        eq_(errors, [])
+        eq_(bulk_mock.call_count, 1)
+        actions = bulk_mock.call_args[0][1]
+        eq_([(a['_index'], a['_id']) for a in actions],
+            [('old', 1), ('new', 1), ('old', 2), ('new', 2)])
+
+    def test_bulk_unindex(self, bulk_mock):
+        bulk_mock.return_value = (1, [
+            {'delete': {'_index': 'new', '_id': 1, 'status': 404}}])
+        errors = self.indexer.bulk_unindex([1], es=self.es,
+                                           indices=['old', 'new'])
+        # Documents that were not in the index are not errors.
+        eq_(errors, [])
+        actions = bulk_mock.call_args[0][1]
+        eq_([(a['_op_type'], a['_index'], a['_id']) for a in actions],
+            [('delete', 'old', 1), ('delete', 'new', 1)])
+
+    def test_bulk_errors(self, bulk_mock):
+        error = {'index': {'_index': 'new', '_id': 1, 'status': 400,
+                           'error': 'MapperParsingException'}}
+        bulk_mock.return_value = (0, [error])
+        eq_(self.indexer.bulk_index([{'id': 1}], es=self.es), [error])
+
+    def test_bulk_max_bytes(self, bulk_mock):
+        bulk_mock.return_value = (0, [])
+        with mock.patch.object(self.indexer, 'bulk_max_bytes', 25):
+            self.indexer.bulk_index([{'id': i} for i in range(5)],
+                                    es=self.es)
+        # Each action is 10 bytes, so we can only send 2 per request.
+        eq_([len(call[0][1]) for call in bulk_mock.call_args_list],
+            [2, 2, 1])
+
+    def test_bulk_chunk_size(self, bulk_mock):
+        bulk_mock.return_value = (0, [])
+        with mock.patch.object(self.indexer, 'chunk_size', 3):
+            self.indexer.bulk_index([{'id': i} for i in range(5)],
+                                    es=self.es)
+        eq_([len(call[0][1]) for call in bulk_mock.call_args_list], [3, 2])
+
+
+@override_settings(ES_USE_FINGERPRINTS=True)
+@mock.patch('mkt.search.indexers.helpers.bulk')
+class TestFingerprints(TestCase):
+
+    def setUp(self):
+        self.indexer = WebappIndexer
+        self.es = mock.Mock()
+        self.es.transport.serializer.dumps = lambda action: 'x' * 10
+        self.docs = [{'id': 1, 'name': 'a'}, {'id': 2, 'name': 'b'}]
+
+    def _indexed(self, bulk_mock):
+        if not bulk_mock.called:
+            return []
+        return [(a['_index'], a['_id']) for a in bulk_mock.call_args[0][1]]
+
+    def _index(self, bulk_mock, docs, **kw):
+        bulk_mock.reset_mock()
+        bulk_mock.return_value = (len(docs), [])
+        self.indexer.bulk_index(docs, es=self.es, indices=['apps'],
+                                skip_unchanged=True, **kw)
+        return self._indexed(bulk_mock)
+
+    def test_fingerprint_stable(self, bulk_mock):
+        eq_(self.indexer.fingerprint({'a': 1, 'b': [1, 2]}),
+            self.indexer.fingerprint({'b': [1, 2], 'a': 1}))
+        ok_(self.indexer.fingerprint({'a': 1}) !=
+            self.indexer.fingerprint({'a': 2}))
+
+    def test_skip_unchanged(self, bulk_mock):
+        eq_(self._index(bulk_mock, self.docs), [('apps', 1), ('apps', 2)])
+        eq_(self._index(bulk_mock, self.docs), [])
+        changed = [{'id': 1, 'name': 'c'}, {'id': 2, 'name': 'b'}]
+        eq_(self._index(bulk_mock, changed), [('apps', 1)])
+
+    def test_skip_modified(self, bulk_mock):
+        docs = [{'id': 1, 'name': 'a', 'modified': '2015-01-01T00:00:00'}]
+        eq_(self._index(bulk_mock, docs), [('apps', 1)])
+        docs = [{'id': 1, 'name': 'a', 'modified': '2015-01-02T00:00:00'}]
+        eq_(self._index(bulk_mock, docs), [])
+
+    def test_not_skipped_in_other_index(self, bulk_mock):
+        self._index(bulk_mock, self.docs)
+        bulk_mock.reset_mock()
+        bulk_mock.return_value = (2, [])
+        self.indexer.bulk_index(self.docs, es=self.es,
+                                indices=['apps', 'apps-new'],
+                                skip_unchanged=True)
+        eq_(self._indexed(bulk_mock), [('apps-new', 1), ('apps-new', 2)])
+
+    def test_failed_not_remembered(self, bulk_mock):
+        bulk_mock.return_value = (1, [
+            {'index': {'_index': 'apps-20150101', '_id': '1',
+                       'status': 500}}])
+        self.indexer.bulk_index(self.docs, es=self.es, indices=['apps'],
+                                skip_unchanged=True)
+        eq_(self._index(bulk_mock, self.docs), [('apps', 1)])
+
+    def test_unindex_forgets(self, bulk_mock):
+        self._index(bulk_mock, self.docs)
+        bulk_mock.return_value = (1, [])
+        self.indexer.bulk_unindex([1], es=self.es, indices=['apps'])
+        eq_(self._index(bulk_mock, self.docs), [('apps', 1)])
+
+    def test_update_forgets(self, bulk_mock):
+        self._index(bulk_mock, self.docs)
+        bulk_mock.return_value = (1, [])
+        self.indexer.bulk_update({2: {'boost': 4.0}}, es=self.es,
+                                 indices=['apps'])
+        eq_(self._index(bulk_mock, self.docs), [('apps', 2)])
+
+    def test_invalidate(self, bulk_mock):
+        self._index(bulk_mock, self.docs)
+        self.indexer.invalidate_fingerprints('apps')
+        eq_(self._index(bulk_mock, self.docs), [('apps', 1), ('apps', 2)])
+
+    def test_written_ids(self, bulk_mock):
+        bulk_mock.return_value = (1, [
+            {'index': {'_index': 'apps-20150101', '_id': '2',
+                       'status': 500}}])
+        written = []
+        self.indexer.bulk_index(self.docs, es=self.es, indices=['apps'],
+                                skip_unchanged=True, written_ids=written)
+        eq_(written, [1])
+
+        bulk_mock.return_value = (1, [])
+        written = []
+        self.indexer.bulk_index(self.docs, es=self.es, indices=['apps'],
+                                skip_unchanged=True, written_ids=written)
+        eq_(written, [2])
+
+    @mock.patch('mkt.search.indexers.invalidate_search_responses')
+    def test_index_task_invalidates_when_written(self, invalidate_mock,
+                                                 bulk_mock):
+        bulk_mock.return_value = (2, [])
+        with mock.patch.object(self.indexer, 'extract_documents',
+                               return_value=self.docs), \
+                mock.patch.object(self.indexer, 'get_es',
+                                  return_value=self.es):
+            index([1, 2], self.indexer)
+            eq_(invalidate_mock.call_count, 1)
+            index([1, 2], self.indexer)
+            eq_(invalidate_mock.call_count, 1)
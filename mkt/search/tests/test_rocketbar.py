@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+import threading
+
+from django.test.utils import override_settings
+
+import mock
+from elasticsearch import TransportError
+from nose.tools import eq_, ok_
+
+from mkt.search import rocketbar
+from mkt.search.rocketbar import (get_prefix_index, invalidate_prefix_index,
+                                  PrefixIndex)
+from mkt.site.tests import TestCase
+
+
+def suggestion(id_, names, weight):
+    return {'input': names, 'output': unicode(id_), 'weight': weight,
+            'payload': {'id': id_}}
+
+
+class TestPrefixIndex(TestCase):
+
+    def setUp(self):
+        self.index = PrefixIndex([
+            suggestion(1, [u'Something Something Steamcube!'], 4),
+            suggestion(2, [u'Something Second', u'Quelque chose'], 12),
+            suggestion(3, [u'Über Maps'], 8),
+        ])
+
+    def ids(self, text, size=5):
+        return [o['payload']['id'] for o in self.index.lookup(text, size)]
+
+    def test_lookup(self):
+        eq_(self.ids('something'), [2, 1])
+        eq_(self.ids('Something Se'), [2])
+        eq_(self.ids('something something st'), [1])
+        eq_(self.ids('quelque'), [2])
+        eq_(self.ids('whatever'), [])
+        eq_(self.ids(''), [])
+
+    def test_lookup_short_prefix(self):
+        eq_(self.ids('s'), [2, 1])
+        eq_(self.ids('S', size=1), [2])
+        eq_(self.ids('so', size=20), [2, 1])
+
+    def test_lookup_normalized(self):
+        eq_(self.ids(u'über'), [3])
+        eq_(self.ids(u'something  something-steam'), [1])
+
+    def test_options(self):
+        eq_(self.index.lookup(u'Über', 5),
+            [{'text': u'3', 'score': 8.0, 'payload': {'id': 3}}])
+
+    def test_max_apps(self):
+        self.index = PrefixIndex([
+            suggestion(1, u'Something', 4),
+            suggestion(2, u'Something Second', 12),
+        ], max_apps=1)
+        eq_(len(self.index), 1)
+        eq_(self.ids('something'), [2])
+
+
+@override_settings(ROCKETBAR_INDEX_MAX_APPS=10,
+                   ROCKETBAR_INDEX_CHECK_INTERVAL=0)
+@mock.patch('mkt.search.rocketbar.build_prefix_index')
+class TestGetPrefixIndex(TestCase):
+
+    def setUp(self):
+        rocketbar._local.update(index=None, checked=0, builder=None)
+
+    def tearDown(self):
+        self.wait()
+        rocketbar._local.update(index=None, checked=0, builder=None)
+
+    def build(self, version=None):
+        return PrefixIndex([], version=version)
+
+    def wait(self):
+        """Waits for the index being built in the background, if any."""
+        if rocketbar._local['builder']:
+            rocketbar._local['builder'].join()
+
+    def test_built_in_background(self, build_mock):
+        build_mock.side_effect = self.build
+        # Not built yet, the caller falls back to ES.
+        eq_(get_prefix_index(), None)
+        self.wait()
+        index = get_prefix_index()
+        ok_(index is not None)
+        ok_(get_prefix_index() is index)
+        eq_(build_mock.call_count, 1)
+
+    def test_rebuilt_on_new_version(self, build_mock):
+        build_mock.side_effect = self.build
+        get_prefix_index()
+        self.wait()
+        index = get_prefix_index()
+
+        invalidate_prefix_index()
+        # The current index is used until the new one is ready.
+        ok_(get_prefix_index() is index)
+        self.wait()
+        ok_(get_prefix_index() is not index)
+        eq_(build_mock.call_count, 2)
+
+    def test_single_builder(self, build_mock):
+        built = threading.Event()
+
+        def build(version=None):
+            built.wait()
+            return self.build(version)
+
+        build_mock.side_effect = build
+        eq_(get_prefix_index(), None)
+        eq_(get_prefix_index(), None)
+        built.set()
+        self.wait()
+        ok_(get_prefix_index() is not None)
+        eq_(build_mock.call_count, 1)
+
+    @override_settings(ROCKETBAR_INDEX_CHECK_INTERVAL=60)
+    def test_check_interval(self, build_mock):
+        build_mock.side_effect = self.build
+        get_prefix_index()
+        self.wait()
+        index = get_prefix_index()
+        invalidate_prefix_index()
+        ok_(get_prefix_index() is index)
+        self.wait()
+        ok_(get_prefix_index() is index)
+        eq_(build_mock.call_count, 1)
+
+    def test_build_error(self, build_mock):
+        build_mock.side_effect = self.build
+        get_prefix_index()
+        self.wait()
+        index = get_prefix_index()
+        invalidate_prefix_index()
+        build_mock.side_effect = TransportError(500, 'oops')
+        get_prefix_index()
+        self.wait()
+        # The stale index is still used.
+        ok_(get_prefix_index() is index)
+
+    @override_settings(ROCKETBAR_INDEX_MAX_APPS=0)
+    def test_disabled(self, build_mock):
+        eq_(get_prefix_index(), None)
+        ok_(not build_mock.called)
@@ -0,0 +1,97 @@
+import time
+
+from django.test.utils import override_settings
+
+import mock
+from elasticsearch_dsl import F, Q
+from nose.tools import eq_, ok_
+
+from mkt.search.telemetry import (count_clauses, get_telemetry,
+                                  record_search, SearchTelemetry)
+from mkt.search.utils import Search
+from mkt.site.tests import TestCase
+
+
+class TestCountClauses(TestCase):
+
+    def test_count(self):
+        search = (Search().query(Q('bool', should=[Q('match', name='a'),
+                                                   Q('match', name='b')]))
+                          .filter(F('term', status=4))
+                          .filter(F('terms', device=[1, 2])))
+        # filtered, bool, 2 matches, bool (for the filters), term and terms.
+        eq_(count_clauses(search.to_dict()), 7)
+
+    def test_empty(self):
+        eq_(count_clauses({}), 0)
+        eq_(count_clauses({'query': {'match_all': {}}}), 1)
+
+
+@mock.patch('mkt.search.telemetry.statsd')
+class TestSearchTelemetry(TestCase):
+
+    def tearDown(self):
+        if get_telemetry():
+            get_telemetry().deactivate()
+
+    def timings(self, statsd_mock):
+        return dict((args[0], args[1]) for args, kwargs
+                    in statsd_mock.timing.call_args_list)
+
+    def test_record_search(self, statsd_mock):
+        record_search(10, time.time())
+        ok_(get_telemetry() is None)
+
+        telemetry = SearchTelemetry('View').activate()
+        record_search(10, time.time() - 1)
+        eq_(len(telemetry.searches), 1)
+        eq_(telemetry.searches[0][0], 10)
+        ok_(telemetry.searches[0][1] >= 1000)
+
+        telemetry.deactivate()
+        record_search(10, time.time())
+        eq_(len(telemetry.searches), 1)
+
+    def test_emit(self, statsd_mock):
+        telemetry = SearchTelemetry('View')
+        telemetry.filters = [('RegionFilter', 1.0), ('SortingFilter', 2.0)]
+        telemetry.searches = [(10, 15.0)]
+        telemetry.clauses = 3
+        telemetry.serialize_time = 4.0
+        telemetry.emit(100)
+
+        timings = self.timings(statsd_mock)
+        eq_(timings['search.view.View.filter.RegionFilter'], 1.0)
+        eq_(timings['search.view.View.filter.SortingFilter'], 2.0)
+        eq_(timings['search.view.View.filters'], 3.0)
+        eq_(timings['search.view.View.es.took'], 10)
+        eq_(timings['search.view.View.es.wall'], 15.0)
+        eq_(timings['search.view.View.es.overhead'], 5.0)
+        eq_(timings['search.view.View.clauses'], 3)
+        eq_(timings['search.view.View.serialize'], 4.0)
+        eq_(timings['search.view.View.bytes'], 100)
+        ok_('search.view.View.total' in timings)
+
+    def test_emit_nothing_recorded(self, statsd_mock):
+        SearchTelemetry('View').emit(0)
+        eq_(sorted(self.timings(statsd_mock)),
+            ['search.view.View.bytes', 'search.view.View.total'])
+
+    @override_settings(SEARCH_SLOW_QUERY_THRESHOLD=0,
+                       SEARCH_SLOW_QUERY_SAMPLE_RATE=1)
+    @mock.patch('mkt.search.telemetry.log')
+    def test_slow_query(self, log_mock, statsd_mock):
+        telemetry = SearchTelemetry('View', '/api/v2/apps/search/?q=a')
+        telemetry.record_query(Search().filter(F('term', status=4)))
+        telemetry.emit(100)
+        eq_(log_mock.warning.call_count, 1)
+        message = log_mock.warning.call_args[0][0]
+        ok_('/api/v2/apps/search/?q=a' in message)
+        ok_('"term": {"status": 4}' in message)
+
+    @override_settings(SEARCH_SLOW_QUERY_THRESHOLD=0,
+                       SEARCH_SLOW_QUERY_SAMPLE_RATE=0)
+    @mock.patch('mkt.search.telemetry.log')
+    def test_slow_query_not_sampled(self, log_mock, statsd_mock):
+        SearchTelemetry('View').emit(100)
+        ok_(not log_mock.warning.called)
@@ -6,12 +6,14 @@ from django.conf import settings
 from django.core.urlresolvers import reverse
 from django.http import QueryDict
 from django.test.client import RequestFactory
+from django.test.utils import override_settings
 
 from mock import patch
 from nose.tools import eq_, ok_
 
 import mkt
 import mkt.regions
+from lib.post_request_task import task as post_request_task
 from mkt.access.middleware import ACLMiddleware
 from mkt.access.models import GroupUser
 from mkt.api.tests.test_oauth import RestOAuth, RestOAuthClient
@@ -23,8 +25,11 @@ from mkt.developers.models import (AddonPaymentAccount, PaymentAccount,
 from mkt.operators.models import OperatorPermission
 from mkt.prices.models import Price
 from mkt.regions.middleware import RegionMiddleware
+from mkt.search import rocketbar
 from mkt.search.filters import SortingFilter
-from mkt.search.views import SearchView
+from mkt.search.rocketbar import get_prefix_index, invalidate_prefix_index
+from mkt.search.tasks import rebuild_openmobileacl_list
+from mkt.search.views import OpenMobileACLSearchView, SearchView
 from mkt.site.fixtures import fixture
 from mkt.site.helpers import absolutify
 from mkt.site.tests import app_factory, ESTestCase, TestCase, user_factory
@@ -155,6 +160,26 @@ class TestSearchView(RestOAuth, ESTestCase):
         self.anon.get(self.url)
         assert _mock.called
 
+    @patch('mkt.search.telemetry.statsd')
+    def test_telemetry(self, statsd_mock):
+        res = self.anon.get(self.url, data={'q': 'something'})
+        timings = dict((args[0], args[1]) for args, kwargs
+                       in statsd_mock.timing.call_args_list)
+        prefix = 'search.view.SearchView.'
+        for backend in SearchView.filter_backends:
+            ok_(prefix + 'filter.' + backend.__name__ in timings)
+        for key in ('filters', 'es.took', 'es.wall', 'es.overhead',
+                    'clauses', 'serialize', 'total'):
+            ok_(prefix + key in timings, key)
+        ok_(timings[prefix + 'clauses'] > 0)
+        eq_(timings[prefix + 'bytes'], len(res.content))
+
+    @override_settings(SEARCH_TELEMETRY=False)
+    @patch('mkt.search.telemetry.statsd')
+    def test_telemetry_disabled(self, statsd_mock):
+        eq_(self.anon.get(self.url).status_code, 200)
+        ok_(not statsd_mock.timing.called)
+
     def test_search_published_apps(self):
         eq_(self.webapp.status, mkt.STATUS_PUBLIC)
         res = self.anon.get(self.url)
@@ -802,6 +827,28 @@ class TestSearchView(RestOAuth, ESTestCase):
         eq_(data['meta']['offset'], 2)
         eq_(data['meta']['next'], None)
 
+    def test_pagination_cursor_sorted_by_score(self):
+        Webapp.objects.get(pk=337141).delete()
+        ids = set(app_factory(name='test app test%s' % i).pk
+                  for i in range(3))
+        self.refresh('webapp')
+
+        # The cursor is dropped, the next links use offsets.
+        res = self.anon.get(self.url, data={'q': 'test', 'limit': '1',
+                                            'cursor': ''})
+        eq_(res.status_code, 200)
+        seen = [int(res.json['objects'][0]['id'])]
+        for offset in ('1', '2'):
+            next = urlparse(res.json['meta']['next'])
+            eq_(QueryDict(next.query).dict(), {'limit': '1', 'q': 'test',
+                                               'offset': offset})
+            res = self.anon.get(self.url, QueryDict(next.query).dict())
+            eq_(res.status_code, 200)
+            eq_(res.json['meta']['offset'], int(offset))
+            seen.append(int(res.json['objects'][0]['id']))
+        eq_(set(seen), ids)
+        eq_(res.json['meta']['next'], None)
+
     def test_pagination_invalid(self):
         res = self.anon.get(self.url, data={'offset': '%E2%98%83'})
         eq_(res.status_code, 200)
@@ -995,6 +1042,48 @@ class TestSearchViewFeatures(RestOAuth, ESTestCase):
         eq_(obj['slug'], self.webapp.app_slug)
 
 
+@override_settings(SEARCH_RESPONSE_CACHE_TIMEOUT=60)
+@patch('mkt.search.utils.statsd.timer')
+class TestSearchViewResponseCache(RestOAuth, ESTestCase):
+    fixtures = fixture('user_2519', 'webapp_337141')
+
+    def setUp(self):
+        super(TestSearchViewResponseCache, self).setUp()
+        self.url = reverse('search-api')
+        self.webapp = Webapp.objects.get(pk=337141)
+        self.refresh('webapp')
+
+    def tearDown(self):
+        unindex_webapps(list(Webapp.with_deleted.values_list('id', flat=True)))
+        super(TestSearchViewResponseCache, self).tearDown()
+
+    def get(self, client, **data):
+        res = client.get(self.url, data)
+        eq_(res.status_code, 200)
+        return res.json
+
+    def test_anonymous_cached(self, timer_mock):
+        data = self.get(self.anon, q='Something')
+        eq_(timer_mock.call_count, 1)
+        # The search query is case-insensitive.
+        eq_(self.get(self.anon, q='something'), data)
+        eq_(timer_mock.call_count, 1)
+        self.get(self.anon, q='something', region='br')
+        eq_(timer_mock.call_count, 2)
+
+    def test_authenticated_not_cached(self, timer_mock):
+        self.get(self.client)
+        self.get(self.client)
+        eq_(timer_mock.call_count, 2)
+
+    def test_invalidated_on_index(self, timer_mock):
+        self.get(self.anon)
+        self.webapp.save()
+        self.refresh('webapp')
+        self.get(self.anon)
+        eq_(timer_mock.call_count, 2)
+
+
 class TestFeaturedSearchView(RestOAuth, ESTestCase):
     fixtures = fixture('user_2519', 'webapp_337141')
 
@@ -1328,6 +1417,25 @@ class TestRocketbarView(ESTestCase):
                         'name': unicode(self.app2.name),
                         'slug': self.app2.app_slug})
 
+    @override_settings(ROCKETBAR_INDEX_MAX_APPS=100,
+                       ROCKETBAR_INDEX_CHECK_INTERVAL=0)
+    @patch('mkt.search.views.RocketbarView.get_es_suggestions')
+    def test_suggestions_prefix_index(self, get_es_suggestions):
+        invalidate_prefix_index()
+        # Build the index, which is done in the background.
+        get_prefix_index()
+        rocketbar._local['builder'].join()
+        response = self.client.get(self.url, data={'q': 'something',
+                                                   'lang': 'en-US',
+                                                   'limit': 1})
+        ok_(not get_es_suggestions.called)
+        parsed = json.loads(response.content)
+        eq_(len(parsed), 1)
+        eq_(parsed[0], {'manifest_url': self.app2.get_manifest_url(),
+                        'icon': self.app2.get_icon_url(64),
+                        'name': unicode(self.app2.name),
+                        'slug': self.app2.app_slug})
+
     def test_suggestions_with_multiple_icons(self):
         url = reverse('api-v2:rocketbar-search-api')
         with self.assertNumQueries(0):
@@ -1543,3 +1651,43 @@ class TestOpenMobileACLSearchView(RestOAuth, ESTestCase):
         eq_(res.status_code, 200)
         eq_(len(res.json), 1)
         eq_(res.json[0], self.app2.manifest_url)
+
+    @override_settings(OPENMOBILEACL_LIST_TIMEOUT=60)
+    def test_materialized(self):
+        res = self.anon.get(self.url)
+        with patch.object(OpenMobileACLSearchView,
+                          'filter_queryset') as filter_queryset:
+            cached = self.anon.get(self.url)
+        ok_(not filter_queryset.called)
+        eq_(cached.json, [self.app2.manifest_url])
+        eq_(cached['ETag'], res['ETag'])
+
+    @override_settings(OPENMOBILEACL_LIST_TIMEOUT=60)
+    def test_etag(self):
+        res = self.anon.get(self.url)
+        res = self.anon.get(self.url, HTTP_IF_NONE_MATCH=res['ETag'])
+        eq_(res.status_code, 304)
+        eq_(res.content, '')
+
+    @override_settings(OPENMOBILEACL_LIST_TIMEOUT=60)
+    def test_refresh(self):
+        res = self.anon.get(self.url)
+        self.app2.current_version.features.update(has_openmobileacl=False)
+        self.reindex(Webapp)
+        rebuild_openmobileacl_list([self.app2.id])
+        refreshed = self.anon.get(self.url, HTTP_IF_NONE_MATCH=res['ETag'])
+        eq_(refreshed.status_code, 200)
+        eq_(refreshed.json, [])
+
+    @override_settings(OPENMOBILEACL_LIST_TIMEOUT=60)
+    @patch('mkt.search.tasks.rebuild_openmobileacl_list.original_apply_async')
+    def test_refresh_after_features_indexed(self, apply_async):
+        post_request_task._send_tasks()
+        apply_async.reset_mock()
+        self.app2.current_version.features.update(has_openmobileacl=False)
+        # Nothing is refreshed until the app has been indexed again.
+        ok_(not apply_async.called)
+        post_request_task._send_tasks()
+        apply_async.assert_called_with(
+            (([self.app2.id],), {}),
+            countdown=settings.OPENMOBILEACL_LIST_REFRESH_DELAY)
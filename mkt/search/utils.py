@@ -1,20 +1,63 @@
+import hashlib
+import json
+import time
 from math import log10
 
+from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
 
+from elasticsearch import TransportError
+from elasticsearch_dsl.connections import connections
+from elasticsearch_dsl.result import Response
 from elasticsearch_dsl.search import Search as dslSearch
 from statsd import statsd
 
 from mkt.constants.base import VALID_STATUSES
+from mkt.search.telemetry import record_search
+from mkt.site.utils import cache_ns_key
 
 
 class Search(dslSearch):
 
     def execute(self):
+        start = time.time()
         with statsd.timer('search.execute'):
             results = super(Search, self).execute()
             statsd.timing('search.took', results.took)
-            return results
+        record_search(results.took, start)
+        return results
+
+
+def multi_search(searches, using=None):
+    """
+    Execute several searches in a single ES msearch request.
+
+    Returns the list of responses, in the same order as `searches`. Uses the
+    connection of the first search if `using` is not provided.
+    """
+    es = connections.get_connection(using or searches[0]._using)
+    body = []
+    for search in searches:
+        header = {}
+        if search._index:
+            header['index'] = search._index
+        if search._doc_type:
+            header['type'] = search._doc_type
+        body += [header, search.to_dict()]
+
+    start = time.time()
+    with statsd.timer('search.msearch'):
+        raw_responses = es.msearch(body=body)['responses']
+
+    responses = []
+    for search, raw in zip(searches, raw_responses):
+        if 'error' in raw:
+            raise TransportError(500, raw['error'])
+        statsd.timing('search.took', raw['took'])
+        record_search(raw['took'], start)
+        responses.append(Response(raw, callbacks=search._doc_type_map))
+    return responses
 
 
 def _property_value_by_region(obj, region=None, property=None):
@@ -58,18 +101,71 @@ def get_trending(obj, region=None):
     return _property_value_by_region(obj, region=region, property='trending')
 
 
-def get_boost(obj):
+def get_boost(obj, popularity=None):
     """
     Returns the boost used in Elasticsearch for this app.
 
     The boost is based on a few factors, the most important is number of
     installs. We use log10 so the boost doesn't completely overshadow any
     other boosting we do at query time.
+
+    If `popularity` is provided we'll use that global popularity value instead
+    of doing our own lookup.
     """
-    boost = max(log10(1 + get_popularity(obj)), 1.0)
+    if popularity is None:
+        popularity = get_popularity(obj)
+    boost = max(log10(1 + popularity), 1.0)
 
     # We give a little extra boost to approved apps.
     if obj.status in VALID_STATUSES:
         boost *= 4
 
     return boost
+
+
+def search_response_cache_prefix():
+    """Returns the prefix of the keys of the cached search API responses."""
+    return 'search-response:%s' % cache_ns_key('search-responses')
+
+
+def invalidate_search_responses():
+    """Invalidates all the cached search API responses."""
+    cache_ns_key('search-responses', increment=True)
+
+
+OPENMOBILEACL_LIST_KEY = 'search:openmobileacl'
+
+
+def get_openmobileacl_list():
+    """
+    Returns the materialized OpenMobileACL list, a dict holding the JSON
+    `content` of the response, its `etag` and the `app_ids` it was built
+    from, or None.
+    """
+    return cache.get(OPENMOBILEACL_LIST_KEY)
+
+
+def set_openmobileacl_list(apps):
+    """
+    Materializes the OpenMobileACL list from a list of (app id, manifest URL)
+    tuples, and returns it.
+    """
+    content = json.dumps([manifest_url for app_id, manifest_url in apps])
+    acl = {'content': content,
+           'etag': hashlib.md5(content).hexdigest(),
+           'app_ids': set(app_id for app_id, manifest_url in apps)}
+    if settings.OPENMOBILEACL_LIST_TIMEOUT:
+        cache.set(OPENMOBILEACL_LIST_KEY, acl,
+                  settings.OPENMOBILEACL_LIST_TIMEOUT)
+    return acl
+
+
+def schedule_openmobileacl_refresh(ids):
+    """
+    Schedules the refresh of the OpenMobileACL list after the index task
+    wrote the given apps to ES, once the index has been refreshed.
+    """
+    from mkt.search.tasks import rebuild_openmobileacl_list
+    if settings.OPENMOBILEACL_LIST_TIMEOUT:
+        rebuild_openmobileacl_list.apply_async(
+            args=[ids], countdown=settings.OPENMOBILEACL_LIST_REFRESH_DELAY)
@@ -1,29 +1,41 @@
 from __future__ import absolute_import
 
+import hashlib
 import json
 
+from django.conf import settings
+from django.core.cache import cache
 from django.db.transaction import non_atomic_requests
 from django.http import HttpResponse
+from django.utils import translation
+from django.views.decorators.http import etag
 
 from rest_framework.generics import ListAPIView
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
+from statsd import statsd
 
 from mkt.api.authentication import (RestOAuthAuthentication,
                                     RestSharedSecretAuthentication)
-from mkt.api.base import CORSMixin, MarketplaceView
+from mkt.api.base import CORSMixin, get_region_from_request, MarketplaceView
 from mkt.api.paginator import ESPaginator
 from mkt.api.permissions import AnyOf, GroupPermission
+from mkt.constants.applications import get_device_id
+from mkt.features.utils import get_feature_profile
 from mkt.operators.permissions import IsOperatorPermission
 from mkt.search.forms import ApiSearchForm
 from mkt.search.indexers import BaseIndexer
+from mkt.search.rocketbar import get_prefix_index
 from mkt.search.filters import (DeviceTypeFilter, OpenMobileACLFilter,
                                 ProfileFilter, PublicContentFilter,
                                 PublicSearchFormFilter, RegionFilter,
                                 SearchQueryFilter, SortingFilter,
                                 ValidAppsFilter)
 from mkt.search.serializers import DynamicSearchSerializer
-from mkt.search.utils import Search
+from mkt.search.telemetry import SearchTelemetryMixin
+from mkt.search.utils import (get_openmobileacl_list, Search,
+                              search_response_cache_prefix,
+                              set_openmobileacl_list)
 from mkt.translations.helpers import truncate
 from mkt.webapps.indexers import WebappIndexer
 from mkt.webapps.serializers import (ESAppSerializer, RocketbarESAppSerializer,
@@ -33,7 +45,8 @@ from mkt.websites.indexers import WebsiteIndexer
 from mkt.websites.serializers import ESWebsiteSerializer
 
 
-class SearchView(CORSMixin, MarketplaceView, ListAPIView):
+class SearchView(SearchTelemetryMixin, CORSMixin, MarketplaceView,
+                 ListAPIView):
     """
     Base app search view based on a single-string query.
     """
@@ -52,6 +65,50 @@ class SearchView(CORSMixin, MarketplaceView, ListAPIView):
     def get_queryset(self):
         return WebappIndexer.search()
 
+    def get_response_cache_key(self, request):
+        """
+        Returns the cache key of the response to an anonymous request.
+
+        It's built from everything the filters and serializers look at: the
+        query string, the region, the device, the feature profile, the
+        language and the API version.
+        """
+        params = []
+        for key, values in sorted(request.GET.lists()):
+            values = [value for value in values if value.strip()]
+            if key == 'q':
+                values = [value.lower() for value in values]
+            if values:
+                params.append((key, values))
+        region = get_region_from_request(request)
+        profile = get_feature_profile(request)
+        devices = [device for device in ('GAIA', 'MOBILE', 'TABLET')
+                   if getattr(request, device, False)]
+        key = json.dumps([
+            request.path, params, region and region.slug,
+            get_device_id(request), devices,
+            profile and profile.to_signature(), translation.get_language(),
+            getattr(request, 'API_VERSION', None)])
+        return '%s:%s' % (search_response_cache_prefix(),
+                          hashlib.md5(key).hexdigest())
+
+    def list(self, request, *args, **kwargs):
+        timeout = settings.SEARCH_RESPONSE_CACHE_TIMEOUT
+        if not timeout or request.user.is_authenticated():
+            return super(SearchView, self).list(request, *args, **kwargs)
+
+        key = self.get_response_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            statsd.incr('search.response_cache.hit')
+            return Response(data)
+
+        statsd.incr('search.response_cache.miss')
+        response = super(SearchView, self).list(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, timeout)
+        return response
+
     @classmethod
     def as_view(cls, **kwargs):
         # Make all search views non_atomic: they should not need the db, or
@@ -197,10 +254,29 @@ class RocketbarView(SearchView):
 
     def get(self, request, *args, **kwargs):
         limit = request.GET.get('limit', 5)
+        text = request.GET.get('q', '').strip()
+
+        # Use the copy of the suggestions kept in memory if we have one, ES
+        # otherwise. Invalid limits are left for ES to deal with.
+        index = get_prefix_index()
+        if index is not None and unicode(limit).isdigit():
+            statsd.incr('search.rocketbar.prefix_index.hit')
+            data = index.lookup(text, int(limit))
+        else:
+            statsd.incr('search.rocketbar.prefix_index.miss')
+            data = self.get_es_suggestions(text, limit)
+        serializer = self.get_serializer(data)
+        # This returns a JSON list. Usually this is a bad idea for security
+        # reasons, but we don't include any user-specific data, it's fully
+        # anonymous, so we're fine.
+        return HttpResponse(json.dumps(serializer.data),
+                            content_type='application/x-rocketbar+json')
+
+    def get_es_suggestions(self, text, limit):
         es_query = {
             'apps': {
                 'completion': {'field': 'name_suggest', 'size': limit},
-                'text': request.GET.get('q', '').strip()
+                'text': text
             }
         }
 
@@ -208,15 +284,8 @@ class RocketbarView(SearchView):
             body=es_query, index=WebappIndexer.get_index())
 
         if 'apps' in results:
-            data = results['apps'][0]['options']
-        else:
-            data = []
-        serializer = self.get_serializer(data)
-        # This returns a JSON list. Usually this is a bad idea for security
-        # reasons, but we don't include any user-specific data, it's fully
-        # anonymous, so we're fine.
-        return HttpResponse(json.dumps(serializer.data),
-                            content_type='application/x-rocketbar+json')
+            return results['apps'][0]['options']
+        return []
 
 
 class RocketbarViewV2(RocketbarView):
@@ -231,19 +300,36 @@ class OpenMobileACLSearchView(SearchView):
     list before trying to install an ACL.
 
     It returns a list of manifest URLs directly, without pagination.
+
+    The list is the same for everyone, so it's materialized in the cache with
+    an ETag, and refreshed when a relevant app changes (see
+    `mkt.search.tasks.rebuild_openmobileacl_list`). Clients sending the ETag
+    back get a 304 while the list is unchanged.
     """
     filter_backends = [ValidAppsFilter, OpenMobileACLFilter]
+    # Set when called to rebuild the materialized list.
+    refresh_list = False
 
     def get_queryset(self):
         qs = super(OpenMobileACLSearchView, self).get_queryset()
         return qs.extra(_source={'include': ['manifest_url']})
 
     def get(self, request, *args, **kwargs):
-        hits = self.filter_queryset(self.get_queryset()).execute().hits
-        data = [obj['manifest_url'] for obj in hits]
+        acl = None if self.refresh_list else get_openmobileacl_list()
+        if acl is None:
+            statsd.incr('search.openmobileacl.miss')
+            hits = self.filter_queryset(self.get_queryset()).execute().hits
+            acl = set_openmobileacl_list(
+                [(int(obj.meta.id), obj['manifest_url']) for obj in hits])
+        else:
+            statsd.incr('search.openmobileacl.hit')
 
-        # This returns a JSON list. Usually this is a bad idea for security
-        # reasons, but we don't include any user-specific data, it's fully
-        # anonymous, so we're fine.
-        return HttpResponse(json.dumps(data),
-                            content_type='application/json')
+        @etag(lambda request: acl['etag'])
+        def _inner_view(request):
+            # This returns a JSON list. Usually this is a bad idea for
+            # security reasons, but we don't include any user-specific data,
+            # it's fully anonymous, so we're fine.
+            return HttpResponse(acl['content'],
+                                content_type='application/json')
+
+        return _inner_view(request)
@@ -150,6 +150,7 @@ INSTALLED_APPS = (
     'mkt.feed',
     'mkt.files',
     'mkt.fireplace',
+    'mkt.games',
     'mkt.inapp',
     'mkt.langpacks',
     'mkt.lookup',
@@ -474,6 +475,11 @@ CELERYD_HIJACK_ROOT_LOGGER = False
 # The task can catch that and recover but should exit ASAP.
 CELERYD_TASK_SOFT_TIME_LIMIT = 60 * 2
 
+# Number of seconds during which calls to post-request tasks created with
+# `coalesce=True` (e.g. indexing) are merged across requests before being sent
+# to celery. 0 disables it, tasks are then only merged within a request.
+POST_REQUEST_TASK_DEBOUNCE = 0
+
 
 ###########################################
 # Recommendations
@@ -486,6 +492,11 @@ RECOMMENDATIONS_API_TIMEOUT = 5
 # Set to True to Enable calls to the recommendation API.
 # False will return popular apps.
 RECOMMENDATIONS_ENABLED = False
+# How many seconds the recommendations of a user are cached for. Past that,
+# they are still used for up to RECOMMENDATIONS_CACHE_STALE_TIMEOUT seconds
+# while a task refreshes them.
+RECOMMENDATIONS_CACHE_TIMEOUT = 60 * 60
+RECOMMENDATIONS_CACHE_STALE_TIMEOUT = 60 * 60 * 24
 
 
 ###########################################
@@ -698,6 +709,56 @@ ES_INDEXES = {
 ES_URLS = ['http://%s' % h for h in ES_HOSTS]
 ES_USE_PLUGINS = False
 ES_TIMEOUT = 30
+# Dotted path of the elasticsearch-py Connection class to talk to ES with, None
+# for the default one. The benchmark_search command uses it to record and
+# replay ES responses.
+ES_CONNECTION_CLASS = None
+# Keep fingerprints of the documents written by the index task in the cache,
+# so that unchanged documents are not sent again to ES.
+ES_USE_FINGERPRINTS = True
+ES_FINGERPRINTS_TIMEOUT = 60 * 60 * 24
+# Cache the responses of anonymous search API requests for that many seconds.
+# The cache is also invalidated every time the index task writes to ES.
+SEARCH_RESPONSE_CACHE_TIMEOUT = 60
+# Serve the feed from snapshots kept in the cache for that many seconds. They
+# are refreshed when the index task writes feed items or their apps, after a
+# delay for ES to refresh the index. Only the first FEED_SNAPSHOT_MAX_REFRESH
+# combinations requested are refreshed, the others are dropped.
+FEED_SNAPSHOT_TIMEOUT = 60 * 60
+FEED_SNAPSHOT_REFRESH_DELAY = 10
+FEED_SNAPSHOT_MAX_REFRESH = 50
+# Answer Rocketbar suggestions from an in-process copy of the `name_suggest`
+# data of up to that many apps (0 to always query ES). Processes check every
+# ROCKETBAR_INDEX_CHECK_INTERVAL seconds if they need to rebuild it, which is
+# done in a background thread while ES or the previous copy answer.
+ROCKETBAR_INDEX_MAX_APPS = 20000
+ROCKETBAR_INDEX_CHECK_INTERVAL = 60
+# Keep the OpenMobileACL list in the cache for that many seconds. It's
+# refreshed when the index task writes a relevant app, after a delay for ES to
+# refresh the index.
+OPENMOBILEACL_LIST_TIMEOUT = 60 * 60 * 24
+OPENMOBILEACL_LIST_REFRESH_DELAY = 10
+# Keep the daily games in the cache until the daily seed changes, at midnight
+# UTC. The `warm_daily_games` cron refills the cache right after.
+DAILY_GAMES_CACHE = True
+# Send the time spent in each filter backend, in ES and in the serializer by
+# the search views to statsd. Requests slower than SEARCH_SLOW_QUERY_THRESHOLD
+# milliseconds are logged with their query, for SEARCH_SLOW_QUERY_SAMPLE_RATE
+# of them (0 to disable).
+SEARCH_TELEMETRY = True
+SEARCH_SLOW_QUERY_THRESHOLD = 1000
+SEARCH_SLOW_QUERY_SAMPLE_RATE = 0.1
+
+# Keep the counts of the reviewer queues in the cache for that many seconds
+# (0 to count on every reviewer page). They are refreshed at most once per
+# REVIEWER_QUEUE_COUNTS_REFRESH_DELAY seconds when an app or a queue changes,
+# after a delay for ES to catch up, and by the `update_reviewer_queue_counts`
+# cron for the changes made without signals.
+REVIEWER_QUEUE_COUNTS_TIMEOUT = 60 * 60
+REVIEWER_QUEUE_COUNTS_REFRESH_DELAY = 10
+# Cache the age histograms of the queues shown on the reviewer home page for
+# that many seconds (0 to disable).
+REVIEWER_PROGRESS_TIMEOUT = 5 * 60
 
 # When True include full tracebacks in JSON. This is useful for QA on preview.
 EXPOSE_VALIDATOR_TRACEBACKS = True
@@ -2,6 +2,7 @@ import contextlib
 import threading
 
 from django.db import models, transaction
+from django.db.models.sql import aggregates as sql_aggregates
 from django.utils import translation
 
 import multidb.pinning
@@ -312,6 +313,31 @@ def manual_order(qs, pks, pk_name='id'):
         order_by=['_manual'])
 
 
+class SQLCountIf(sql_aggregates.Aggregate):
+    is_ordinal = True
+    sql_function = 'COUNT'
+    sql_template = '%(function)s(CASE WHEN %(field)s %(condition)s THEN 1 END)'
+
+    def as_sql(self, qn, connection):
+        sql, params = super(SQLCountIf, self).as_sql(qn, connection)
+        return sql, list(params) + list(self.extra.get('params', []))
+
+
+class CountIf(models.Aggregate):
+    """
+    Counts the rows where a field matches an SQL condition, to count several
+    subsets of a queryset with a single query:
+
+        >>> qs.aggregate(old=CountIf('created', condition='< %s',
+        ...                          params=[days_ago(10)]))
+    """
+    name = 'CountIf'
+
+    def add_to_query(self, query, alias, col, source, is_summary):
+        query.aggregates[alias] = SQLCountIf(
+            col, source=source, is_summary=is_summary, **self.extra)
+
+
 class DynamicBoolFieldsMixin(object):
 
     def _fields(self):
@@ -246,6 +246,7 @@ ES_patchers = [mock.patch('elasticsearch.Elasticsearch'),
                mock.patch('mkt.webapps.indexers.WebappIndexer', spec=True),
                mock.patch('mkt.search.indexers.index', spec=True),
                mock.patch('mkt.search.indexers.BaseIndexer.unindex'),
+               mock.patch('mkt.search.indexers.BaseIndexer.bulk_unindex'),
                mock.patch('mkt.search.indexers.Reindexing', spec=True,
                           side_effect=lambda i: [i]),
                ]
@@ -248,9 +248,10 @@ def update_app_installs():
 
             times.append(time.time() - t_start)
 
-        # Now reindex the apps that actually have a popularity value.
+        # Now update the index for the apps that actually have a popularity
+        # value. Only the popularity, trending and boost fields are sent.
         if reindex_ids:
-            WebappIndexer.run_indexing(reindex_ids)
+            WebappIndexer.update_popularity_trending_boost(reindex_ids)
 
         log.info('Installs calculated for %s apps. Avg time overall: '
                  '%0.2fs' % (count, sum(times) / count))
@@ -264,12 +265,12 @@ def update_app_installs():
 
     qs = Installs.objects.filter(modified__lte=midnight)
     # First get the IDs so we know what to reindex.
-    purged_ids = qs.values_list('addon', flat=True).distinct()
+    purged_ids = list(qs.values_list('addon', flat=True).distinct())
     # Then delete them.
     qs.delete()
 
     for ids in chunked(purged_ids, chunk_size):
-        WebappIndexer.run_indexing(ids)
+        WebappIndexer.update_popularity_trending_boost(ids)
 
 
 def _get_trending(app_id):
@@ -466,9 +467,10 @@ def update_app_trending():
             if reindex:
                 reindex_ids.append(app.id)
 
-        # Now reindex the apps that actually have a trending score.
+        # Now update the index for the apps that actually have a trending
+        # score. Only the popularity, trending and boost fields are sent.
         if reindex_ids:
-            WebappIndexer.run_indexing(reindex_ids)
+            WebappIndexer.update_popularity_trending_boost(reindex_ids)
 
         log.info('Trending calculated for %s apps. Avg time overall: '
                  '%0.2fs' % (count, sum(times) / count))
@@ -482,12 +484,12 @@ def update_app_trending():
 
     qs = Trending.objects.filter(modified__lte=midnight)
     # First get the IDs so we know what to reindex.
-    purged_ids = qs.values_list('addon', flat=True).distinct()
+    purged_ids = list(qs.values_list('addon', flat=True).distinct())
     # Then delete them.
     qs.delete()
 
     for ids in chunked(purged_ids, chunk_size):
-        WebappIndexer.run_indexing(ids)
+        WebappIndexer.update_popularity_trending_boost(ids)
 
 
 @cronjobs.register
@@ -1,18 +1,18 @@
-from operator import attrgetter
+import json
+from operator import attrgetter, itemgetter
 
 from django.core.urlresolvers import reverse
-from django.db.models import Min
 
 import commonware.log
 from elasticsearch_dsl import F
 from elasticsearch_dsl.filter import Bool
 
 import mkt
-from mkt.constants import APP_FEATURES
 from mkt.constants.applications import DEVICE_GAIA
-from mkt.prices.models import AddonPremium
+from mkt.prices.models import AddonPremium, PriceCurrency
 from mkt.search.indexers import BaseIndexer
 from mkt.search.utils import Search
+from mkt.site.utils import sorted_groupby
 from mkt.tags.models import attach_tags
 from mkt.translations.models import attach_trans_dict
 
@@ -112,13 +112,13 @@ class WebappIndexer(BaseIndexer):
                     # The date this app was added to the escalation queue.
                     'escalation_date': {'format': 'dateOptionalTime',
                                         'type': 'date', 'doc_values': True},
-                    'features': {
-                        'type': 'object',
-                        'properties': dict(
-                            ('has_%s' % f.lower(), {'type': 'boolean'})
-                            for f in APP_FEATURES)
-                    },
+                    # The features required by the current version, e.g.
+                    # 'sms' for `has_sms`.
+                    'features': cls.string_not_analyzed(),
                     'file_size': {'type': 'long'},
+                    # The request independent parts of the API response, see
+                    # ESAppSerializer.build_fragment().
+                    'fragment': {'type': 'object', 'enabled': False},
                     'guid': cls.string_not_analyzed(),
                     'has_public_stats': {'type': 'boolean'},
                     'hosted_url': cls.string_not_analyzed(),
@@ -177,6 +177,21 @@ class WebappIndexer(BaseIndexer):
                         'dynamic': 'true',
                     },
                     'price_tier': cls.string_not_indexed(),
+                    'price_tier_id': {'type': 'long', 'index': 'no'},
+                    'price_tier_price': cls.string_not_indexed(),
+                    # The PriceCurrency rows of the price tier, to serialize
+                    # prices without hitting the database.
+                    'prices': {
+                        'type': 'object',
+                        'properties': {
+                            'carrier': {'type': 'short', 'index': 'no'},
+                            'currency': cls.string_not_indexed(),
+                            'paid': {'type': 'boolean', 'index': 'no'},
+                            'price': cls.string_not_indexed(),
+                            'provider': {'type': 'short', 'index': 'no'},
+                            'region': {'type': 'short', 'index': 'no'},
+                        }
+                    },
                     'promo_img_hash': cls.string_not_indexed(),
                     'ratings': {
                         'type': 'object',
@@ -237,23 +252,155 @@ class WebappIndexer(BaseIndexer):
     @classmethod
     def extract_document(cls, pk=None, obj=None):
         """Extracts the ElasticSearch index document for this instance."""
-        from mkt.webapps.models import (AppFeatures, attach_devices,
-                                        attach_prices, attach_translations,
-                                        RatingDescriptors, RatingInteractives)
-
         if obj is None:
             obj = cls.get_model().objects.get(pk=pk)
 
+        return cls._extract_document(obj, cls.fetch_related_data([obj]))
+
+    @classmethod
+    def extract_documents(cls, objs):
+        """
+        Extracts the ElasticSearch index documents for a list of instances.
+
+        Everything the documents need is fetched once for the whole list by
+        fetch_related_data(), so the number of queries doesn't depend on the
+        number of apps.
+        """
+        objs = list(objs)
+        related = cls.fetch_related_data(objs)
+
+        docs = []
+        for obj in objs:
+            try:
+                docs.append(cls._extract_document(obj, related))
+            except Exception as e:
+                log.error('Failed to index webapp {0}: {1}'
+                          .format(obj.id, repr(e)),
+                          # Trying to chase down a cache-machine problem.
+                          exc_info="marketplace:" in str(e))
+        return docs
+
+    @classmethod
+    def fetch_related_data(cls, objs):
+        """
+        Fetches the related data needed to index `objs` in bulk.
+
+        Transforms are applied directly to the instances, everything else is
+        returned in a dict of maps keyed by app id (or version id for
+        version-related data).
+        """
+        from mkt.reviewers.models import EscalationQueue, RereviewQueue
+        from mkt.versions.models import Version
+        from mkt.webapps.models import (AddonExcludedRegion, AddonUpsell,
+                                        AddonUser, AppFeatures, AppManifest,
+                                        attach_devices, attach_prices,
+                                        attach_translations, ContentRating,
+                                        Geodata, Preview, RatingDescriptors,
+                                        RatingInteractives, Webapp)
+
+        def group(qs, key=itemgetter(0), value=itemgetter(1)):
+            return dict((k, [value(v) for v in vs])
+                        for k, vs in sorted_groupby(qs, key))
+
+        def by_id(qs, attr='addon_id'):
+            return dict((getattr(o, attr), o) for o in qs)
+
+        ids = [obj.id for obj in objs]
+
         # Attach everything we need to index apps.
         for transform in (attach_devices, attach_prices, attach_tags,
                           attach_translations):
-            transform([obj])
+            transform(objs)
+
+        # Geodata is attached to the apps like the `geodata` property expects
+        # it, creating the missing ones on the fly.
+        geodata = by_id(
+            Geodata.objects.filter(addon__in=ids).no_transforms())
+        for obj in objs:
+            if obj.id in geodata:
+                obj._geodata = geodata[obj.id]
+            else:
+                geodata[obj.id] = obj._geodata = obj.geodata
+        attach_trans_dict(Geodata, geodata.values())
+
+        current_versions = filter(None, (obj.current_version for obj in objs))
+        version_ids = [v.id for v in current_versions]
+        attach_trans_dict(Version, current_versions)
+
+        popularity, trending = cls.fetch_popularity_trending(objs)
+
+        owners = AddonUser.objects.filter(addon__in=ids,
+                                          role=mkt.AUTHOR_ROLE_OWNER)
+        premiums = (AddonPremium.objects.filter(addon__in=ids)
+                    .select_related('price'))
+        # Inactive tiers have no price, like in Price.get_price_currency().
+        prices = PriceCurrency.objects.filter(
+            tier__in=premiums.values_list('price', flat=True),
+            tier__active=True)
+        upsells = dict(AddonUpsell.objects.filter(free__in=ids)
+                       .values_list('free', 'premium'))
+        upsell_apps = dict((app.id, app) for app in
+                           Webapp.objects.filter(id__in=upsells.values()))
+
+        return {
+            'content_ratings': group(
+                ContentRating.objects.filter(addon__in=ids),
+                key=attrgetter('addon_id'), value=lambda cr: cr),
+            'escalations': dict(
+                EscalationQueue.objects.filter(addon__in=ids)
+                                       .values_list('addon', 'created')),
+            'excluded_regions': group(
+                AddonExcludedRegion.objects.filter(addon__in=ids)
+                                           .values_list('addon', 'region')),
+            'features': by_id(
+                AppFeatures.objects.filter(version__in=version_ids),
+                attr='version_id'),
+            'manifests': dict(
+                AppManifest.objects.filter(version__in=version_ids)
+                                   .values_list('version', 'manifest')),
+            'owners': group(owners.values_list('addon', 'user')),
+            'popularity': popularity,
+            'premiums': by_id(premiums),
+            'prices': group(prices, key=attrgetter('tier_id'),
+                            value=lambda pc: pc),
+            'previews': group(
+                Preview.objects.filter(addon__in=ids).no_transforms(),
+                key=attrgetter('addon_id'), value=lambda p: p),
+            'rating_descriptors': by_id(
+                RatingDescriptors.objects.filter(addon__in=ids)),
+            'rating_interactives': by_id(
+                RatingInteractives.objects.filter(addon__in=ids)),
+            'rereviews': dict(
+                RereviewQueue.objects.filter(addon__in=ids)
+                                     .values_list('addon', 'created')),
+            'trending': trending,
+            'upsells': dict((free_id, upsell_apps.get(premium_id))
+                            for free_id, premium_id in upsells.items()),
+            # Versions are ordered by creation date by default, the grouping
+            # below keeps that order for each app.
+            'versions': group(
+                Version.objects.filter(addon__in=ids).no_transforms(),
+                key=attrgetter('addon_id'), value=lambda v: v),
+        }
 
+    @classmethod
+    def _extract_document(cls, obj, related):
+        """
+        Builds the ElasticSearch index document for `obj` from the data
+        returned by fetch_related_data().
+        """
         latest_version = obj.latest_version
         version = obj.current_version
         geodata = obj.geodata
-        features = (version.features.to_dict()
-                    if version else AppFeatures().to_dict())
+        if version and version.id in related['features']:
+            # Strip `has_` from each feature.
+            features = sorted(
+                k[4:] for k in related['features'][version.id].to_keys())
+        else:
+            features = []
+        manifest = (json.loads(related['manifests'].get(version.id) or '{}')
+                    if version else {})
+        versions = related['versions'].get(obj.id, [])
 
         try:
             status = latest_version.statuses[0][1] if latest_version else None
@@ -270,33 +417,27 @@ class WebappIndexer(BaseIndexer):
         d['author'] = obj.developer_name
         d['banner_regions'] = geodata.banner_regions_slugs()
         d['category'] = obj.categories if obj.categories else []
-        d['content_ratings'] = (obj.get_content_ratings_by_body(es=True) or
-                                None)
-        try:
-            d['content_descriptors'] = obj.rating_descriptors.to_keys()
-        except RatingDescriptors.DoesNotExist:
-            d['content_descriptors'] = []
+        d['content_ratings'] = (obj.get_content_ratings_by_body(
+            es=True, content_ratings=related['content_ratings'].get(
+                obj.id, [])) or None)
+        descriptors = related['rating_descriptors'].get(obj.id)
+        d['content_descriptors'] = descriptors.to_keys() if descriptors else []
         d['current_version'] = version.version if version else None
         d['device'] = getattr(obj, 'device_ids', [])
         d['features'] = features
         d['has_public_stats'] = obj.public_stats
-        try:
-            d['interactive_elements'] = obj.rating_interactives.to_keys()
-        except RatingInteractives.DoesNotExist:
-            d['interactive_elements'] = []
+        interactives = related['rating_interactives'].get(obj.id)
+        d['interactive_elements'] = (interactives.to_keys() if interactives
+                                     else [])
         d['installs_allowed_from'] = (
-            version.manifest.get('installs_allowed_from', ['*'])
+            manifest.get('installs_allowed_from', ['*'])
             if version else ['*'])
         d['is_priority'] = obj.priority_review
 
-        is_escalated = obj.escalationqueue_set.exists()
-        d['is_escalated'] = is_escalated
-        d['escalation_date'] = (obj.escalationqueue_set.get().created
-                                if is_escalated else None)
-        is_rereviewed = obj.rereviewqueue_set.exists()
-        d['is_rereviewed'] = is_rereviewed
-        d['rereview_date'] = (obj.rereviewqueue_set.get().created
-                              if is_rereviewed else None)
+        d['escalation_date'] = related['escalations'].get(obj.id)
+        d['is_escalated'] = d['escalation_date'] is not None
+        d['rereview_date'] = related['rereviews'].get(obj.id)
+        d['is_rereviewed'] = d['rereview_date'] is not None
 
         if latest_version:
             d['latest_version'] = {
@@ -319,25 +460,30 @@ class WebappIndexer(BaseIndexer):
         d['manifest_url'] = obj.get_manifest_url()
         d['package_path'] = obj.get_package_path()
         d['name_sort'] = unicode(obj.name).lower()
-        d['owners'] = [au.user.id for au in
-                       obj.addonuser_set.filter(role=mkt.AUTHOR_ROLE_OWNER)]
+        d['owners'] = related['owners'].get(obj.id, [])
 
         d['previews'] = [{'filetype': p.filetype, 'modified': p.modified,
                           'id': p.id, 'sizes': p.sizes}
-                         for p in obj.previews.all()]
-        try:
-            p = obj.addonpremium.price
-            d['price_tier'] = p.name
-        except AddonPremium.DoesNotExist:
-            d['price_tier'] = None
+                         for p in related['previews'].get(obj.id, [])]
+        premium = related['premiums'].get(obj.id)
+        tier = premium.price if premium else None
+        d['price_tier'] = tier.name if tier else None
+        d['price_tier_id'] = tier.id if tier else None
+        d['price_tier_price'] = unicode(tier.price) if tier else None
+        d['prices'] = [
+            {'carrier': pc.carrier, 'currency': pc.currency, 'paid': pc.paid,
+             'price': unicode(pc.price), 'provider': pc.provider,
+             'region': pc.region}
+            for pc in related['prices'].get(tier.id if tier else None, [])]
 
         d['ratings'] = {
             'average': obj.average_rating,
             'count': obj.total_reviews,
         }
-        d['region_exclusions'] = obj.get_excluded_region_ids()
-        d['reviewed'] = obj.versions.filter(
-            deleted=False).aggregate(Min('reviewed')).get('reviewed__min')
+        d['region_exclusions'] = obj.get_excluded_region_ids(
+            addon_excluded=related['excluded_regions'].get(obj.id, []))
+        reviewed = filter(None, (v.reviewed for v in versions))
+        d['reviewed'] = min(reviewed) if reviewed else None
 
         # The default locale of the app is considered "supported" by default.
         supported_locales = [obj.default_locale]
@@ -349,8 +495,8 @@ class WebappIndexer(BaseIndexer):
 
         d['tags'] = getattr(obj, 'tags_list', [])
 
-        if obj.upsell and obj.upsell.premium.is_published():
-            upsell_obj = obj.upsell.premium
+        upsell_obj = related['upsells'].get(obj.id)
+        if upsell_obj and upsell_obj.is_published():
             d['upsell'] = {
                 'id': upsell_obj.id,
                 'app_slug': upsell_obj.app_slug,
@@ -362,7 +508,7 @@ class WebappIndexer(BaseIndexer):
 
         d['versions'] = [dict(version=v.version,
                               resource_uri=reverse_version(v))
-                         for v in obj.versions.all()]
+                         for v in versions]
 
         # Handle localized fields.
         # This adds both the field used for search and the one with
@@ -376,16 +522,16 @@ class WebappIndexer(BaseIndexer):
             d.update(cls.extract_field_translations(obj, field))
 
         if version:
-            attach_trans_dict(version._meta.model, [version])
             d.update(cls.extract_field_translations(
                 version, 'release_notes', db_field='releasenotes_id'))
         else:
             d['release_notes_translations'] = None
-        attach_trans_dict(geodata._meta.model, [geodata])
         d.update(cls.extract_field_translations(geodata, 'banner_message'))
 
         # Add boost, popularity, trending values.
-        d.update(cls.extract_popularity_trending_boost(obj))
+        d.update(cls.extract_popularity_trending_boost(
+            obj, popularity=related['popularity'].get(obj.id, {}),
+            trending=related['trending'].get(obj.id, {})))
 
         # If the app is compatible with Firefox OS, push suggestion data in the
         # index - This will be used by RocketbarView API, which is specific to
@@ -409,8 +555,29 @@ class WebappIndexer(BaseIndexer):
         for field in ('name', 'description'):
             d.update(cls.extract_field_analyzed_translations(obj, field))
 
+        # Precompute the parts of the API response which don't depend on the
+        # request, from the document itself.
+        from mkt.webapps.serializers import ESAppSerializer
+        d['fragment'] = ESAppSerializer.build_fragment(d)
+
         return d
 
+    @classmethod
+    def extract_boost_dependent_fields(cls, objs, docs):
+        """
+        Updates the weight of the `name_suggest` suggestions with the boost.
+        Partial documents are merged into the stored ones, which keeps the
+        rest of `name_suggest`.
+        """
+        from mkt.webapps.models import attach_devices
+        attach_devices(objs)
+        for obj in objs:
+            # Same condition as in `extract_document`.
+            if (DEVICE_GAIA.id in getattr(obj, 'device_ids', []) and
+                    obj.is_published()):
+                docs[obj.id]['name_suggest'] = {
+                    'weight': int(docs[obj.id]['boost'])}
+
     @classmethod
     def get_indexable(cls):
         """Returns the queryset of ids of all things to be indexed."""
@@ -427,16 +594,7 @@ class WebappIndexer(BaseIndexer):
         qs = Webapp.with_deleted.filter(id__in=ids)
         ES = ES or cls.get_es()
 
-        docs = []
-        for obj in list(qs):
-            try:
-                docs.append(cls.extract_document(obj.id, obj=obj))
-            except Exception as e:
-                log.error('Failed to index webapp {0}: {1}'
-                          .format(obj.id, repr(e)),
-                          # Trying to chase down a cache-machine problem.
-                          exc_info="marketplace:" in str(e))
-
+        docs = cls.extract_documents(qs)
         cls.bulk_index(docs, es=ES, index=index or cls.get_index())
 
     @classmethod
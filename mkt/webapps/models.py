@@ -58,6 +58,7 @@ from mkt.translations.models import attach_trans_dict
 from mkt.translations.utils import find_language, to_language
 from mkt.users.models import UserForeignKey, UserProfile
 from mkt.versions.models import Version
+from mkt.search.signals import index_updated
 from mkt.webapps import query, signals
 from mkt.webapps.indexers import WebappIndexer
 from mkt.webapps.utils import (dehydrate_content_rating, get_locale_properties,
@@ -1642,7 +1643,7 @@ class Webapp(UUIDModelMixin, OnChangeMixin, ModelBase):
 
         return sorted(set(all_ids) - set(excluded or []))
 
-    def get_excluded_region_ids(self):
+    def get_excluded_region_ids(self, addon_excluded=None):
         """
         Return IDs of regions for which this app is excluded.
 
@@ -1650,10 +1651,15 @@ class Webapp(UUIDModelMixin, OnChangeMixin, ModelBase):
         this will also exclude any region that does not have the price tier
         set.
 
+        If `addon_excluded` is provided we'll use that list of AddonExcluded
+        region IDs instead of doing our own lookup.
+
         Note: free and in-app are not included in this.
         """
-        excluded = set(self.addonexcludedregion
-                           .values_list('region', flat=True))
+        if addon_excluded is None:
+            addon_excluded = (self.addonexcludedregion
+                                  .values_list('region', flat=True))
+        excluded = set(addon_excluded)
 
         if self.is_premium():
             all_regions = set(mkt.regions.ALL_REGION_IDS)
@@ -1962,15 +1968,20 @@ class Webapp(UUIDModelMixin, OnChangeMixin, ModelBase):
         """
         return hashlib.sha512(settings.SECRET_KEY + str(self.id)).hexdigest()
 
-    def get_content_ratings_by_body(self, es=False):
+    def get_content_ratings_by_body(self, es=False, content_ratings=None):
         """
         Gets content ratings on this app keyed by bodies.
 
         es -- denotes whether to return ES-friendly results (just the IDs of
               rating classes) to fetch and translate later.
+        content_ratings -- optional list of ContentRating instances to use
+                           instead of querying them.
         """
-        content_ratings = {}
-        for cr in self.content_ratings.all():
+        if content_ratings is None:
+            content_ratings = self.content_ratings.all()
+
+        by_body = {}
+        for cr in content_ratings:
             body = cr.get_body()
             rating_serialized = {
                 'body': body.id,
@@ -1978,9 +1989,9 @@ class Webapp(UUIDModelMixin, OnChangeMixin, ModelBase):
             }
             if not es:
                 rating_serialized = dehydrate_content_rating(rating_serialized)
-            content_ratings[body.label] = rating_serialized
+            by_body[body.label] = rating_serialized
 
-        return content_ratings
+        return by_body
 
     def set_iarc_info(self, submission_id, security_code):
         """
@@ -2224,6 +2235,13 @@ def update_search_index(sender, instance, **kw):
         tasks.index_webapps.delay([instance.id])
 
 
+@receiver(index_updated, sender=WebappIndexer,
+          dispatch_uid='webapp.search.openmobileacl')
+def refresh_openmobileacl_after_indexing(sender, ids, **kw):
+    from mkt.search.utils import schedule_openmobileacl_refresh
+    schedule_openmobileacl_refresh(ids)
+
+
 @receiver(dbsignals.post_save, sender=AddonUpsell,
           dispatch_uid='addonupsell.search.index')
 def update_search_index_upsell(sender, instance, **kw):
@@ -2236,6 +2254,15 @@ def update_search_index_upsell(sender, instance, **kw):
         tasks.index_webapps.delay([instance.premium.id])
 
 
+@receiver([dbsignals.post_save, dbsignals.post_delete], sender=AddonPremium,
+          dispatch_uid='addonpremium.search.index')
+def update_search_index_premium(sender, instance, **kw):
+    # The price tier of the app is stored in ES.
+    from . import tasks
+    if not kw.get('raw'):
+        tasks.index_webapps.delay([instance.addon_id])
+
+
 models.signals.pre_save.connect(save_signal, sender=Webapp,
                                 dispatch_uid='webapp_translations')
 
@@ -2631,6 +2658,18 @@ for k, v in APP_FEATURES.iteritems():
     field.contribute_to_class(AppFeatures, 'has_%s' % k.lower())
 
 
+@receiver(dbsignals.post_save, sender=AppFeatures,
+          dispatch_uid='appfeatures.search.index')
+def update_search_index_features(sender, instance, **kw):
+    # The features are stored in ES, and indexing the app also refreshes the
+    # OpenMobileACL list if needed.
+    if not kw.get('raw'):
+        app_ids = list(Version.with_deleted.filter(pk=instance.version_id)
+                                           .values_list('addon', flat=True))
+        if app_ids:
+            WebappIndexer.index_ids(app_ids)
+
+
 class AppManifest(ModelBase):
     """
     Storage for manifests.
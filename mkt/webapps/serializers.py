@@ -1,3 +1,4 @@
+import hashlib
 import json
 from decimal import Decimal
 
@@ -5,19 +6,21 @@ from django.conf import settings
 from django.core.urlresolvers import reverse
 
 import commonware.log
+from elasticsearch.serializer import JSONSerializer
 from rest_framework import response, serializers
 from tower import ungettext as ngettext
 
 import mkt
 from drf_compound_fields.fields import ListField
-from mkt.api.fields import (ESTranslationSerializerField, LargeTextField,
-                            ReverseChoiceField, SemiSerializerMethodField,
+from mkt.api.fields import (ESFragmentField, ESTranslationSerializerField,
+                            LargeTextField, ReverseChoiceField,
+                            SemiSerializerMethodField,
                             TranslationSerializerField)
 from mkt.constants.applications import DEVICE_TYPES
 from mkt.constants.categories import CATEGORY_CHOICES
 from mkt.constants.features import FeatureProfile
 from mkt.constants.payments import PROVIDER_BANGO
-from mkt.prices.models import AddonPremium, Price
+from mkt.prices.models import AddonPremium, Price, price_locale
 from mkt.search.serializers import BaseESSerializer, es_to_datetime
 from mkt.site.helpers import absolutify
 from mkt.submit.forms import mark_for_rereview
@@ -389,6 +392,18 @@ class ESAppSerializer(BaseESSerializer, AppSerializer):
     # The fields we want converted to Python date/datetimes.
     datetime_fields = ('created', 'last_updated', 'modified', 'reviewed')
 
+    # The fields which don't depend on the request, precomputed when indexing
+    # by build_fragment() and stored in the `fragment` of the ES document.
+    fragment_fields = ('absolute_url', 'content_ratings', 'device_types',
+                       'icons', 'previews', 'promo_imgs', 'versions')
+    # Bump this when the serialization of the fields above changes.
+    fragment_revision = 1
+    # The settings the URLs in the fragments are built from.
+    fragment_settings = ('ADDON_ICON_URL', 'DEFAULT_FILE_STORAGE',
+                         'MEDIA_URL', 'PREVIEW_FULL_URL',
+                         'PREVIEW_THUMBNAIL_URL', 'SITE_URL', 'STATIC_URL',
+                         'WEBAPP_PROMO_IMG_URL')
+
     class Meta(AppSerializer.Meta):
         fields = AppSerializer.Meta.fields + ['absolute_url', 'group',
                                               'reviewed']
@@ -399,6 +414,81 @@ class ESAppSerializer(BaseESSerializer, AppSerializer):
         # Remove fields that we don't have in ES at the moment.
         self.fields.pop('upsold', None)
 
+        self.fragment_version = self.get_fragment_version()
+
+    def get_fields(self):
+        """
+        Return all fields as normal, but wrap the fields we can read from the
+        precomputed fragment in an ESFragmentField.
+        """
+        fields = super(ESAppSerializer, self).get_fields()
+        for field_name in self.fragment_fields:
+            if field_name in fields and self._is_fragment_field(field_name):
+                fields[field_name] = ESFragmentField(fields[field_name])
+        return fields
+
+    @classmethod
+    def _is_fragment_field(cls, field_name):
+        """
+        Whether `field_name` is serialized the same way by this class as by
+        ESAppSerializer, which builds the fragments.
+        """
+        field = cls.base_fields.get(field_name)
+        if field is not ESAppSerializer.base_fields.get(field_name):
+            return False
+        method_name = getattr(field, 'method_name', None)
+        return not method_name or (
+            getattr(cls, method_name).__func__ is
+            getattr(ESAppSerializer, method_name).__func__)
+
+    @classmethod
+    def get_fragment_version(cls):
+        """
+        Returns the version of the fragments, which changes with the code and
+        the settings they are built from so that stale ones are ignored.
+        """
+        values = [cls.fragment_revision] + [
+            getattr(settings, name, None) for name in cls.fragment_settings]
+        return hashlib.md5(repr(values)).hexdigest()
+
+    @classmethod
+    def build_fragment(cls, data):
+        """
+        Serializes the `fragment_fields` of the app ES document `data`.
+
+        Content ratings depend on the region of the request, so they are
+        serialized for every ratings body.
+        """
+        # Serialize the document exactly like it will come back from ES.
+        data = json.loads(JSONSerializer().dumps(data))
+        serializer = cls(context={})
+        obj = serializer.fake_object(data)
+
+        fragment = {'_version': serializer.fragment_version}
+        for field_name in cls.fragment_fields:
+            if field_name == 'content_ratings':
+                bodies = set(mkt.regions.REGION_TO_RATINGS_BODY().values())
+                bodies.add(mkt.regions.GENERIC_RATING_REGION_SLUG)
+                value = dict((body, serializer._get_content_ratings(obj, body))
+                             for body in bodies)
+            else:
+                field = serializer.fields[field_name]
+                field.initialize(parent=serializer, field_name=field_name)
+                value = field.field_to_native(obj, field_name)
+            fragment[field_name] = value
+        return json.loads(JSONSerializer().dumps(fragment))
+
+    def from_fragment(self, field_name, value):
+        """
+        Returns the value of `field_name` from the one stored in the fragment.
+        """
+        if field_name == 'content_ratings':
+            return value[self._get_ratings_body()]
+        if field_name in ('icons', 'promo_imgs'):
+            # JSON objects only have string keys.
+            return dict((int(size), url) for size, url in value.items())
+        return value
+
     def fake_object(self, data):
         """Create a fake instance of Webapp and related models from ES data."""
         is_packaged = data['app_type'] != mkt.ADDON_WEBAPP_HOSTED
@@ -462,19 +552,34 @@ class ESAppSerializer(BaseESSerializer, AppSerializer):
         # regions stored in ES instead of making SQL queries.
         obj.get_excluded_region_ids = lambda: data['region_exclusions']
 
-        # Set up payments stuff to avoid extra queries later (we'll still make
-        # some, because price info is not in ES).
-        if obj.is_premium():
-            Webapp.attach_premiums([obj])
+        # Set up payments stuff from the price tier stored in ES, the prices
+        # themselves are read from ES data by get_price*().
+        if obj.is_premium() and data.get('price_tier_id'):
+            obj._premium = AddonPremium(addon=obj, price=Price(
+                id=data['price_tier_id'], name=data['price_tier'],
+                price=Decimal(data['price_tier_price'])))
+        else:
+            obj._premium = None
 
         # Some methods below will need the raw data from ES, put it on obj.
         obj.es_data = data
 
+        # Fields read the precomputed fragment, unless it was built from
+        # another version of the code or settings.
+        fragment = data.get('fragment')
+        obj.es_fragment = (fragment if fragment and fragment.get('_version') ==
+                           self.fragment_version else None)
+
         return obj
 
     def get_content_ratings(self, obj):
-        body = (mkt.regions.REGION_TO_RATINGS_BODY().get(
-            self.context['request'].REGION.slug, 'generic'))
+        return self._get_content_ratings(obj, self._get_ratings_body())
+
+    def _get_ratings_body(self):
+        return mkt.regions.REGION_TO_RATINGS_BODY().get(
+            self.context['request'].REGION.slug, 'generic')
+
+    def _get_content_ratings(self, obj, body):
         prefix = 'has_%s' % body
 
         # Backwards incompat with old index.
@@ -506,6 +611,32 @@ class ESAppSerializer(BaseESSerializer, AppSerializer):
         return dict((v['version'], v['resource_uri'])
                     for v in obj.es_data['versions'])
 
+    def _get_price_data(self, obj):
+        """
+        Returns a tuple of Decimal(price), currency for the current region
+        from ES data, like Webapp.get_price() does from the database.
+        """
+        if not obj.get_tier():
+            return None, None
+        regions, provider = obj._setup_price_lookups(self._get_region_id(),
+                                                     None)
+        prices = dict(((p['carrier'], p['region'], p['provider']), p)
+                      for p in obj.es_data.get('prices', []))
+        for region in regions:
+            price = prices.get((None, region, provider))
+            if price:
+                return Decimal(price['price']), price['currency']
+        return None, None
+
+    def get_price(self, obj):
+        return self._get_price_data(obj)[0]
+
+    def get_price_locale(self, obj):
+        price, currency = self._get_price_data(obj)
+        if price is not None and currency is not None:
+            return price_locale(price, currency)
+        return None
+
     def get_ratings_aggregates(self, obj):
         return obj.es_data.get('ratings', {})
 
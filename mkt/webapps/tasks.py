@@ -319,14 +319,14 @@ def update_supported_locales(ids, **kw):
                 _log(app, u'Updating supported locales failed.', exc_info=True)
 
 
-@post_request_task(acks_late=True)
+@post_request_task(acks_late=True, coalesce=True)
 @use_master
 def index_webapps(ids, **kw):
     # DEPRECATED: call WebappIndexer.index_ids directly.
     WebappIndexer.index_ids(ids, no_delay=True)
 
 
-@post_request_task(acks_late=True)
+@post_request_task(acks_late=True, coalesce=True)
 @use_master
 def unindex_webapps(ids, **kw):
     # DEPRECATED: call WebappIndexer.unindexer directly.
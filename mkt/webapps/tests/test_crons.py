@@ -285,6 +285,15 @@ class TestUpdateInstalls(mkt.site.tests.TestCase):
             else:
                 eq_(get_popularity(self.app, region=region), 0.0)
 
+    @mock.patch('mkt.webapps.cron.WebappIndexer')
+    @mock.patch('mkt.webapps.cron._get_installs')
+    def test_installs_partial_update(self, _mock, indexer_mock):
+        _mock.return_value = {'all': 12.0}
+        update_app_installs()
+        indexer_mock.update_popularity_trending_boost.assert_called_with(
+            [self.app.id])
+        assert not indexer_mock.run_indexing.called
+
     @mock.patch('mkt.webapps.cron._get_installs')
     def test_installs_deleted(self, _mock):
         self.app.trending.get_or_create(region=0, value=12.0)
@@ -352,6 +361,15 @@ class TestUpdateTrending(mkt.site.tests.TestCase):
             else:
                 eq_(get_trending(self.app, region=region), 0.0)
 
+    @mock.patch('mkt.webapps.cron.WebappIndexer')
+    @mock.patch('mkt.webapps.cron._get_trending')
+    def test_trending_partial_update(self, _mock, indexer_mock):
+        _mock.return_value = {'all': 12.0}
+        update_app_trending()
+        indexer_mock.update_popularity_trending_boost.assert_called_with(
+            [self.app.id])
+        assert not indexer_mock.run_indexing.called
+
     @mock.patch('mkt.webapps.cron._get_trending')
     def test_trending_deleted(self, _mock):
         self.app.trending.get_or_create(region=0, value=12.0)
@@ -1,20 +1,23 @@
 # -*- coding: utf-8 -*-
-from django.test.utils import override_settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
 
 import json
+import mock
 from nose.tools import eq_, ok_
 
 import mkt
-from mkt.constants.applications import DEVICE_TYPES
+from mkt.constants.applications import DEVICE_GAIA, DEVICE_TYPES
 from mkt.reviewers.models import EscalationQueue, RereviewQueue
 from mkt.search.utils import get_boost
 from mkt.site.fixtures import fixture
-from mkt.site.tests import ESTestCase, TestCase
+from mkt.site.tests import app_factory, ESTestCase, TestCase
 from mkt.site.utils import version_factory
 from mkt.translations.utils import to_language
 from mkt.users.models import UserProfile
 from mkt.webapps.indexers import WebappIndexer
 from mkt.webapps.models import AddonDeviceType, ContentRating, Webapp
+from mkt.webapps.serializers import ESAppSerializer
 
 
 class TestWebappIndexer(TestCase):
@@ -97,8 +100,7 @@ class TestWebappIndexer(TestCase):
         self.app.current_version.features.update(
             **dict((k, True) for k in enabled))
         obj, doc = self._get_doc()
-        for k, v in doc['features'].iteritems():
-            eq_(v, k in enabled)
+        eq_(doc['features'], ['apps', 'geolocation', 'sms'])
 
     def test_extract_regions(self):
         self.app.addonexcludedregion.create(region=mkt.regions.BRA.id)
@@ -107,6 +109,41 @@ class TestWebappIndexer(TestCase):
         self.assertSetEqual(doc['region_exclusions'],
                             set([mkt.regions.BRA.id, mkt.regions.GBR.id]))
 
+    def test_extract_prices(self):
+        premium = self.make_premium(self.app, price='0.99')
+        obj, doc = self._get_doc()
+        eq_(doc['premium_type'], mkt.ADDON_PREMIUM)
+        eq_(doc['price_tier'], premium.price.name)
+        eq_(doc['price_tier_id'], premium.price.id)
+        eq_(doc['price_tier_price'], u'0.99')
+        eq_(sorted(p['region'] for p in doc['prices']),
+            sorted([mkt.regions.USA.id, mkt.regions.RESTOFWORLD.id]))
+        eq_(doc['prices'][0]['currency'], 'USD')
+        eq_(doc['prices'][0]['price'], u'0.99')
+        ok_(doc['prices'][0]['paid'])
+
+    def test_extract_prices_inactive_tier(self):
+        premium = self.make_premium(self.app)
+        premium.price.update(active=False)
+        obj, doc = self._get_doc()
+        eq_(doc['price_tier_id'], premium.price.id)
+        eq_(doc['prices'], [])
+
+    def test_extract_prices_free(self):
+        obj, doc = self._get_doc()
+        eq_(doc['price_tier'], None)
+        eq_(doc['price_tier_id'], None)
+        eq_(doc['prices'], [])
+
+    def test_extract_fragment(self):
+        obj, doc = self._get_doc()
+        fragment = doc['fragment']
+        eq_(fragment['_version'], ESAppSerializer.get_fragment_version())
+        eq_(set(fragment), set(ESAppSerializer.fragment_fields) |
+            set(['_version']))
+        eq_(sorted(fragment['icons']), ['128', '32', '48', '64'])
+        ok_('generic' in fragment['content_ratings'])
+
     def test_extract_supported_locales(self):
         self.app.update(default_locale='de')
         locales = 'en-US,es,pt-BR'
@@ -251,6 +288,56 @@ class TestWebappIndexer(TestCase):
         # Adolescent regions trending value is not stored.
         ok_('trending_2' not in doc)
 
+    @mock.patch('mkt.search.indexers.BaseIndexer.bulk_update')
+    def test_update_popularity_trending_boost(self, bulk_update_mock):
+        self.app.addondevicetype_set.create(device_type=DEVICE_GAIA.id)
+        self.app.popularity.create(region=0, value=50.0)
+        self.app.trending.create(region=7, value=10.0)
+        WebappIndexer.update_popularity_trending_boost([self.app.pk])
+
+        docs = bulk_update_mock.call_args[0][0]
+        eq_(docs.keys(), [self.app.pk])
+        doc = docs[self.app.pk]
+        eq_(doc['boost'], get_boost(self.app))
+        eq_(doc['popularity'], 50)
+        eq_(doc['trending'], 0)
+        eq_(doc['trending_7'], 10)
+        # Only the popularity, trending and boost fields are sent, along with
+        # the suggestions weight.
+        ok_(all(k in ('boost', 'name_suggest') or
+                k.startswith(('popularity', 'trending')) for k in doc))
+        eq_(doc['name_suggest'], {'weight': int(doc['boost'])})
+        obj, full_doc = self._get_doc()
+        eq_(doc['name_suggest']['weight'], full_doc['name_suggest']['weight'])
+
+    @mock.patch('mkt.search.indexers.BaseIndexer.bulk_update')
+    def test_update_popularity_trending_boost_no_suggestions(
+            self, bulk_update_mock):
+        self.app.addondevicetype_set.create(device_type=DEVICE_GAIA.id)
+        self.app.update(status=mkt.STATUS_PENDING)
+        WebappIndexer.update_popularity_trending_boost([self.app.pk])
+        doc = bulk_update_mock.call_args[0][0][self.app.pk]
+        ok_('name_suggest' not in doc)
+
+    def test_extract_documents(self):
+        self.app.popularity.create(region=0, value=50.0)
+        EscalationQueue.objects.create(addon=self.app)
+        other_app = app_factory()
+        apps = list(Webapp.objects.filter(pk__in=[self.app.pk, other_app.pk]))
+        docs = WebappIndexer.extract_documents(apps)
+        eq_(len(docs), 2)
+        for app, doc in zip(apps, docs):
+            eq_(doc, WebappIndexer.extract_document(app.pk))
+
+    def test_extract_documents_num_queries(self):
+        apps = [self.app] + [app_factory() for i in range(3)]
+        apps = list(Webapp.objects.filter(pk__in=[app.pk for app in apps]))
+        with CaptureQueriesContext(connection) as single:
+            WebappIndexer.extract_documents(apps[:1])
+        with CaptureQueriesContext(connection) as multiple:
+            WebappIndexer.extract_documents(apps)
+        eq_(len(single), len(multiple))
+
 
 class TestExcludedFields(ESTestCase):
     fixtures = fixture('webapp_337141')
@@ -11,6 +11,7 @@ from nose.tools import eq_, ok_
 
 import mkt
 import mkt.site.tests
+from mkt.api.fields import ESFragmentField
 from mkt.constants import ratingsbodies, regions
 from mkt.constants.payments import PROVIDER_REFERENCE
 from mkt.constants.regions import RESTOFWORLD
@@ -23,8 +24,8 @@ from mkt.users.models import UserProfile
 from mkt.versions.models import Version
 from mkt.webapps.indexers import WebappIndexer
 from mkt.webapps.models import AddonDeviceType, Installed, Preview, Webapp
-from mkt.webapps.serializers import (AppSerializer, ESAppSerializer,
-                                     SimpleESAppSerializer)
+from mkt.webapps.serializers import (AppSerializer, ESAppFeedSerializer,
+                                     ESAppSerializer, SimpleESAppSerializer)
 
 
 class TestAppSerializer(mkt.site.tests.TestCase):
@@ -441,6 +442,42 @@ class TestESAppSerializer(mkt.site.tests.ESTestCase):
         with self.assertNumQueries(0):
             self.test_basic()
 
+    def test_fragment(self):
+        ok_(self.get_obj()['fragment'])
+        with mock.patch.object(Webapp, 'get_icon_url') as get_icon_url:
+            res = self.serialize()
+        ok_(not get_icon_url.called)
+
+        # Fragments built from another version of the code are ignored.
+        with mock.patch.object(ESAppSerializer, 'fragment_revision', 0):
+            eq_(self.serialize(), res)
+
+    def test_fragment_content_ratings(self):
+        self.app.set_content_ratings({
+            ratingsbodies.CLASSIND: ratingsbodies.CLASSIND_18,
+            ratingsbodies.ESRB: ratingsbodies.ESRB_E,
+        })
+        self.app.save()
+        self.refresh('webapp')
+
+        for region in (mkt.regions.BRA, mkt.regions.USA, RESTOFWORLD):
+            self.request.REGION = region
+            res = self.serialize()
+            with mock.patch.object(ESAppSerializer, 'fragment_revision', 0):
+                eq_(self.serialize()['content_ratings'],
+                    res['content_ratings'])
+
+    def test_fragment_fields(self):
+        fields = ESAppSerializer(context={'request': self.request}).fields
+        ok_(isinstance(fields['icons'], ESFragmentField))
+        ok_(isinstance(fields['previews'], ESFragmentField))
+        ok_(not isinstance(fields['name'], ESFragmentField))
+
+        # Fields which are serialized differently can't use the fragment.
+        fields = ESAppFeedSerializer(context={'request': self.request}).fields
+        ok_(not isinstance(fields['icons'], ESFragmentField))
+        ok_(isinstance(fields['device_types'], ESFragmentField))
+
     def test_basic_with_lang(self):
         # Check that when ?lang is passed, we get the right language and we get
         # empty strings instead of None if the strings don't exist.
@@ -541,6 +578,34 @@ class TestESAppSerializer(mkt.site.tests.ESTestCase):
         eq_(res['price_locale'], '$1.00')
         eq_(res['payment_required'], True)
 
+    def test_has_price_no_queries(self):
+        self.make_premium(self.app)
+        self.app.save()
+        self.refresh('webapp')
+
+        data = self.get_obj()
+        serializer = ESAppSerializer(context={'request': self.request})
+        with self.assertNumQueries(0):
+            obj = serializer.fake_object(data)
+            eq_(obj.get_tier().price, Decimal('1.00'))
+            eq_(serializer.get_price(obj), Decimal('1.00'))
+            eq_(serializer.get_price_locale(obj), '$1.00')
+            eq_(serializer.get_payment_required(obj), True)
+
+    def test_has_price_region(self):
+        premium = self.make_premium(self.app)
+        PriceCurrency.objects.create(region=regions.POL.id, currency='PLN',
+                                     price='5.01', tier=premium.price,
+                                     provider=PROVIDER_REFERENCE)
+        self.app.save()
+        self.refresh('webapp')
+
+        self.request.REGION = regions.POL
+        with self.activate(locale='fr'):
+            res = self.serialize()
+            eq_(res['price'], Decimal('5.01'))
+            eq_(res['price_locale'], u'5,01\xa0PLN')
+
     def test_not_paid(self):
         self.make_premium(self.app)
         PriceCurrency.objects.update(paid=False)
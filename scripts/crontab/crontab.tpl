@@ -9,6 +9,10 @@ PATH=/opt/rh/python27/root/usr/bin
 
 HOME=/tmp
 
+# Every 15 minutes.
+*/15 * * * * %(z_cron)s update_rocketbar_index --settings=settings_local_mkt
+*/15 * * * * %(z_cron)s update_reviewer_queue_counts --settings=settings_local_mkt
+
 # Once per hour.
 20 * * * * %(z_cron)s addon_last_updated
 50 * * * * %(z_cron)s cleanup_extracted_file
@@ -17,6 +21,7 @@ HOME=/tmp
 25 17,5 * * * %(z_cron)s hide_disabled_files
 
 # Once per day.
+01 0 * * * %(z_cron)s warm_daily_games --settings=settings_local_mkt
 05 8 * * * %(z_cron)s email_daily_ratings --settings=settings_local_mkt
 10 8 * * * %(z_cron)s update_monolith_stats `/bin/date -d 'yesterday' +\%%Y-\%%m-\%%d`
 15 8 * * * %(z_cron)s process_iarc_changes --settings=settings_local_mkt
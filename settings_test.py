@@ -57,6 +57,15 @@ ES_DEFAULT_NUM_REPLICAS = 0
 # See the following URL on why we set num_shards to 1 for tests:
 # http://www.elasticsearch.org/guide/en/elasticsearch/guide/current/relevance-is-broken.html
 ES_DEFAULT_NUM_SHARDS = 1
+# Tests create and delete indexes behind the indexers' back.
+ES_USE_FINGERPRINTS = False
+SEARCH_RESPONSE_CACHE_TIMEOUT = 0
+FEED_SNAPSHOT_TIMEOUT = 0
+ROCKETBAR_INDEX_MAX_APPS = 0
+OPENMOBILEACL_LIST_TIMEOUT = 0
+DAILY_GAMES_CACHE = False
+REVIEWER_QUEUE_COUNTS_TIMEOUT = 0
+REVIEWER_PROGRESS_TIMEOUT = 0
 IARC_MOCK = True
 IN_TEST_SUITE = True
 INSTALLED_APPS += ('mkt.translations.tests.testapp',)